@@ -0,0 +1,102 @@
+# Process-wide answer cache shared across Streamlit sessions
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_question(question):
+    """Normalize a question so trivially different phrasings share a cache entry
+
+    Args:
+        question (str): Question as typed by the user
+
+    Returns:
+        str: Lowercased question with collapsed whitespace and no trailing punctuation
+    """
+    return ' '.join(question.lower().split()).rstrip(' ?!.')
+
+
+def cache_key(question, config_version):
+    """Build the cache key for a question answered with a given configuration version
+
+    Args:
+        question (str): Question as typed by the user
+        config_version (str): Version of the loaded bedrock_config (see ConfigStore.version)
+
+    Returns:
+        tuple: (normalized question, config version)
+    """
+    return (normalize_question(question), config_version)
+
+
+class AnswerCache:
+    """Thread-safe LRU cache of answers with a per-entry time-to-live
+
+    Entries are dropped when they expire, when the cache is full (least recently
+    used first), or all at once when the knowledge base generation changes.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached answer for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store an answer, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self._entries.clear()
+
+    def sync_generation(self, generation):
+        """Clear the cache when the knowledge base has been re-ingested
+
+        Args:
+            generation: Marker for the latest completed ingestion (e.g. job ID).
+                None means "unknown" and never clears the cache.
+
+        Returns:
+            bool: True if the cache was cleared
+        """
+        if generation is None:
+            return False
+        with self._lock:
+            if generation == self._generation:
+                return False
+            first_sync = self._generation is None
+            self._generation = generation
+            if first_sync:
+                # Answers cached before we first saw a marker came from the same index
+                return False
+            self._entries.clear()
+            return True
+
+    def stats(self):
+        """Return hit/miss counters and current size for display"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
@@ -0,0 +1,86 @@
+# Helpers for consuming Bedrock retrieve_and_generate_stream and converse_stream responses
+import time
+
+
+class StreamError(Exception):
+    """Raised when the Bedrock event stream reports an error event
+
+    Attributes:
+        event_type (str): Name of the error event, e.g. 'throttlingException', or None
+    """
+
+    def __init__(self, message, event_type=None):
+        super().__init__(message)
+        self.event_type = event_type
+
+
+def iter_stream_text(event_stream, metadata=None):
+    """Yield answer text chunks from a retrieve_and_generate_stream or converse_stream event stream
+
+    Args:
+        event_stream: Iterable of event dicts, e.g. response['stream'] from boto3
+            or a list of fake events in local tests
+        metadata (dict): Optional dict updated with converse_stream metadata (usage, metrics)
+
+    Yields:
+        str: Non-empty text fragments in the order they were generated
+    """
+    for event in event_stream:
+        output = event.get('output') or event.get('contentBlockDelta', {}).get('delta')
+        if output:
+            text = output.get('text')
+            if text:
+                yield text
+            continue
+        if 'metadata' in event:
+            if metadata is not None:
+                metadata.update(event['metadata'])
+            continue
+        # Citation and guardrail events carry no answer text; error events end the stream
+        for event_type, payload in event.items():
+            if event_type.endswith('Exception'):
+                message = payload.get('message', event_type) if isinstance(payload, dict) else str(payload)
+                raise StreamError(message, event_type)
+
+
+class StreamedAnswer:
+    """Accumulates a streamed answer and records its timing
+
+    Attributes:
+        text (str): Answer text received so far
+        time_to_first_token (float): Seconds until the first text chunk, or None
+        total_time (float): Seconds until the stream finished, or None
+        metadata (dict): converse_stream metadata such as token usage, if any was sent
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.text = ''
+        self.time_to_first_token = None
+        self.total_time = None
+        self.metadata = {}
+        self._started = None
+
+    def start(self):
+        """Mark the moment the request was sent, so timings include the API call itself"""
+        self._started = self._clock()
+
+    def consume(self, event_stream, on_text=None):
+        """Read the whole stream, calling on_text with the accumulated answer after each chunk
+
+        Args:
+            event_stream: Iterable of Bedrock stream events
+            on_text: Optional callable receiving the answer text so far
+
+        Returns:
+            str: The complete answer text
+        """
+        started = self._started if self._started is not None else self._clock()
+        for chunk in iter_stream_text(event_stream, self.metadata):
+            if self.time_to_first_token is None:
+                self.time_to_first_token = self._clock() - started
+            self.text += chunk
+            if on_text:
+                on_text(self.text)
+        self.total_time = self._clock() - started
+        return self.text
@@ -0,0 +1,257 @@
+# Async HTTP query service: /ask, /upload, /health and admin endpoints over the same logic as the Streamlit app
+import asyncio
+import hmac
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from config import API_UPLOAD_KEY, MAX_CONCURRENT_QUERIES, MAX_UPLOAD_MB, QUERY_QUEUE_TIMEOUT_SECONDS
+from qa_core import (
+    document_key, document_statuses, get_admission, get_answer_cache, get_single_flight, get_tracer, get_warmer,
+    load_suggested_questions, query_agentcore_runtime, save_suggested_questions, start_warmup, upload_document
+)
+
+MAX_QUESTION_CHARS = 1000
+UPLOAD_TYPES = ('.pdf', '.txt', '.docx')
+# Uploads are held in memory up to this size, then spill to a temporary file
+UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+BUSY_RETRY_AFTER_SECONDS = 5
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Pre-answer the suggested questions in the background as soon as the service starts"""
+    start_warmup()
+    yield
+
+
+app = FastAPI(title="St Mary's School Q&A API", lifespan=lifespan)
+
+# boto3 calls block, so they run on this pool; the event loop only waits on them.
+# The pool is sized to the query limit, so an admitted question never queues for a thread.
+_query_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_QUERIES, thread_name_prefix='query')
+_query_slots = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+_counters_lock = threading.Lock()
+_counters = {'in_flight': 0, 'rejected': 0}
+
+
+class AskRequest(BaseModel):
+    """Body of POST /ask"""
+    question: str
+    stream: bool = False
+
+
+class SuggestedQuestionsRequest(BaseModel):
+    """Body of PUT /suggested-questions"""
+    questions: list[str]
+
+
+def _release_slot(loop):
+    """Free a query slot once the blocking work behind it has really finished"""
+    with _counters_lock:
+        _counters['in_flight'] -= 1
+    loop.call_soon_threadsafe(_query_slots.release)
+
+
+async def run_query(func, *args, **kwargs):
+    """Run a blocking call on the query pool once one of MAX_CONCURRENT_QUERIES slots is free
+
+    The slot is held until the call returns, even if the client disconnects first, so
+    abandoned requests still count against the limit while they use Bedrock.
+
+    Raises:
+        HTTPException: 503 with Retry-After when no slot frees up within QUERY_QUEUE_TIMEOUT_SECONDS
+    """
+    try:
+        await asyncio.wait_for(_query_slots.acquire(), QUERY_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        with _counters_lock:
+            _counters['rejected'] += 1
+        raise HTTPException(status_code=503, detail='Too many questions at once, please retry',
+                            headers={'Retry-After': str(BUSY_RETRY_AFTER_SECONDS)})
+    with _counters_lock:
+        _counters['in_flight'] += 1
+
+    loop = asyncio.get_running_loop()
+    future = _query_pool.submit(func, *args, **kwargs)
+    future.add_done_callback(lambda _: _release_slot(loop))
+    return await asyncio.wrap_future(future)
+
+
+def _require_api_key(x_api_key, refused):
+    """Reject requests whose X-Api-Key header does not match API_UPLOAD_KEY
+
+    Args:
+        x_api_key (str): Value of the X-Api-Key header
+        refused (str): What is refused when no key is configured, e.g. "Uploads"
+    """
+    if not API_UPLOAD_KEY:
+        raise HTTPException(status_code=403, detail=f'{refused} through the API are disabled (API_UPLOAD_KEY is not set)')
+    if not hmac.compare_digest(x_api_key.encode('utf-8'), API_UPLOAD_KEY.encode('utf-8')):
+        raise HTTPException(status_code=401, detail='Invalid API key')
+
+
+def _validated_question(body):
+    """Strip the question and reject empty or oversized ones"""
+    question = body.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail='question is empty')
+    if len(question) > MAX_QUESTION_CHARS:
+        raise HTTPException(status_code=400, detail=f'question is longer than {MAX_QUESTION_CHARS} characters')
+    return question
+
+
+@app.get('/health')
+async def health():
+    """Liveness check for the load balancer, with load and cache figures for the admin panel"""
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        'status': 'ok',
+        'max_concurrent': MAX_CONCURRENT_QUERIES,
+        'answer_cache': get_answer_cache().stats(),
+        'collapsed': get_single_flight().collapsed,
+        'bedrock': get_admission().stats(),
+        'latency': get_tracer().percentiles(),
+        'warmup': get_warmer().status(),
+        **counters,
+    }
+
+
+@app.post('/ask')
+async def ask(body: AskRequest):
+    """Answer a question
+
+    With "stream": true the response is newline-delimited JSON: {"delta": "..."} lines
+    as the answer is generated ({"status": "..."} lines while Bedrock is busy and calls
+    are retried), then one {"answer": "..."} line with the complete answer (including
+    any fallback link). Otherwise it is {"question": ..., "answer": ...}.
+    """
+    question = _validated_question(body)
+    if not body.stream:
+        answer = await run_query(query_agentcore_runtime, question)
+        return {'question': question, 'answer': answer}
+
+    loop = asyncio.get_running_loop()
+    partials = asyncio.Queue()
+
+    def on_text(text):
+        # Called on the query thread; hand the text to the event loop
+        loop.call_soon_threadsafe(partials.put_nowait, ('delta', text))
+
+    def on_status(message):
+        loop.call_soon_threadsafe(partials.put_nowait, ('status', message))
+
+    # Wait for a slot before the response starts, so a busy service can still answer 503
+    answer_task = asyncio.ensure_future(
+        run_query(query_agentcore_runtime, question, on_text=on_text, on_status=on_status)
+    )
+    first = asyncio.ensure_future(partials.get())
+    await asyncio.wait({answer_task, first}, return_when=asyncio.FIRST_COMPLETED)
+    if answer_task.done() and answer_task.exception() is not None:
+        first.cancel()
+        raise answer_task.exception()
+
+    sent = ''
+
+    def line(kind, value):
+        nonlocal sent
+        if kind == 'status':
+            return json.dumps({'status': value}) + '\n'
+        delta, sent = value[len(sent):], value
+        return json.dumps({'delta': delta}) + '\n'
+
+    async def lines():
+        pending = first
+        try:
+            while True:
+                await asyncio.wait({answer_task, pending}, return_when=asyncio.FIRST_COMPLETED)
+                if not pending.done():
+                    break
+                yield line(*pending.result())
+                pending = asyncio.ensure_future(partials.get())
+            # Partial answers queued just before the answer finished
+            while not partials.empty():
+                yield line(*partials.get_nowait())
+            yield json.dumps({'answer': await answer_task}) + '\n'
+        finally:
+            pending.cancel()
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+
+@app.post('/upload')
+async def upload(
+    request: Request,
+    filename: str = Query(..., description='Original file name, e.g. calendar.pdf'),
+    x_api_key: str = Header(''),
+    x_uploaded_by: str = Header('api'),
+):
+    """Upload a document (raw request body) to the knowledge base folder in S3
+
+    Needs the X-Api-Key header to match API_UPLOAD_KEY. The document processor Lambda
+    picks the file up from S3 as it does for uploads from the admin panel.
+    """
+    _require_api_key(x_api_key, 'Uploads')
+    filename = os.path.basename(filename)
+    if not filename.lower().endswith(UPLOAD_TYPES):
+        raise HTTPException(status_code=400, detail=f"Only {', '.join(UPLOAD_TYPES)} files can be uploaded")
+
+    limit = MAX_UPLOAD_MB * 1024 * 1024
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(status_code=413, detail=f'File is larger than {MAX_UPLOAD_MB} MB')
+            spool.write(chunk)
+        if not size:
+            raise HTTPException(status_code=400, detail='File is empty')
+        spool.seek(0)
+
+        success, error = await asyncio.to_thread(upload_document, spool, filename, x_uploaded_by)
+    if not success:
+        raise HTTPException(status_code=502, detail=f'Error uploading file: {error}')
+    return {'key': document_key(filename), 'size': size}
+
+
+@app.get('/documents')
+async def documents(refresh: bool = Query(False), x_api_key: str = Header('')):
+    """Recently submitted documents and when each became queryable, for the admin panel
+
+    Needs the X-Api-Key header. Without refresh=true this is the status from the
+    service's last ingestion check; with it Bedrock is asked about pending documents.
+    """
+    _require_api_key(x_api_key, 'Admin requests')
+    try:
+        rows = await asyncio.to_thread(document_statuses, refresh)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f'Error reading document status: {e}')
+    return {'documents': rows}
+
+
+@app.get('/suggested-questions')
+async def suggested_questions():
+    """The suggested questions shown under the question box (no key needed; every user sees them)"""
+    return {'questions': await asyncio.to_thread(load_suggested_questions)}
+
+
+@app.put('/suggested-questions')
+async def save_questions(body: SuggestedQuestionsRequest, x_api_key: str = Header(''),
+                              x_uploaded_by: str = Header('api')):
+    """Replace the suggested questions and warm their answers in this service
+
+    Needs the X-Api-Key header; X-Uploaded-By is stored as the editor's name.
+    """
+    _require_api_key(x_api_key, 'Admin requests')
+    success, error = await asyncio.to_thread(save_suggested_questions, body.questions, x_uploaded_by)
+    if not success:
+        raise HTTPException(status_code=502, detail=f'Error saving suggested questions: {error}')
+    return {'saved': True}
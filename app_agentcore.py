@@ -1,58 +1,42 @@
+import os
 import streamlit as st
-import boto3
 import uuid
-import json
-from config import AWS_REGION, S3_BUCKET, DATA_SOURCE_ID, KNOWLEDGE_BASE_ID
+from config import QUERY_API_URL, API_UPLOAD_KEY, MAX_SUGGESTED_QUESTIONS, INGESTION_MODE
+from qa_core import (
+    document_statuses, get_admission, get_answer_cache, get_event_lookup_stats, get_single_flight, get_stream_timings, get_tracer,
+    get_warmer, load_suggested_questions, query_agentcore_runtime, save_suggested_questions, start_upload_batch,
+    start_warmup
+)
+import query_client
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_bedrock_config():
-    """Load Bedrock configuration from S3"""
-    try:
-        s3_client = boto3.client('s3', region_name=AWS_REGION)
-        response = s3_client.get_object(Bucket=S3_BUCKET, Key='config/bedrock_config.json')
-        return json.loads(response['Body'].read().decode('utf-8'))
-    except Exception as e:
-        # Fallback to local config
-        with open('bedrock_config.json', 'r') as f:
-            return json.load(f)
+# All of the page's CSS, injected once at the top of each run
+PAGE_CSS = """
+    <style>
+    /* Remove top padding/margin */
+    .main > div {
+        padding-top: 2.5rem;
+    }
+    .block-container {
+        padding-top: 2.5rem;
+    }
+    .stImage {
+        margin-bottom: -1rem;
+    }
+    .stTextInput {
+        margin-top: -30px;
+    }
+    /* Reduce the gap between suggested questions */
+    .row-widget.stHorizontal > div {
+        gap: 0.5rem !important;
+    }
+    </style>
+    """
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_fallback_config():
-    """Load fallback links configuration from S3"""
-    try:
-        s3_client = boto3.client('s3', region_name=AWS_REGION)
-        response = s3_client.get_object(Bucket=S3_BUCKET, Key='config/fallback_links.json')
-        return json.loads(response['Body'].read().decode('utf-8'))
-    except Exception as e:
-        # Fallback to local config
-        with open('fallback_links.json', 'r') as f:
-            return json.load(f)
-
-def get_fallback_link(question, answer):
-    """Get appropriate fallback link based on question content and answer uncertainty"""
-    try:
-        config = load_fallback_config()
-        
-        # Check if answer indicates uncertainty
-        uncertainty_detected = any(keyword.lower() in answer.lower() 
-                                 for keyword in config['uncertainty_keywords'])
-        
-        if not uncertainty_detected:
-            return None
-            
-        # Match question to appropriate link
-        question_lower = question.lower()
-        fallback_links = config['fallback_links']
-        
-        for topic, link in fallback_links.items():
-            if topic != 'default' and topic in question_lower:
-                return link
-                
-        # Return default link if no specific match
-        return fallback_links['default']
-        
-    except Exception as e:
-        return None
+# The logo is served from static/ by Streamlit (server.enableStaticServing), so each run
+# sends a short <img> tag and the browser fetches the file, rather than the server
+# importing PIL and decoding the PNG on every rerun
+LOGO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'st-marys-logo.png')
+LOGO_HTML = '<img src="app/static/st-marys-logo.png" width="80" alt="St Mary\'s logo">'
 
 # Initialize session state
 if 'authenticated' not in st.session_state:
@@ -83,76 +67,230 @@ def simple_auth():
             else:
                 st.sidebar.error("Invalid admin credentials")
 
-def upload_to_s3(file):
-    """Upload file to S3 bucket - Updated 2025-09-15 16:43"""
-    try:
-        s3_client = boto3.client('s3', region_name=AWS_REGION)
-        file_key = f"school-docs/{file.name}"
-        print(f"DEBUG: Uploading to S3 path: {file_key}")  # Debug line
+def upload_to_s3(files):
+    """Upload files to S3 concurrently, with a progress bar per file
+    
+    Uploads go through the query service when QUERY_API_URL is set. In this
+    process the batch ends with one knowledge base sync request for all files.
+    
+    Returns:
+        list: Per-file results (filename, state, error, seconds)
+    """
+    username = st.session_state.username
+    upload = None
+    if QUERY_API_URL:
+        def upload(fileobj, filename, on_bytes):
+            # fileobj is Streamlit's UploadedFile, which knows its size
+            return query_client.upload(QUERY_API_URL, API_UPLOAD_KEY, fileobj, filename, username,
+                                       on_bytes=on_bytes, size=fileobj.size)
+    
+    batch = start_upload_batch([(f, f.name, f.size) for f in files], username,
+                               upload=upload, sync=not QUERY_API_URL)
+    bars = [st.progress(0.0, text=f"⏳ {f.name}") for f in files]
+    while True:
+        finished = batch.wait(0.25)
+        for bar, entry in zip(bars, batch.progress()):
+            fraction = entry['sent'] / entry['size'] if entry['size'] else 0.0
+            icon = {'done': '✅', 'failed': '❌', 'uploading': '📤'}.get(entry['state'], '⏳')
+            bar.progress(min(fraction, 1.0), text=f"{icon} {entry['filename']} "
+                         f"({entry['sent'] / 1024 / 1024:.1f} of {entry['size'] / 1024 / 1024:.1f} MB)")
+        if finished:
+            break
+    
+    if batch.completion is not None:
+        synced, job_id = batch.completion
+        if synced:
+            st.caption(f"🔄 Knowledge base sync requested for the batch ({job_id})")
+    return batch.results()
+
+def ask_question(question, on_text=None, on_status=None):
+    """Answer a question through the query service when QUERY_API_URL is set, otherwise in this process
+    
+    Args:
+        question (str): Question as typed by the user
+        on_text: Optional callable for streamed partial answers
+        on_status: Optional callable for "busy, retrying" messages
         
-        s3_client.upload_fileobj(
-            file,
-            S3_BUCKET,
-            file_key,
-            ExtraArgs={'Metadata': {'uploaded_by': st.session_state.username}}
+    Returns:
+        str: Answer text, or an error message
+    """
+    if QUERY_API_URL:
+        return query_client.ask(QUERY_API_URL, question, on_text, on_status)
+    return query_agentcore_runtime(question, on_text=on_text, on_status=on_status)
+
+def current_suggested_questions():
+    """Suggested questions from the query service when QUERY_API_URL is set, otherwise from S3"""
+    if QUERY_API_URL:
+        return query_client.suggested_questions(QUERY_API_URL)
+    return load_suggested_questions()
+
+def answer_box_html(question_text, answer):
+    """HTML for the pale green question/answer box"""
+    return f"""
+        <div style="background-color: #e8f5e8; padding: 15px; border-radius: 10px; border-left: 4px solid #4CAF50; margin: 10px 0;">
+            <p><strong>Question:</strong> {question_text}</p>
+            <p><strong>Answer:</strong> {answer}</p>
+        </div>
+        """
+
+def show_local_query_stats():
+    """Admin captions for the answer cache, calendar index and streaming in this process"""
+    # Answer cache effectiveness
+    cache_stats = get_answer_cache().stats()
+    st.caption(
+        f"⚡ Answer cache: {cache_stats['hits']} hits, "
+        f"{cache_stats['misses']} misses, {cache_stats['size']} cached, "
+        f"{get_single_flight().collapsed} duplicate calls collapsed"
+    )
+    lookup_stats = get_event_lookup_stats().stats()
+    if lookup_stats['questions']:
+        st.caption(
+            f"📅 Calendar index: {lookup_stats['hit_rate']:.0%} of "
+            f"{lookup_stats['questions']} questions answered directly, "
+            f"median {lookup_stats['median_ms']:.1f} ms"
+        )
+    show_admission_stats(get_admission().stats())
+    show_warmup_status(get_warmer().status())
+    stream_timings = [t for t in get_stream_timings() if t[0] is not None]
+    if stream_timings:
+        first_token_times = sorted(t[0] for t in stream_timings)
+        st.caption(
+            f"⏱️ Streaming: median time to first token "
+            f"{first_token_times[len(first_token_times) // 2]:.2f}s "
+            f"over {len(first_token_times)} answers"
         )
-        return True, None
-    except Exception as e:
-        return False, str(e)
 
-def sync_knowledge_base():
-    """Trigger knowledge base sync after upload"""
-    try:
-        bedrock_agent = boto3.client('bedrock-agent', region_name=AWS_REGION)
-        
-        response = bedrock_agent.start_ingestion_job(
-            knowledgeBaseId=KNOWLEDGE_BASE_ID,
-            dataSourceId=DATA_SOURCE_ID
+def format_ms(value):
+    """Milliseconds for a caption, or "n/a" when nothing has been measured yet"""
+    return "n/a" if value is None else f"{value:.0f} ms"
+
+def show_admission_stats(admission):
+    """Admin caption for Bedrock admission control: queueing, waits and throttling
+    
+    Wait times are None until a call has been admitted (every call so far may have
+    timed out in the queue), so they are shown as "n/a" then.
+    """
+    if not admission['admitted'] and not admission['rejected']:
+        return
+    st.caption(
+        f"🚦 Bedrock: {admission['in_flight']} in flight, {admission['queue_depth']} queued "
+        f"(peak {admission['max_queue_depth']}), median wait {format_ms(admission['median_wait_ms'])}, "
+        f"p95 {format_ms(admission['p95_wait_ms'])}, {admission['throttled']} throttled, "
+        f"{admission['retries']} retried, {admission['rejected']} timed out, "
+        f"{admission['rate_per_second']}/s allowed"
+    )
+
+def show_warmup_status(warmup):
+    """Admin caption for the last warm-up of the suggested questions' answers"""
+    if not warmup:
+        return
+    failed = f", {len(warmup['errors'])} failed" if warmup['errors'] else ""
+    st.caption(
+        f"🔥 Warm-up ({warmup['reason']}): {warmup['answered']}/{warmup['questions']} suggested answers "
+        f"ready in {warmup['seconds']:.1f}s{failed}, {warmup['age_seconds'] / 60:.0f} min ago"
+    )
+
+def edit_suggested_questions():
+    """Admin editor for the suggested questions; saving warms their answers
+
+    With QUERY_API_URL set the questions are saved through the query service, so
+    the answers are warmed there rather than in this process.
+    """
+    with st.expander("💡 Edit suggested questions"):
+        text = st.text_area(
+            f"One question per line (up to {MAX_SUGGESTED_QUESTIONS})",
+            value="\n".join(current_suggested_questions()),
+            key="suggested_questions_text"
         )
-        return True, response.get('ingestionJob', {}).get('ingestionJobId', 'Unknown')
+        if st.button("Save suggested questions"):
+            if QUERY_API_URL:
+                success, error_msg = query_client.save_suggested_questions(
+                    QUERY_API_URL, API_UPLOAD_KEY, text.splitlines(), st.session_state.username)
+                if success:
+                    # Show the new list here straight away rather than when the cached copy expires
+                    query_client.suggested_questions(QUERY_API_URL, refresh=True)
+            else:
+                success, error_msg = save_suggested_questions(text.splitlines(), st.session_state.username)
+            if success:
+                st.success("✅ Suggested questions saved; their answers are being prepared")
+            else:
+                st.error(f"❌ Error saving suggested questions: {error_msg}")
+
+def show_document_status():
+    """Admin table of recently submitted documents and when each became queryable
+
+    Reruns show the status from the last ingestion check; Bedrock is only asked
+    again when the admin clicks the refresh button. With QUERY_API_URL set the
+    status comes from the query service.
+    """
+    st.markdown("**📄 Knowledge base documents**")
+    refresh = st.button("Refresh document status")
+    try:
+        if QUERY_API_URL:
+            rows = query_client.documents(QUERY_API_URL, API_UPLOAD_KEY, refresh=refresh)
+        else:
+            rows = document_statuses(refresh=refresh)
     except Exception as e:
-        st.error(f"Error syncing knowledge base: {str(e)}")
-        return False, None
+        st.caption(f"📄 Document status unavailable: {e}")
+        return
+    if not rows:
+        st.caption("📄 No documents submitted yet")
+        return
+    
+    def label(row):
+        if row['queryable']:
+            return "✅ queryable"
+        if row['status'] == 'DELETED':
+            return "🗑️ removed"
+        if row['final']:
+            return f"❌ {row['status'].lower()}" + (f": {row['reason']}" if row['reason'] else "")
+        return "⏳ deleting" if row['action'] == 'delete' else "⏳ indexing"
+    
+    st.table([
+        {
+            'document': row['document'],
+            'status': label(row),
+            'submitted': (row['submitted_at'] or '')[:16].replace('T', ' '),
+            'ready after': f"{row['seconds_to_final']}s" if row['seconds_to_final'] is not None else '',
+        }
+        for row in rows
+    ])
 
-def query_agentcore_runtime(question):
-    """Query the knowledge base using retrieve_and_generate"""
+def show_latency_panel(percentiles):
+    """Admin table of rolling p50/p95/p99 per stage, from the tracer's ring buffers"""
+    if not percentiles:
+        return
+    st.markdown("**⏱️ Latency (ms, recent requests)**")
+    st.table([
+        {'stage': name, 'count': row['count'], 'p50': row['p50_ms'], 'p95': row['p95_ms'], 'p99': row['p99_ms']}
+        for name, row in percentiles.items()
+    ])
+
+def show_query_service_status():
+    """Admin caption for the query service the UI is a thin client of"""
     try:
-        config = load_bedrock_config()
-        bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', region_name=AWS_REGION)
-        
-        response = bedrock_agent_runtime.retrieve_and_generate(
-            input={'text': question},
-            retrieveAndGenerateConfiguration={
-                'type': 'KNOWLEDGE_BASE',
-                'knowledgeBaseConfiguration': {
-                    'knowledgeBaseId': KNOWLEDGE_BASE_ID,
-                    'modelArn': config['model_arn'],
-                    'generationConfiguration': {
-                        'inferenceConfig': {
-                            'textInferenceConfig': {
-                                'temperature': config.get('temperature', 0.1),
-                                'maxTokens': config.get('max_tokens', 1000)
-                            }
-                        },
-                        'promptTemplate': {
-                            'textPromptTemplate': config.get('prompt_template', config['system_instructions'] + '\n\nQuestion: $query$\n\nAnswer:')
-                        }
-                    }
-                }
-            }
+        health = query_client.health(QUERY_API_URL)
+        cache_stats = health['answer_cache']
+        st.caption(
+            f"🔌 Query service: {health['in_flight']}/{health['max_concurrent']} queries in flight, "
+            f"{health['rejected']} turned away busy; answer cache {cache_stats['hits']} hits, "
+            f"{cache_stats['misses']} misses"
         )
-        
-        answer = response['output']['text']
-        
-        # Check if we need to add a fallback link
-        fallback_link = get_fallback_link(question, answer)
-        if fallback_link:
-            answer += f"\n\nFor more information, please visit: {fallback_link}"
-        
-        return answer
-        
+        show_admission_stats(health['bedrock'])
+        show_warmup_status(health.get('warmup'))
+        # Stage timings come from the service; rendering is timed here in the UI
+        show_latency_panel({**health['latency'], **get_tracer().percentiles()})
     except Exception as e:
-        return f"Error querying knowledge base: {str(e)}"
+        st.caption(f"🔌 Query service unavailable: {e}")
+
+def show_logo():
+    """School logo at the top of the page (an emoji if the file is missing)"""
+    if not os.path.exists(LOGO_FILE):
+        st.write("🎓")
+    elif st.get_option("server.enableStaticServing"):
+        st.markdown(LOGO_HTML, unsafe_allow_html=True)
+    else:
+        st.image(LOGO_FILE, width=80)
 
 def main():
     st.set_page_config(
@@ -162,32 +300,20 @@ def main():
         initial_sidebar_state="collapsed"
     )
     
-    # Remove top padding/margin
-    st.markdown("""
-        <style>
-        .main > div {
-            padding-top: 2.5rem;
-        }
-        .block-container {
-            padding-top: 2.5rem;
-        }
-        .stImage {
-            margin-bottom: -1rem;
-        }
-        </style>
-        """, unsafe_allow_html=True)
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
     
     # Display logo and title aligned to the left
-    try:
-        st.image("st-marys-logo.png", width=80)
-    except:
-        st.write("🎓")  # Fallback to emoji if logo not found
+    show_logo()
     
     st.markdown("# St Mary's Yr5 Class Rep Bot")
     st.markdown("Powered by AWS Bedrock and AgentCore Runtime")
     
     simple_auth()
     
+    # Pre-answer the suggested questions in this process (the query service warms its own)
+    if not QUERY_API_URL:
+        start_warmup()
+    
     # Main chat interface
     if st.session_state.authenticated and st.session_state.username == "admin":
         # Two column layout for admin (with document management)
@@ -198,17 +324,6 @@ def main():
         col2 = None
 
     with col1:
-        st.markdown(
-            """
-            <style>
-            .stTextInput {
-                margin-top: -30px;
-            }
-            </style>
-            """, 
-            unsafe_allow_html=True
-        )
-        
         st.subheader("💬 Ask a Question")
         
         # Question input (submits on Enter)
@@ -216,7 +331,8 @@ def main():
         default_question = st.session_state.get('selected_question', '')
         
         question = st.text_input(
-            "",
+            "Question",
+            label_visibility="hidden",
             value=default_question,
             placeholder="e.g. when are year 5 PE days",
             help="Press Enter to submit or click Ask button"
@@ -230,7 +346,20 @@ def main():
             st.session_state.last_processed_question = question
             
             with st.spinner("Searching for answer..."):
-                answer = query_agentcore_runtime(question)
+                # Render tokens into the answer box as they arrive
+                answer_placeholder = st.empty()
+                def show_partial_answer(partial_answer):
+                    with get_tracer().span('render'):
+                        answer_placeholder.markdown(
+                            answer_box_html(question, partial_answer),
+                            unsafe_allow_html=True
+                        )
+                
+                def show_status(message):
+                    # Bedrock is throttling; no answer text has been shown yet
+                    answer_placeholder.info(f"⏳ {message}")
+                
+                answer = ask_question(question, on_text=show_partial_answer, on_status=show_status)
                 
                 # Add to chat history
                 st.session_state.chat_history.append((question, answer))
@@ -252,39 +381,16 @@ def main():
             question_text, answer = st.session_state.last_qa
             
             # Display in a pale green box
-            st.markdown(
-                f"""
-                <div style="background-color: #e8f5e8; padding: 15px; border-radius: 10px; border-left: 4px solid #4CAF50; margin: 10px 0;">
-                    <p><strong>Question:</strong> {question_text}</p>
-                    <p><strong>Answer:</strong> {answer}</p>
-                </div>
-                """, 
-                unsafe_allow_html=True
-            )
+            with get_tracer().span('render'):
+                st.markdown(answer_box_html(question_text, answer), unsafe_allow_html=True)
         
         # Suggested questions (only show if not processing)
         if not st.session_state.get('processing', False):
             # Add space before suggested questions
             st.markdown("<br>", unsafe_allow_html=True)
             st.subheader("💡 Suggested Questions")
-            sample_questions = [
-                "When are 5M PE Days?",
-                "What are the term dates for 2025-26?",
-                "When is the christmas fair?",
-                "When does the autumn term end in 2025?"
-            ]
-            
-            # Add CSS to reduce column gap
-            st.markdown(
-                """
-                <style>
-                .row-widget.stHorizontal > div {
-                    gap: 0.5rem !important;
-                }
-                </style>
-                """, 
-                unsafe_allow_html=True
-            )
+            # Configured by admins; answers are pre-warmed, so these render from the cache
+            sample_questions = current_suggested_questions()
             
             # Put all suggested questions in one column
             for i, sample_q in enumerate(sample_questions):
@@ -300,22 +406,36 @@ def main():
             
             st.success(f"Logged in as: {st.session_state.username}")
             
-            # File upload
-            uploaded_file = st.file_uploader(
+            # File upload (several files go up at once)
+            uploaded_files = st.file_uploader(
                 "Upload school documents",
                 type=['pdf', 'txt', 'docx'],
-                help="Upload PDF, TXT, or DOCX files"
+                accept_multiple_files=True,
+                help="Upload one or more PDF, TXT, or DOCX files"
             )
             
-            if uploaded_file is not None:
-                if st.button("Upload Document"):
-                    with st.spinner("Uploading..."):
-                        success, error_msg = upload_to_s3(uploaded_file)
-                        
-                        if success:
-                            st.success(f"✅ File uploaded successfully: {uploaded_file.name}")
-                        else:
-                            st.error(f"❌ Error uploading file: {error_msg}")
+            if uploaded_files:
+                label = "Upload Document" if len(uploaded_files) == 1 else f"Upload {len(uploaded_files)} Documents"
+                if st.button(label):
+                    results = upload_to_s3(uploaded_files)
+                    uploaded = [r for r in results if r['state'] == 'done']
+                    if uploaded:
+                        st.success(f"✅ {len(uploaded)} file(s) uploaded successfully: "
+                                   f"{', '.join(r['filename'] for r in uploaded)}")
+                    for r in results:
+                        if r['state'] != 'done':
+                            st.error(f"❌ Error uploading file {r['filename']}: {r['error']}")
+            
+            edit_suggested_questions()
+            
+            if INGESTION_MODE == 'incremental':
+                show_document_status()
+            
+            if QUERY_API_URL:
+                show_query_service_status()
+            else:
+                show_local_query_stats()
+                show_latency_panel(get_tracer().percentiles())
             
             # Logout button
             if st.button("Logout"):
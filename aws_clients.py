@@ -0,0 +1,100 @@
+# Shared, long-lived AWS clients for the Streamlit app and the document processor Lambda
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+# Connection pool size per client; Streamlit serves many sessions from one process
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '50'))
+# Retry attempts including the first call; adaptive mode also rate-limits client-side when throttled
+MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '5'))
+# Bedrock runtime throttling is retried by bedrock_admission, which queues and backs off
+# process-wide; botocore only gets one quick retry there for transient network errors
+SERVICE_MAX_ATTEMPTS = {
+    'bedrock-agent-runtime': 2,
+    'bedrock-runtime': 2,
+}
+CONNECT_TIMEOUT_SECONDS = int(os.environ.get('AWS_CONNECT_TIMEOUT_SECONDS', '5'))
+
+# Read timeouts per service: generation and OCR calls legitimately take a while
+READ_TIMEOUT_SECONDS = {
+    'bedrock-agent-runtime': 120,
+    'bedrock-runtime': 120,
+    'textract': 60,
+}
+DEFAULT_READ_TIMEOUT_SECONDS = 30
+
+_session = None
+_clients = {}
+_lock = threading.Lock()
+
+
+def client_config(service_name):
+    """Build the botocore Config used for a service's pooled client
+
+    Args:
+        service_name (str): AWS service name, e.g. 's3'
+
+    Returns:
+        botocore.config.Config: Pool sizing, keep-alive, adaptive retries and timeouts
+    """
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        retries={'mode': 'adaptive', 'total_max_attempts': SERVICE_MAX_ATTEMPTS.get(service_name, MAX_ATTEMPTS)},
+        connect_timeout=CONNECT_TIMEOUT_SECONDS,
+        read_timeout=READ_TIMEOUT_SECONDS.get(service_name, DEFAULT_READ_TIMEOUT_SECONDS),
+    )
+
+
+def get_client(service_name, region_name=None, endpoint_url=None):
+    """Return the process-wide client for a service, creating it on first use
+
+    Clients are thread-safe once built, so one client (and its connection pool)
+    is shared by every caller. Creation is serialised because boto3 sessions are not.
+
+    Args:
+        service_name (str): AWS service name, e.g. 's3' or 'bedrock-agent-runtime'
+        region_name (str): Optional region; defaults to the environment's region
+        endpoint_url (str): Optional endpoint override, e.g. a local stand-in
+
+    Returns:
+        botocore.client.BaseClient: Shared client for the service
+    """
+    global _session
+    key = (service_name, region_name, endpoint_url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            if _session is None:
+                _session = boto3.session.Session()
+            client = _session.client(
+                service_name,
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=client_config(service_name),
+            )
+            _clients[key] = client
+        return client
+
+
+def reset_clients():
+    """Forget every cached client (e.g. after credentials are rotated)"""
+    global _session
+    with _lock:
+        _clients.clear()
+        _session = None
+
+
+def set_client(service_name, client, region_name=None, endpoint_url=None):
+    """Register the client get_client returns for a service, e.g. a local fake in benchmarks
+
+    Must run before the modules that create clients at import time are imported.
+    """
+    with _lock:
+        _clients[(service_name, region_name, endpoint_url)] = client
@@ -0,0 +1,183 @@
+# Process-wide admission control for Bedrock calls: token bucket, concurrency limit and throttle backoff
+import random
+import threading
+import time
+from collections import deque
+
+from botocore.exceptions import ClientError
+
+# Shown to parents instead of an error when Bedrock stays busy past the deadline
+BUSY_MESSAGE = "Lots of people are asking questions right now. Please try again in a moment."
+BUSY_RETRYING_MESSAGE = "The answer service is busy, retrying..."
+
+# Error codes (API errors and stream exception events) that mean "slow down", compared lowercased
+THROTTLE_CODES = frozenset({
+    'throttlingexception', 'toomanyrequestsexception',
+    'servicequotaexceededexception', 'serviceunavailableexception',
+})
+
+
+class BedrockBusy(Exception):
+    """Raised when a call is not admitted, or is still throttled, by its deadline"""
+
+
+def is_throttle(e):
+    """True if an exception from a Bedrock call (or its event stream) is throttling"""
+    if isinstance(e, ClientError):
+        code = e.response.get('Error', {}).get('Code', '')
+    else:
+        code = getattr(e, 'event_type', None) or ''
+    return code.lower() in THROTTLE_CODES
+
+
+class AdmissionController:
+    """Admit Bedrock calls at a sustainable rate, with a cap on calls in flight
+
+    Callers queue until a concurrency slot is free and the token bucket has a token,
+    or until their deadline passes. Throttled calls are retried with full-jitter
+    exponential backoff, and each throttle halves the bucket's refill rate; every
+    successful call wins back a little of the configured rate, so the process settles
+    just under the account's Bedrock quota instead of hammering it.
+
+    Args:
+        rate_per_second (float): Configured (maximum) calls admitted per second
+        burst (int): Bucket size, i.e. calls that may start back to back
+        max_concurrent (int): Calls allowed in flight at once
+        deadline_seconds (float): Default time a call may spend queued and retrying
+        max_attempts (int): Attempts per call, including the first
+        base_delay (float): First backoff ceiling in seconds; doubles per attempt
+        max_delay (float): Largest backoff ceiling in seconds
+    """
+
+    def __init__(self, rate_per_second, burst, max_concurrent, deadline_seconds=20.0, max_attempts=4,
+                 base_delay=0.5, max_delay=8.0, clock=time.monotonic, sleep=time.sleep, jitter=random.random):
+        self.max_rate = rate_per_second
+        self.min_rate = rate_per_second / 16
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.deadline_seconds = deadline_seconds
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._jitter = jitter
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._refilled = clock()
+        self._waits = deque(maxlen=200)
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.retries = 0
+
+    def _refill(self):
+        """Add the tokens earned since the last refill (caller holds the lock)"""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _admit(self, deadline):
+        """Block until the call may start, or raise BedrockBusy at the deadline"""
+        started = self._clock()
+        with self._cond:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            try:
+                while True:
+                    self._refill()
+                    if self.in_flight < self.max_concurrent and self._tokens >= 1:
+                        self._tokens -= 1
+                        self.in_flight += 1
+                        self.admitted += 1
+                        self._waits.append(self._clock() - started)
+                        return
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise BedrockBusy('Timed out waiting for a Bedrock slot')
+                    if self.in_flight < self.max_concurrent:
+                        # Only short of a token: wake when the next one is due
+                        remaining = min(remaining, (1 - self._tokens) / self.rate)
+                    self._cond.wait(remaining)
+            finally:
+                self.queue_depth -= 1
+
+    def _release(self, throttled):
+        """Free the caller's slot and adapt the refill rate to the outcome
+
+        throttled is None when the call was interrupted (e.g. a Streamlit rerun)
+        and says nothing about Bedrock, so the rate is left as it is.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+            elif throttled is not None:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+            self._cond.notify_all()
+
+    def call(self, request, deadline_seconds=None, on_retry=None):
+        """Run a Bedrock request once admitted, retrying it while it is throttled
+
+        Args:
+            request: Zero-argument callable making the call (and reading any stream)
+            deadline_seconds (float): Optional override of the queue-and-retry deadline
+            on_retry: Optional callable(attempt, delay_seconds) run before each backoff
+
+        Returns:
+            The value returned by request()
+
+        Raises:
+            BedrockBusy: The call was not admitted, or was still throttled, in time
+        """
+        deadline = self._clock() + (deadline_seconds or self.deadline_seconds)
+        attempt = 1
+        while True:
+            self._admit(deadline)
+            # The slot is freed however the request ends, including BaseExceptions such
+            # as the rerun Streamlit raises from a streaming callback when the user clicks
+            outcome = error = None
+            try:
+                result = request()
+                outcome = False
+            except Exception as e:
+                outcome = is_throttle(e)
+                if not outcome:
+                    raise
+                error = e
+            finally:
+                self._release(outcome)
+            if not outcome:
+                return result
+            delay = self._jitter() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+            if attempt >= self.max_attempts or self._clock() + delay >= deadline:
+                raise BedrockBusy(f'Bedrock still throttling after {attempt} attempts') from error
+            with self._cond:
+                self.retries += 1
+            if on_retry:
+                on_retry(attempt, delay)
+            self._sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        """Return queue, wait-time and throttle metrics for the admin panel and /health"""
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                'in_flight': self.in_flight,
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'throttled': self.throttled,
+                'retries': self.retries,
+                'rate_per_second': round(self.rate, 3),
+                'median_wait_ms': waits[len(waits) // 2] * 1000 if waits else None,
+                'p95_wait_ms': waits[int(len(waits) * 0.95)] * 1000 if waits else None,
+            }
@@ -0,0 +1,91 @@
+"""Micro-benchmark: per-call cost of a new boto3 client per request vs the shared registry
+
+Runs entirely offline against a tiny local HTTP server standing in for S3, so it
+measures client construction plus connection setup, not AWS latency.
+
+    python benchmarks/bench_aws_clients.py [--calls 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Dummy credentials so botocore can sign requests to the local server
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+
+import boto3  # noqa: E402
+from aws_clients import get_client, reset_clients  # noqa: E402
+
+BODY = b'{"ok": true}'
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    """Answers every GET with a small object, keeping the connection open"""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; avoid delayed-ACK stalls on reused connections
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.send_header('ETag', '"bench"')
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def time_calls(make_client, endpoint_url, calls):
+    """Time get_object calls, asking make_client for a client on every call"""
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        client = make_client(endpoint_url)
+        client.get_object(Bucket='bench', Key='config/bedrock_config.json')['Body'].read()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarize(label, timings):
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<28} mean {statistics.mean(timings):7.2f} ms   "
+          f"p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeS3Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint_url = f"http://127.0.0.1:{server.server_port}"
+
+    def client_per_call(url):
+        return boto3.client('s3', region_name='us-east-1', endpoint_url=url)
+
+    def shared_client(url):
+        return get_client('s3', region_name='us-east-1', endpoint_url=url)
+
+    reset_clients()
+    before = time_calls(client_per_call, endpoint_url, args.calls)
+    after = time_calls(shared_client, endpoint_url, args.calls)
+    server.shutdown()
+
+    print(f"{args.calls} S3 GETs against a local stand-in")
+    summarize('boto3.client() per call', before)
+    summarize('shared registry client', after)
+    print(f"speed-up: {statistics.mean(before) / statistics.mean(after):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Regression check and throughput benchmark for the calendar normalizer
+
+Each calendar_corpus/<name>.txt sample is normalized and compared with
+calendar_corpus/<name>.expected.txt. Then the corpus is replayed to compare
+throughput with the original per-line implementation. The two are within
+run-to-run noise of each other; the rewrite is about correctness, not speed.
+The samples are reconstructions in the school's calendar format rather than
+real scans; DOCUMENT_PROCESSOR_SETUP.md shows how to add a real one.
+
+    python benchmarks/bench_calendar_normalizer.py            # check goldens + benchmark
+    python benchmarks/bench_calendar_normalizer.py --update   # rewrite goldens after review
+"""
+import argparse
+import difflib
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from calendar_normalizer import CalendarNormalizer  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'calendar_corpus')
+# Fixed so goldens do not depend on today's date
+DEFAULT_YEAR = '2025'
+
+
+def legacy_clean_calendar_text(raw_text):
+    """The original clean_calendar_text/format_calendar_event, kept for comparison"""
+    lines = raw_text.split('\n')
+    cleaned_lines = []
+    current_month = None
+    current_year = None
+    for line in lines:
+        if '2025' in line or '2026' in line:
+            if '2025' in line:
+                current_year = '2025'
+            if '2026' in line:
+                current_year = '2026'
+            break
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if any(skip in line.lower() for skip in ['key:', 'sh =', 'smc =', 'is =', 'ms =', 'js =', 'tbc =']):
+            continue
+        months = ['September', 'October', 'November', 'December', 'January', 'February', 'March', 'April', 'May', 'June', 'July']
+        for month in months:
+            if month in line and (current_year in line if current_year else True):
+                current_month = month
+                cleaned_lines.append(f"\n{month.upper()} {current_year or '2025'} EVENTS:\n")
+                break
+        else:
+            if current_month and any(day in line for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']):
+                cleaned_lines.append(legacy_format_calendar_event(line, current_month, current_year or '2025'))
+            elif line and not line.startswith(('KEY:', 'Please note')):
+                cleaned_lines.append(line)
+    return '\n'.join(cleaned_lines)
+
+
+def legacy_format_calendar_event(line, month, year):
+    line = re.sub(r'(\d+)\s+(st|nd|rd|th)', r'\1\2', line)
+    time_conversions = {
+        '15:00': '3:00pm', '15:15': '3:15pm', '15:30': '3:30pm', '15:45': '3:45pm',
+        '16:00': '4:00pm', '16:15': '4:15pm', '16:30': '4:30pm', '16:45': '4:45pm',
+        '10:00': '10:00am', '11:00': '11:00am', '14:00': '2:00pm'
+    }
+    for time_24, time_12 in time_conversions.items():
+        line = line.replace(time_24, time_12)
+    location_conversions = {
+        ' SH': ', School Hall', ' SMC': ', St Mary\'s Church', ' IS': ', Infant Site',
+        ' MS': ', Middle Site', ' JS': ', Junior Site'
+    }
+    for code, location in location_conversions.items():
+        line = line.replace(code, location)
+    if month not in line:
+        day_pattern = r'(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\s+(\d+(?:st|nd|rd|th))'
+        match = re.search(day_pattern, line)
+        if match:
+            rest = line[match.end():].strip()
+            if rest.startswith(':'):
+                rest = rest[1:].strip()
+            line = f"{match.group(0)} {month} {year}: {rest}"
+    return line
+
+
+def corpus_samples():
+    paths = sorted(glob.glob(os.path.join(CORPUS_DIR, '*.txt')))
+    return [p for p in paths if not p.endswith('.expected.txt')]
+
+
+def check_goldens(update):
+    """Compare every sample with its golden output; returns the number of mismatches"""
+    normalizer = CalendarNormalizer(default_year=DEFAULT_YEAR)
+    failures = 0
+    for path in corpus_samples():
+        with open(path, encoding='utf-8') as f:
+            actual = normalizer.normalize(f.read().split('\n')) + '\n'
+        golden_path = path[:-len('.txt')] + '.expected.txt'
+        name = os.path.basename(path)
+
+        if update or not os.path.exists(golden_path):
+            with open(golden_path, 'w', encoding='utf-8') as f:
+                f.write(actual)
+            print(f"wrote   {os.path.basename(golden_path)}")
+            continue
+
+        with open(golden_path, encoding='utf-8') as f:
+            expected = f.read()
+        if actual == expected:
+            print(f"ok      {name}")
+        else:
+            failures += 1
+            print(f"FAILED  {name}")
+            sys.stdout.writelines(difflib.unified_diff(
+                expected.splitlines(True), actual.splitlines(True), 'expected', 'actual'))
+    return failures
+
+
+def best_of(rounds, fn):
+    """Fastest of several timed runs, to keep scheduler noise out of the comparison"""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def benchmark(repeat, rounds):
+    texts = []
+    for path in corpus_samples():
+        with open(path, encoding='utf-8') as f:
+            texts.append(f.read())
+    # One large document, as a long calendar or several merged pages would be
+    document = '\n'.join(texts * repeat)
+    line_count = document.count('\n') + 1
+
+    normalizer = CalendarNormalizer(default_year=DEFAULT_YEAR)
+    legacy_seconds = best_of(rounds, lambda: legacy_clean_calendar_text(document))
+    compiled_seconds = best_of(rounds, lambda: normalizer.normalize(document.split('\n')))
+
+    print(f"\n{line_count} lines")
+    print(f"legacy    {line_count / legacy_seconds:>10,.0f} lines/s")
+    print(f"compiled  {line_count / compiled_seconds:>10,.0f} lines/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--update', action='store_true', help='rewrite the golden outputs')
+    parser.add_argument('--repeat', type=int, default=500, help='corpus copies in the benchmark document')
+    parser.add_argument('--rounds', type=int, default=5, help='timed runs per implementation')
+    args = parser.parse_args()
+
+    failures = check_goldens(args.update)
+    benchmark(args.repeat, args.rounds)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
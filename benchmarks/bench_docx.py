@@ -0,0 +1,245 @@
+"""Correctness check, throughput and memory benchmark for the streaming .docx extractor
+
+Each calendar_corpus/<name>.txt sample is written out as a .docx twice, one
+paragraph per line and as a table (day and event in separate cells), then
+extracted with docx_text and normalized. Both must match the sample's golden
+calendar_corpus/<name>.expected.txt, just as the text file does.
+
+Then larger documents (the corpus repeated) are extracted to measure throughput,
+and peak Python memory (tracemalloc) is compared with parsing the whole document
+XML at once, at several document sizes. Finally one document goes through the
+document processor's process_document against the S3 fake, with ranged GETs.
+
+    python benchmarks/bench_docx.py
+    python benchmarks/bench_docx.py --repeat 400 --sizes 25,100,400 --save /tmp/docx-samples
+    python benchmarks/bench_docx.py --files policy.docx calendar.docx   # also time real documents
+"""
+import argparse
+import difflib
+import glob
+import io
+import os
+import re
+import sys
+import time
+import tracemalloc
+import zipfile
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+import docx_text  # noqa: E402
+from calendar_normalizer import CalendarNormalizer  # noqa: E402
+
+CORPUS_DIR = os.path.join(HERE, 'calendar_corpus')
+# Fixed so goldens do not depend on today's date (as in bench_calendar_normalizer.py)
+DEFAULT_YEAR = '2025'
+REGION = 'us-east-1'
+BUCKET = 'school-qa-docs-v2'
+MB = 1024 * 1024
+
+_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+    'officeDocument" Target="word/document.xml"/></Relationships>'
+)
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>'
+)
+# "Monday 8 th Year 6 ..." -> day cell, event cell
+_DAY_RE = re.compile(r'^((?:Mon|Tues|Wednes|Thurs|Fri|Satur|Sun)day \d{1,2} ?(?:st|nd|rd|th))\s+(.*)$')
+
+
+def corpus_samples():
+    """Paths of the calendar samples that have a golden output"""
+    paths = sorted(glob.glob(os.path.join(CORPUS_DIR, '*.txt')))
+    return [p for p in paths if not p.endswith('.expected.txt')]
+
+
+def paragraph(text):
+    """WordprocessingML paragraph for one line, with run properties as Word writes them"""
+    return (f'<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr>'
+            f'<w:r><w:rPr><w:sz w:val="22"/></w:rPr><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>')
+
+
+def table_row(cells):
+    """WordprocessingML table row"""
+    return '<w:tr>' + ''.join(f'<w:tc><w:tcPr/>{paragraph(cell)}</w:tc>' for cell in cells) + '</w:tr>'
+
+
+def body_xml(lines, layout):
+    """Body content for lines: one paragraph each, or consecutive dated lines as table rows"""
+    parts, rows = [], []
+    for line in lines:
+        match = _DAY_RE.match(line) if layout == 'table' else None
+        if match:
+            rows.append(table_row(match.groups()))
+            continue
+        if rows:
+            parts.append('<w:tbl><w:tblPr/>' + ''.join(rows) + '</w:tbl>')
+            rows = []
+        parts.append(paragraph(line))
+    if rows:
+        parts.append('<w:tbl><w:tblPr/>' + ''.join(rows) + '</w:tbl>')
+    return ''.join(parts)
+
+
+def build_docx(lines, layout='paragraphs'):
+    """Bytes of a minimal, valid .docx holding lines"""
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{_NAMESPACE}">'
+                f'<w:body>{body_xml(lines, layout)}<w:sectPr/></w:body></w:document>')
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _RELS)
+        archive.writestr('word/document.xml', document)
+    return buffer.getvalue()
+
+
+def xml_size(docx):
+    """Uncompressed size of the main document XML"""
+    with zipfile.ZipFile(io.BytesIO(docx)) as archive:
+        return archive.getinfo(docx_text.main_document_part(archive)).file_size
+
+
+def check_goldens(save_dir):
+    """Both .docx layouts of every sample must normalize to its golden; returns mismatches"""
+    failures = 0
+    for path in corpus_samples():
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().split('\n')
+        with open(path[:-len('.txt')] + '.expected.txt', encoding='utf-8') as f:
+            expected = f.read()
+        for layout in ('paragraphs', 'table'):
+            docx = build_docx(lines, layout)
+            if save_dir:
+                name = os.path.basename(path)[:-len('.txt')]
+                with open(os.path.join(save_dir, f"{name}.{layout}.docx"), 'wb') as f:
+                    f.write(docx)
+            normalizer = CalendarNormalizer(default_year=DEFAULT_YEAR)
+            actual = normalizer.normalize(docx_text.iter_docx_lines(io.BytesIO(docx))) + '\n'
+            label = f"{os.path.basename(path)} ({layout})"
+            if actual == expected:
+                print(f"ok      {label}")
+            else:
+                failures += 1
+                print(f"FAILED  {label}")
+                sys.stdout.writelines(difflib.unified_diff(
+                    expected.splitlines(True), actual.splitlines(True), 'expected', 'actual'))
+    return failures
+
+
+def corpus_document(repeat, layout='table'):
+    """One large .docx: the calendar corpus repeated"""
+    lines = []
+    for path in corpus_samples():
+        with open(path, encoding='utf-8') as f:
+            lines.extend(f.read().split('\n'))
+    return build_docx(lines * repeat, layout)
+
+
+def whole_tree_lines(fileobj):
+    """Baseline: read the document XML whole and parse it into one tree"""
+    with zipfile.ZipFile(fileobj) as archive:
+        root = ElementTree.fromstring(archive.read(docx_text.main_document_part(archive)))
+    t = f'{{{_NAMESPACE}}}t'
+    return [''.join(node.text or '' for node in p.iter(t)) for p in root.iter(f'{{{_NAMESPACE}}}p')]
+
+
+def peak_memory(function, docx):
+    """Peak traced Python allocations (bytes) while function consumes the document"""
+    tracemalloc.start()
+    try:
+        for _ in function(io.BytesIO(docx)):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def best_of(rounds, function):
+    """Fastest of several timed runs, to keep scheduler noise out of the comparison"""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def throughput(label, docx, rounds):
+    """Print lines/s and XML MB/s of the streaming extractor on one document"""
+    lines = sum(1 for _ in docx_text.iter_docx_lines(io.BytesIO(docx)))
+    seconds = best_of(rounds, lambda: sum(1 for _ in docx_text.iter_docx_lines(io.BytesIO(docx))))
+    megabytes = xml_size(docx) / MB
+    print(f"{label:<34}{len(docx) / MB:>8.2f}{megabytes:>9.2f}{lines:>9}{lines / seconds:>12,.0f}"
+          f"{megabytes / seconds:>10.1f}")
+
+
+def through_processor(docx):
+    """Run process_document on the document in the S3 fake; returns (seconds, GETs, output chars, events)"""
+    os.environ.update({'AWS_DEFAULT_REGION': REGION, 'EMF_METRICS': 'false'})
+    import fakes  # noqa: E402
+    aws = fakes.FakeAWS()
+    aws.install(REGION)
+    import lambda_document_processor  # noqa: E402
+
+    key = 'school-docs/autumn_term_calendar.docx'
+    aws.s3.put(BUCKET, key, docx)
+    events = []
+    calls_before = aws.s3.profile.calls
+    started = time.perf_counter()
+    output = sum(len(chunk) for chunk in lambda_document_processor.process_document(aws.s3, BUCKET, key, events))
+    return time.perf_counter() - started, aws.s3.profile.calls - calls_before, output, len(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help='corpus copies in the throughput document')
+    parser.add_argument('--sizes', default='25,100,400', help='corpus copies for the memory comparison')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--files', nargs='*', default=[], help='real .docx files to time as well')
+    parser.add_argument('--save', help='directory to write the generated sample .docx files to')
+    args = parser.parse_args()
+
+    if args.save:
+        os.makedirs(args.save, exist_ok=True)
+    failures = check_goldens(args.save)
+
+    print(f"\n{'document':<34}{'docx MB':>8}{'XML MB':>9}{'lines':>9}{'lines/s':>12}{'XML MB/s':>10}")
+    large = corpus_document(args.repeat)
+    throughput(f"corpus x{args.repeat} (table)", large, args.rounds)
+    throughput(f"corpus x{args.repeat} (paragraphs)", corpus_document(args.repeat, 'paragraphs'), args.rounds)
+    for path in args.files:
+        with open(path, 'rb') as f:
+            throughput(os.path.basename(path)[:33], f.read(), args.rounds)
+
+    print(f"\n{'peak memory':<16}{'XML MB':>9}{'streaming MB':>14}{'whole tree MB':>15}")
+    for repeat in (int(size) for size in args.sizes.split(',')):
+        docx = corpus_document(repeat)
+        streaming = peak_memory(docx_text.iter_docx_lines, docx)
+        whole = peak_memory(whole_tree_lines, docx)
+        print(f"{'corpus x' + str(repeat):<16}{xml_size(docx) / MB:>9.2f}{streaming / MB:>14.2f}{whole / MB:>15.2f}")
+
+    seconds, requests, output, events = through_processor(large)
+    print(f"\nprocess_document on corpus x{args.repeat} via the S3 fake: {seconds:.2f}s, "
+          f"{requests} S3 requests (HEAD and ranged GETs), {output:,} characters of cleaned text, "
+          f"{events:,} calendar events")
+
+    if failures:
+        print(f"\n{failures} golden mismatch(es)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
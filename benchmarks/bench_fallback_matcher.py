@@ -0,0 +1,91 @@
+"""Benchmark: legacy substring scan vs the compiled FallbackMatcher on large synthetic keyword sets
+
+    python benchmarks/bench_fallback_matcher.py [--answers 2000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fallback_matcher import FallbackMatcher  # noqa: E402
+
+WORDS = ('term', 'dates', 'staff', 'club', 'trip', 'uniform', 'lunch', 'menu', 'sports', 'day',
+         'homework', 'policy', 'parents', 'evening', 'class', 'year', 'music', 'lessons',
+         'admissions', 'governors', 'calendar', 'events', 'fair', 'christmas', 'nativity')
+
+
+def legacy_link(config, question, answer):
+    """The original get_fallback_link matching logic, kept here for comparison"""
+    uncertainty_detected = any(keyword.lower() in answer.lower()
+                               for keyword in config['uncertainty_keywords'])
+    if not uncertainty_detected:
+        return None
+    question_lower = question.lower()
+    fallback_links = config['fallback_links']
+    for topic, link in fallback_links.items():
+        if topic != 'default' and topic in question_lower:
+            return link
+    return fallback_links['default']
+
+
+def synthetic_config(base, size, rng):
+    """Extend the real fallback config with `size` generated topics and keywords"""
+    config = {
+        'fallback_links': dict(base['fallback_links']),
+        'uncertainty_keywords': list(base['uncertainty_keywords']),
+    }
+    while len(config['fallback_links']) < size:
+        topic = ' '.join(rng.sample(WORDS, rng.randint(1, 3))) + f" {len(config['fallback_links'])}"
+        config['fallback_links'][topic] = f"https://example.org/{len(config['fallback_links'])}"
+    while len(config['uncertainty_keywords']) < size:
+        phrase = ' '.join(rng.sample(WORDS, rng.randint(2, 4)))
+        config['uncertainty_keywords'].append(f"cannot confirm {phrase} {len(config['uncertainty_keywords'])}")
+    return config
+
+
+def synthetic_traffic(count, rng):
+    """Questions and answers shaped like real traffic, about a third of them uncertain"""
+    traffic = []
+    for i in range(count):
+        question = f"when is the {' '.join(rng.sample(WORDS, 3))} for year {rng.randint(1, 6)}?"
+        answer = ' '.join(rng.choice(WORDS) for _ in range(60))
+        if i % 3 == 0:
+            answer += ' Unfortunately the documents do not seem to mention this.'
+        traffic.append((question, answer))
+    return traffic
+
+
+def time_per_call(fn, traffic):
+    started = time.perf_counter()
+    for question, answer in traffic:
+        fn(question, answer)
+    return (time.perf_counter() - started) / len(traffic) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--answers', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with open(os.path.join(os.path.dirname(__file__), '..', 'fallback_links.json')) as f:
+        base = json.load(f)
+    traffic = synthetic_traffic(args.answers, rng)
+
+    print(f"{'entries':>8} {'legacy us/call':>15} {'compiled us/call':>17} {'compile ms':>11}")
+    for size in (len(base['fallback_links']), 100, 500, 2000):
+        config = synthetic_config(base, size, rng)
+        started = time.perf_counter()
+        matcher = FallbackMatcher.from_config(config)
+        compile_ms = (time.perf_counter() - started) * 1000
+        legacy = time_per_call(lambda q, a: legacy_link(config, q, a), traffic)
+        compiled = time_per_call(matcher.link_for, traffic)
+        print(f"{size:>8} {legacy:>15.1f} {compiled:>17.1f} {compile_ms:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Compare filtered and unfiltered retrieval on a fixture document set
+
+The fixture set is a few years of calendars (the calendar_corpus samples
+re-dated 2019-2025, as an archive of past calendars would be), plus the
+staffing, timetable, policy and newsletter documents in retrieval_fixtures/.
+Each document is processed as the Lambda would process it: calendars are
+normalized, text is chunked, and the .metadata.json attributes come from
+DocumentProfile. Questions in retrieval_fixtures/questions.json name the
+document that should answer them.
+
+A TF-IDF cosine search stands in for the knowledge base's vector search. The
+filter for each question is built with question_filter(), as in the app, and
+applied before scoring, the way a vector store pre-filters by metadata.
+
+    python benchmarks/bench_retrieval_filters.py
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from calendar_normalizer import CalendarNormalizer  # noqa: E402
+from document_metadata import DocumentProfile, question_filter  # noqa: E402
+
+HERE = os.path.dirname(__file__)
+CALENDAR_DIR = os.path.join(HERE, 'calendar_corpus')
+FIXTURE_DIR = os.path.join(HERE, 'retrieval_fixtures')
+ARCHIVE_YEARS = range(2019, 2026)
+CHUNK_CHARS = 400
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_STOP_WORDS = frozenset('a an and are at do does for in is of on the to what when which who'.split())
+
+
+def words(text):
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOP_WORDS]
+
+
+def shift_years(text, shift):
+    return re.sub(r'(?<!\d)(20\d{2})(?!\d)', lambda m: str(int(m[1]) + shift), text)
+
+
+def load_documents():
+    """Return [(name, processed text, metadata attributes)] for the fixture set"""
+    documents = []
+    for filename in sorted(os.listdir(CALENDAR_DIR)):
+        if not filename.endswith('.txt') or filename.endswith('.expected.txt'):
+            continue
+        with open(os.path.join(CALENDAR_DIR, filename), encoding='utf-8') as f:
+            raw = f.read()
+        for year in ARCHIVE_YEARS:
+            text = shift_years(raw, year - 2025)
+            years = re.findall(r'(?<!\d)20\d{2}(?!\d)', text)
+            name = f"{filename[:-4]}_{min(years) if years else year}"
+            profile = DocumentProfile(filename)
+            normalizer = CalendarNormalizer(default_year=year, on_event=lambda e: profile.observe_events([e]))
+            processed = normalizer.normalize(text.split('\n'))
+            profile.observe_text(processed)
+            documents.append((name, processed, profile.attributes()))
+
+    for filename in sorted(os.listdir(FIXTURE_DIR)):
+        if not filename.endswith('.txt'):
+            continue
+        with open(os.path.join(FIXTURE_DIR, filename), encoding='utf-8') as f:
+            processed = ' '.join(f.read().split())
+        profile = DocumentProfile(filename)
+        profile.observe_text(processed)
+        documents.append((filename[:-4], processed, profile.attributes()))
+    return documents
+
+
+def chunk(text):
+    """Split processed text into chunks of about CHUNK_CHARS on line/sentence boundaries"""
+    pieces = re.split(r'(?<=\n)|(?<=\. )', text)
+    chunks, current = [], ''
+    for piece in pieces:
+        if current and len(current) + len(piece) > CHUNK_CHARS:
+            chunks.append(current.strip())
+            current = ''
+        current += piece
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+
+def matches(attributes, condition):
+    """Evaluate a Bedrock retrieval filter against metadata attributes"""
+    if 'andAll' in condition:
+        return all(matches(attributes, c) for c in condition['andAll'])
+    if 'orAll' in condition:
+        return any(matches(attributes, c) for c in condition['orAll'])
+    if 'equals' in condition:
+        return attributes.get(condition['equals']['key']) == condition['equals']['value']
+    if 'notEquals' in condition:
+        return attributes.get(condition['notEquals']['key']) != condition['notEquals']['value']
+    if 'listContains' in condition:
+        return condition['listContains']['value'] in attributes.get(condition['listContains']['key'], [])
+    raise ValueError(f"Unsupported filter: {condition}")
+
+
+class TfidfIndex:
+    """Brute-force TF-IDF cosine search over chunks, standing in for vector search"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        document_frequency = Counter()
+        for _, text, _ in chunks:
+            document_frequency.update(set(words(text)))
+        self.idf = {w: math.log(len(chunks) / df) + 1 for w, df in document_frequency.items()}
+        self.vectors = [self._vector(text) for _, text, _ in chunks]
+
+    def _vector(self, text):
+        counts = Counter(words(text))
+        vector = {w: c * self.idf.get(w, 0.0) for w, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {w: v / norm for w, v in vector.items()}
+
+    def search(self, question, limit, retrieval_filter=None):
+        """Return (top chunk positions, number of chunks scored)"""
+        query = self._vector(question)
+        scored = []
+        for position, (_, _, attributes) in enumerate(self.chunks):
+            if retrieval_filter and not matches(attributes, retrieval_filter):
+                continue
+            vector = self.vectors[position]
+            scored.append((sum(weight * vector.get(w, 0.0) for w, weight in query.items()), position))
+        scored.sort(reverse=True)
+        return [position for _, position in scored[:limit]], len(scored)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--limit', type=int, default=5, help='results per query (SEARCH_RESULTS_LIMIT)')
+    parser.add_argument('--rounds', type=int, default=20, help='timed repetitions of the question set')
+    args = parser.parse_args()
+
+    documents = load_documents()
+    chunks = [(name, text, attributes) for name, body, attributes in documents for text in chunk(body)]
+    index = TfidfIndex(chunks)
+    with open(os.path.join(FIXTURE_DIR, 'questions.json'), encoding='utf-8') as f:
+        questions = json.load(f)
+    print(f"{len(documents)} documents, {len(chunks)} chunks, {len(questions)} questions\n")
+
+    totals = {}
+    for mode in ('unfiltered', 'filtered'):
+        top1 = hits = relevant = scored_total = 0
+        for item in questions:
+            retrieval_filter = question_filter(item['question']) if mode == 'filtered' else None
+            positions, scored = index.search(item['question'], args.limit, retrieval_filter)
+            if retrieval_filter and not positions:
+                # Same fallback as the app: a filter that matches nothing searches everything
+                positions, scored = index.search(item['question'], args.limit)
+            names = [chunks[p][0] for p in positions]
+            top1 += bool(names) and names[0] == item['expected']
+            hits += item['expected'] in names
+            relevant += names.count(item['expected'])
+            scored_total += scored
+            if mode == 'filtered' and names[:1] != [item['expected']]:
+                print(f"  top result for {item['question']!r}: {names[:1]} (filter {json.dumps(retrieval_filter)})")
+
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for item in questions:
+                retrieval_filter = question_filter(item['question']) if mode == 'filtered' else None
+                index.search(item['question'], args.limit, retrieval_filter)
+        per_query_ms = (time.perf_counter() - started) * 1000 / (args.rounds * len(questions))
+
+        count = len(questions)
+        totals[mode] = (top1 / count, hits / count, relevant / (count * args.limit),
+                        scored_total / count, per_query_ms)
+
+    print(f"\n{'':<11}{'top-1':>8}{'hit@k':>8}{'prec@k':>8}{'chunks scored':>15}{'ms/query':>10}")
+    for mode, (top1, hit, precision, scored, ms) in totals.items():
+        print(f"{mode:<11}{top1:>8.0%}{hit:>8.0%}{precision:>8.0%}{scored:>15.0f}{ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Replay S3 upload notifications through a simulated SQS queue into the document processor
+
+Builds SQS events locally (one S3 notification per message, as S3 sends them to a
+queue), including a corrupt PDF that Textract rejects and a message that is not an
+S3 notification at all, and feeds them to lambda_document_processor.sqs_handler
+against the AWS fakes. Failed messages are redelivered with a higher receive
+count until they succeed or are dead-lettered, two ways:
+
+  whole batch   the previous entry point behind a queue: every file of the batch
+                goes through lambda_handler and any failure returns every message;
+                SQS redrive moves a message to its DLQ after --attempts receives
+  per message   sqs_handler: only the messages listed in batchItemFailures come
+                back, and it parks poison messages under the dead-letter prefix
+
+    python benchmarks/bench_sqs_batches.py
+    python benchmarks/bench_sqs_batches.py --documents 40 --batch-size 10 --textract-ms 80
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+REGION = 'us-east-1'
+BUCKET = 'school-qa-docs-v2'
+
+
+def upload_documents(s3, prefix, count, corrupt_document):
+    """Put count documents (every third a 'PDF') plus one corrupt PDF; returns their keys"""
+    keys = []
+    for number in range(count):
+        text = f"Newsletter {number}\n\nSports day is on Friday.\n\nClubs restart next week."
+        if number % 3 == 2:
+            key = f"{prefix}scan-{number}.pdf"
+            s3.put(BUCKET, key, text.replace('\n\n', '\f'))
+        else:
+            key = f"{prefix}newsletter-{number}.txt"
+            s3.put(BUCKET, key, text)
+        keys.append(key)
+    key = f"{prefix}damaged scan.pdf"
+    s3.put(BUCKET, key, corrupt_document + b' not really a PDF')
+    keys.append(key)
+    return keys
+
+
+def whole_batch_succeeds(lambda_module, messages):
+    """Previous behaviour: all files of the batch through lambda_handler; any failure fails the batch"""
+    records = []
+    for message in messages:
+        try:
+            records.extend(json.loads(message['body'])['Records'])
+        except (ValueError, KeyError, TypeError):
+            return False
+    return lambda_module.lambda_handler({'Records': records}, None)['statusCode'] == 200
+
+
+def replay(lambda_module, fakes, keys, args, partial):
+    """Deliver one message per key (plus one unreadable message) until the queue drains"""
+    queue = deque(
+        (f"msg-{index}", [fakes.s3_event_record(BUCKET, key)], 1) for index, key in enumerate(keys)
+    )
+    # The corrupt PDF is uploaded last; put it at the front and the unreadable message in the middle
+    queue.rotate(1)
+    queue.insert(len(queue) // 2, ('msg-unreadable', None, 1))
+    receives = invocations = redriven = 0
+    started = time.perf_counter()
+    while queue and invocations < args.max_invocations:
+        batch = [queue.popleft() for _ in range(min(args.batch_size, len(queue)))]
+        messages = []
+        for message_id, records, count in batch:
+            if records is None:
+                messages.append({'messageId': message_id, 'body': 'not json',
+                                 'attributes': {'ApproximateReceiveCount': str(count)}})
+            else:
+                messages.append(fakes.sqs_message(records, message_id, count))
+        receives += len(batch)
+        invocations += 1
+        if partial:
+            response = lambda_module.sqs_handler({'Records': messages}, None)
+            failed = {item['itemIdentifier'] for item in response['batchItemFailures']}
+        elif whole_batch_succeeds(lambda_module, messages):
+            failed = set()
+        else:
+            failed = {message_id for message_id, _, _ in batch}
+        for message_id, records, count in batch:
+            if message_id not in failed:
+                continue
+            if not partial and count >= args.attempts:
+                redriven += 1
+                continue
+            queue.append((message_id, records, count + 1))
+    return {
+        'seconds': time.perf_counter() - started,
+        'invocations': invocations,
+        'receives': receives,
+        'redriven': redriven,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=30, help='good documents uploaded')
+    parser.add_argument('--batch-size', type=int, default=10, help='messages per invocation (SQS batch size)')
+    parser.add_argument('--attempts', type=int, default=3, help='receives before a message is dead-lettered')
+    parser.add_argument('--textract-ms', type=float, default=50, help='latency of each Textract call')
+    parser.add_argument('--s3-ms', type=float, default=5, help='latency of each S3 call')
+    parser.add_argument('--max-invocations', type=int, default=200)
+    parser.add_argument('--verbose', action='store_true', help="show the document processor's log lines")
+    args = parser.parse_args()
+
+    os.environ.update({'AWS_DEFAULT_REGION': REGION, 'EMF_METRICS': 'false',
+                       'DEAD_LETTER_AFTER_ATTEMPTS': str(args.attempts)})
+    import fakes  # noqa: E402
+    aws = fakes.FakeAWS(s3=fakes.ServiceProfile(latency_ms=args.s3_ms),
+                        textract=fakes.ServiceProfile(latency_ms=args.textract_ms))
+    aws.install(REGION)
+    aws.s3_event_record, aws.sqs_message = fakes.s3_event_record, fakes.sqs_message
+
+    # Count text extractions per document to see which files were OCR'd more than once
+    extractions = Counter()
+    lock = threading.Lock()
+    real_start = aws.textract.start_document_text_detection
+
+    def counting_start(DocumentLocation, **kwargs):
+        with lock:
+            extractions[DocumentLocation['S3Object']['Name']] += 1
+        return real_start(DocumentLocation, **kwargs)
+
+    aws.textract.start_document_text_detection = counting_start
+    import lambda_document_processor  # noqa: E402
+
+    rows = []
+    for label, partial in (('whole batch', False), ('per message', True)):
+        prefix = f"school-docs/{label.replace(' ', '-')}/"
+        keys = upload_documents(aws.s3, prefix, args.documents, fakes.CORRUPT_DOCUMENT)
+        dead_letters_before = {key for (_, key) in aws.s3.objects if key.startswith('state/dead-letter/')}
+        gets_before = aws.s3.profile.calls
+        with lock:
+            extractions.clear()
+        log = io.StringIO()
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+            result = replay(lambda_document_processor, aws, keys, args, partial)
+        dead_letters = [key for (_, key) in aws.s3.objects
+                        if key.startswith('state/dead-letter/') and key not in dead_letters_before]
+        processed = [key for key in keys if lambda_document_processor.manifest.entry(key)]
+        result.update(
+            label=label,
+            extractions=sum(extractions.values()),
+            repeated=sum(count - 1 for key, count in extractions.items() if 'damaged' not in key),
+            dead_lettered=len(dead_letters) + result['redriven'],
+            processed=len(processed),
+            s3_calls=aws.s3.profile.calls - gets_before,
+        )
+        for key in dead_letters:
+            body = json.loads(aws.s3.objects[(BUCKET, key)][0])
+            result.setdefault('dead_letter_errors', []).append(f"{body['message_id']}: {body['errors'][0][:70]}")
+        rows.append(result)
+
+    messages = args.documents + 2
+    print(f"{messages} messages ({args.documents} good documents, 1 corrupt PDF, 1 unreadable), "
+          f"batches of {args.batch_size}, dead-letter after {args.attempts} receives\n")
+    print(f"{'mode':<13}{'seconds':>9}{'invocations':>13}{'receives':>10}{'textract':>10}"
+          f"{'re-OCR':>8}{'S3 calls':>10}{'processed':>11}{'dead-lettered':>15}")
+    for row in rows:
+        print(f"{row['label']:<13}{row['seconds']:>9.2f}{row['invocations']:>13}{row['receives']:>10}"
+              f"{row['extractions']:>10}{row['repeated']:>8}{row['s3_calls']:>10}"
+              f"{row['processed']:>8}/{len(keys):<2}{row['dead_lettered']:>15}")
+    for error in rows[-1].get('dead_letter_errors', []):
+        print(f"  dead letter {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark admin document uploads against a local S3 stand-in
+
+Uploads the same batch of generated documents two ways through a real boto3 S3
+client pointed at benchmarks/local_s3.py (latency per request, bandwidth per
+connection):
+
+  one by one   upload_fileobj with default settings, one file after another, as the
+               single-file upload panel did
+  batch        qa_core.start_upload_batch: files in parallel, tuned multipart parts,
+               per-file progress, one knowledge base sync request for the batch
+
+Every uploaded object is checked byte for byte and for its uploaded_by metadata.
+
+    python benchmarks/bench_uploads.py
+    python benchmarks/bench_uploads.py --small 10 --medium 4 --large 2 --latency-ms 40 --mbps 20
+    UPLOAD_CONCURRENCY=8 UPLOAD_PART_SIZE_MB=5 python benchmarks/bench_uploads.py
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+REGION = 'us-east-1'
+BUCKET = 'school-qa-docs-v2'
+MB = 1024 * 1024
+
+
+def make_documents(args):
+    """(filename, bytes) for a term's worth of small, medium and large documents"""
+    rng = random.Random(args.seed)
+    documents = []
+    for label, count, size in (('newsletter', args.small, args.small_kb * 1024),
+                               ('policy', args.medium, int(args.medium_mb * MB)),
+                               ('scanned-calendar', args.large, int(args.large_mb * MB))):
+        for number in range(count):
+            documents.append((f"{label}-{number + 1}.pdf", rng.randbytes(size)))
+    return documents
+
+
+def check_uploads(s3, documents, prefix, uploaded_by):
+    """Raise if any object is missing, different, or lost its uploaded_by metadata"""
+    for filename, body in documents:
+        key = f"{prefix}{filename}"
+        stored = s3.objects.get((BUCKET, key))
+        if stored is None or stored[0] != body:
+            raise AssertionError(f"{key} is missing or differs")
+        if s3.metadata.get((BUCKET, key), {}).get('uploaded_by') != uploaded_by:
+            raise AssertionError(f"{key} lost its uploaded_by metadata")
+
+
+def one_by_one(client, documents, prefix):
+    """The previous panel: default upload_fileobj, one file at a time"""
+    started = time.perf_counter()
+    for filename, body in documents:
+        client.upload_fileobj(io.BytesIO(body), BUCKET, f"{prefix}{filename}",
+                              ExtraArgs={'Metadata': {'uploaded_by': 'admin'}})
+    return time.perf_counter() - started
+
+
+def batch(qa_core, documents):
+    """The new panel: one concurrent batch; returns (seconds, progress snapshots seen, sync requests)"""
+    sync_requests = []
+    real_sync = qa_core.sync_knowledge_base
+
+    def counting_sync(changed_keys=None):
+        sync_requests.append(changed_keys)
+        return real_sync(changed_keys)
+
+    qa_core.sync_knowledge_base = counting_sync
+    try:
+        started = time.perf_counter()
+        upload = qa_core.start_upload_batch(
+            [(io.BytesIO(body), filename, len(body)) for filename, body in documents], 'admin'
+        )
+        # Poll as the Streamlit panel does, counting how often bars would move
+        partial_updates = 0
+        while not upload.wait(0.05):
+            partial_updates += sum(1 for entry in upload.progress() if 0 < entry['sent'] < entry['size'])
+        seconds = time.perf_counter() - started
+    finally:
+        qa_core.sync_knowledge_base = real_sync
+    failed = [entry for entry in upload.results() if entry['state'] != 'done']
+    if failed:
+        raise AssertionError(f"{len(failed)} uploads failed: {failed[0]['error']}")
+    return seconds, partial_updates, sync_requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--small', type=int, default=8, help='small documents (newsletters)')
+    parser.add_argument('--small-kb', type=int, default=300)
+    parser.add_argument('--medium', type=int, default=4, help='medium documents (policies)')
+    parser.add_argument('--medium-mb', type=float, default=4)
+    parser.add_argument('--large', type=int, default=2, help='large documents (scans)')
+    parser.add_argument('--large-mb', type=float, default=30)
+    parser.add_argument('--latency-ms', type=float, default=30, help='added to every S3 request')
+    parser.add_argument('--mbps', type=float, default=40, help='upload bandwidth per connection (megabits/s)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.update({'AWS_DEFAULT_REGION': REGION, 'AWS_REGION': REGION, 'EMF_METRICS': 'false',
+                       'AWS_ACCESS_KEY_ID': 'bench', 'AWS_SECRET_ACCESS_KEY': 'bench'})
+    from aws_clients import get_client, set_client  # noqa: E402
+    from fakes import FakeBedrockAgent  # noqa: E402
+    from local_s3 import LocalS3  # noqa: E402
+
+    documents = make_documents(args)
+    total_mb = sum(len(body) for _, body in documents) / MB
+    with LocalS3(latency_ms=args.latency_ms, mbps_per_connection=args.mbps) as s3:
+        client = get_client('s3', region_name=REGION, endpoint_url=s3.url)
+        set_client('s3', client, region_name=REGION)
+        set_client('bedrock-agent', FakeBedrockAgent(), region_name=REGION)
+        import qa_core  # noqa: E402
+
+        print(f"{len(documents)} documents, {total_mb:.1f} MB; S3 stand-in: {args.latency_ms:.0f} ms per request, "
+              f"{args.mbps:.0f} Mbit/s per connection")
+        baseline = one_by_one(client, documents, 'baseline/')
+        check_uploads(s3, documents, 'baseline/', 'admin')
+        before = dict(s3.requests)
+
+        seconds, partial_updates, sync_requests = batch(qa_core, documents)
+        check_uploads(s3, documents, qa_core.S3_PREFIX, 'admin')
+        requests = {name: count - before.get(name, 0) for name, count in s3.requests.items()}
+
+    print(f"\n{'mode':<14}{'seconds':>9}{'MB/s':>8}")
+    print(f"{'one by one':<14}{baseline:>9.2f}{total_mb / baseline:>8.1f}")
+    print(f"{'batch':<14}{seconds:>9.2f}{total_mb / seconds:>8.1f}   {baseline / seconds:.1f}x faster")
+    print(f"\nbatch requests: {requests}")
+    print(f"progress updates with partial bytes: {partial_updates}")
+    print(f"knowledge base sync requests for the batch: {len(sync_requests)} "
+          f"({len(sync_requests[0]) if sync_requests else 0} documents)")
+    print("all objects verified (content and uploaded_by metadata)")
+
+
+if __name__ == '__main__':
+    main()
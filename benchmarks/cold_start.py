@@ -0,0 +1,326 @@
+"""Cold-start report: import times, client creation and first-request latency, run locally
+
+Every measurement runs in a fresh Python process (repeated --runs times, medians
+reported), so nothing is warm except the operating system's file cache:
+
+  imports   time to import each entry module: the document processor Lambda, the
+            app's shared core, the query API service and Streamlit itself. The
+            repository's modules are compiled to bytecode first, as the Docker
+            build does, and are also imported from a copy without .pyc files, as
+            on Lambda when the zip ships without them (the code directory is
+            read-only, so they are compiled again on every cold start). The
+            modules with the largest self time are listed for each entry module.
+  clients   time to build each AWS client through aws_clients.get_client, in the
+            order the document processor and the app first need them (the first
+            also loads botocore's shared endpoint data)
+  lambda    against the AWS fakes: module import, the first upload event, then a
+            second upload event on the same (now warm) module
+  ask       against the AWS fakes: the first question through qa_core, then a second
+  app       the Streamlit page through streamlit.testing's AppTest: the first run
+            (which imports the app's modules) and a rerun; also lists heavy
+            libraries (numpy, PIL, ...) the page pulled in
+
+No AWS calls are made. Results are saved as JSON named after the current commit,
+and --compare prints the change against an earlier result file, exiting non-zero
+when a measurement grew by more than --max-regression (and by more than
+--min-change-ms, so millisecond noise does not fail the run).
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --runs 9 --probes imports,lambda
+    python benchmarks/cold_start.py --compare benchmarks/results/cold_start_<commit>.json
+"""
+import argparse
+import compileall
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, '..'))
+RESULTS_DIR = os.path.join(HERE, 'results')
+REGION = 'us-east-1'
+BUCKET = 'school-qa-docs-v2'
+
+PROBES = ('imports', 'clients', 'lambda', 'ask', 'app')
+# Entry modules, and whether they are this repository's (timed again without .pyc files)
+IMPORT_MODULES = (
+    ('lambda_document_processor', True),
+    ('qa_core', True),
+    ('api_service', True),
+    ('streamlit', False),
+)
+CLIENT_SERVICES = ('s3', 'bedrock-agent', 'textract', 'bedrock-agent-runtime', 'bedrock-runtime')
+# Large libraries the first page should not need
+HEAVY_MODULES = ('numpy', 'PIL', 'pandas', 'pyarrow', 'altair')
+TOP_MODULES = 5
+
+CHILD_ENV = {
+    'AWS_DEFAULT_REGION': REGION, 'AWS_REGION': REGION,
+    'AWS_ACCESS_KEY_ID': 'cold-start', 'AWS_SECRET_ACCESS_KEY': 'cold-start',
+    'EMF_METRICS': 'false', 'WARM_UP': 'false',
+    # Measure the bytecode prepared here, not whatever earlier runs left behind
+    'PYTHONDONTWRITEBYTECODE': '1',
+}
+
+
+def milliseconds(started):
+    """Milliseconds since a time.perf_counter() reading"""
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+# --- Probes: each runs in its own child process and returns {metric: milliseconds} ---
+
+def probe_import(module):
+    """Import one entry module"""
+    started = time.perf_counter()
+    __import__(module)
+    return {f"import {module}": milliseconds(started)}
+
+
+def probe_clients():
+    """Import boto3, then build each client the way the app and the Lambda do"""
+    started = time.perf_counter()
+    from aws_clients import get_client
+    timings = {'import boto3': milliseconds(started)}
+    for service in CLIENT_SERVICES:
+        started = time.perf_counter()
+        get_client(service)
+        timings[f"client {service}"] = milliseconds(started)
+    return timings
+
+
+def install_fakes():
+    """Wire the AWS fakes into aws_clients and seed the bucket; returns the FakeAWS"""
+    import load_test
+    aws = load_test.FakeAWS(load_test.knowledge_base_passages())
+    aws.install(REGION)
+    load_test.seed_bucket(aws.s3)
+    return aws
+
+
+def probe_lambda():
+    """Import the document processor, then handle two upload events"""
+    import fakes
+    aws = install_fakes()
+    started = time.perf_counter()
+    import lambda_document_processor
+    timings = {'lambda import': milliseconds(started)}
+    for label, name in (('lambda first upload', 'first'), ('lambda warm upload', 'second')):
+        key = f"school-docs/cold-start-{name}.txt"
+        aws.s3.put(BUCKET, key, f"The {name} newsletter.\n\nSports day is on Friday.")
+        started = time.perf_counter()
+        response = lambda_document_processor.lambda_handler({'Records': [fakes.s3_event_record(BUCKET, key)]}, None)
+        timings[label] = milliseconds(started)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"upload event failed: {response['body']}")
+    return timings
+
+
+def probe_ask():
+    """Import qa_core, then answer two different questions"""
+    install_fakes()
+    started = time.perf_counter()
+    import qa_core
+    timings = {'ask import': milliseconds(started)}
+    for label, question in (('ask first question', 'When is sports day?'),
+                            ('ask warm question', 'What are the PE days for year 5?')):
+        started = time.perf_counter()
+        qa_core.query_agentcore_runtime(question)
+        timings[label] = milliseconds(started)
+    return timings
+
+
+def probe_app(root):
+    """Run the Streamlit page once and rerun it, noting the heavy libraries it loaded"""
+    install_fakes()
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(os.path.join(root, 'app_agentcore.py'), default_timeout=60)
+    timings = {}
+    for label in ('app first run', 'app rerun'):
+        started = time.perf_counter()
+        app.run()
+        timings[label] = milliseconds(started)
+        if app.exception:
+            raise RuntimeError(f"app raised: {app.exception[0].message}")
+    return timings, sorted(name for name in HEAVY_MODULES if name in sys.modules)
+
+
+def run_probe(probe, root, module):
+    """Child process entry point: run one probe and print its result as JSON"""
+    output = io.StringIO()
+    details = None
+    with contextlib.redirect_stdout(output):
+        if probe == 'imports':
+            timings = probe_import(module)
+        elif probe == 'clients':
+            timings = probe_clients()
+        elif probe == 'lambda':
+            timings = probe_lambda()
+        elif probe == 'ask':
+            timings = probe_ask()
+        else:
+            timings, details = probe_app(root)
+    print(json.dumps({'timings': timings, 'details': details}))
+
+
+# --- Parent: start fresh processes and summarize ---
+
+def child(probe, root, module=None, flags=()):
+    """Run a probe in a new interpreter with root first on sys.path; returns (result, stderr)"""
+    command = [sys.executable, *flags, os.path.abspath(__file__), '--probe', probe, '--root', root]
+    if module:
+        command += ['--module', module]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=root, env={**os.environ, **CHILD_ENV})
+    if completed.returncode:
+        raise RuntimeError(f"{probe} probe failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def source_only_copy():
+    """Temporary copy of the repository's modules without any bytecode; returns its path"""
+    directory = tempfile.mkdtemp(prefix='cold-start-')
+    for name in os.listdir(ROOT):
+        if name.endswith(('.py', '.json')):
+            shutil.copy2(os.path.join(ROOT, name), directory)
+    return directory
+
+
+def top_self_times(stderr, limit=TOP_MODULES):
+    """Modules with the largest self time from -X importtime output, as [name, ms] pairs"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), name.strip()))
+    return [[name, round(us / 1000, 2)] for us, name in sorted(rows, reverse=True)[:limit]]
+
+
+def measure(probes, runs):
+    """Median timings of every probe over fresh processes; returns (timings, details)"""
+    samples, details = {}, {}
+    for directory in (ROOT, HERE):
+        compileall.compile_dir(directory, maxlevels=0, quiet=1)
+
+    def record(result):
+        """Add one child's timings to the samples"""
+        for metric, ms in result['timings'].items():
+            samples.setdefault(metric, []).append(ms)
+
+    for probe in probes:
+        if probe == 'imports':
+            source_root = source_only_copy()
+            try:
+                for module, own in IMPORT_MODULES:
+                    for _ in range(runs):
+                        record(child('imports', ROOT, module)[0])
+                        if own:
+                            result, _ = child('imports', source_root, module)
+                            record({'timings': {f"{metric}, no .pyc": ms for metric, ms in result['timings'].items()}})
+                    _, stderr = child('imports', ROOT, module, flags=('-X', 'importtime'))
+                    details.setdefault('import_self_ms', {})[module] = top_self_times(stderr)
+            finally:
+                shutil.rmtree(source_root, ignore_errors=True)
+            continue
+        for _ in range(runs):
+            result, _ = child(probe, ROOT)
+            record(result)
+            if result['details'] is not None:
+                details['app_heavy_modules'] = result['details']
+    return {metric: round(statistics.median(values), 2) for metric, values in samples.items()}, details
+
+
+def print_report(results):
+    """Timings in measurement order, then the slowest modules per entry point"""
+    print(f"commit {results['commit']}, median of {results['config']['runs']} fresh processes\n")
+    print(f"{'measurement':<54}{'ms':>10}")
+    for metric, ms in results['timings'].items():
+        print(f"{metric:<54}{ms:>10.1f}")
+    for module, top in results['details'].get('import_self_ms', {}).items():
+        print(f"\nslowest imports under {module} (self ms): " + ', '.join(f"{name} {ms}" for name, ms in top))
+    if 'app_heavy_modules' in results['details']:
+        heavy = results['details']['app_heavy_modules']
+        print(f"\nheavy libraries loaded by the first page: {', '.join(heavy) if heavy else 'none'}")
+
+
+def compare(baseline, current, max_regression, min_change_ms):
+    """Print the change of every measurement; return the regressions beyond the limits"""
+    regressions = []
+    print(f"\ncompared with {baseline.get('commit')} ({baseline.get('timestamp')})")
+    print(f"{'measurement':<54}{'before':>10}{'after':>10}{'change':>9}")
+    for metric, now in current['timings'].items():
+        before = baseline.get('timings', {}).get(metric)
+        if before is None:
+            continue
+        change = (now - before) / before if before else 0.0
+        print(f"{metric:<54}{before:>10.1f}{now:>10.1f}{change:>+9.0%}")
+        if change > max_regression and now - before > min_change_ms:
+            regressions.append(f"{metric} {before:.1f} -> {now:.1f} ms")
+    return regressions
+
+
+def main():
+    """Measure, print and save the cold-start report"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--probes', default=','.join(PROBES), help='comma-separated measurements to run')
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per measurement')
+    parser.add_argument('--output', help=f'results file (default {RESULTS_DIR}/cold_start_<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare with')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='with --compare: fail if a measurement grows by more than this fraction')
+    parser.add_argument('--min-change-ms', type=float, default=5.0,
+                        help='with --compare: ignore growth smaller than this many milliseconds')
+    parser.add_argument('--probe', choices=PROBES, help=argparse.SUPPRESS)
+    parser.add_argument('--root', help=argparse.SUPPRESS)
+    parser.add_argument('--module', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        # Child process: the code under test comes first, ahead of this directory
+        sys.path[:0] = [args.root, HERE]
+        run_probe(args.probe, args.root, args.module)
+        return
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, HERE)
+    from load_test import git_commit  # noqa: E402
+
+    probes = [name.strip() for name in args.probes.split(',') if name.strip()]
+    for name in probes:
+        if name not in PROBES:
+            parser.error(f"unknown probe {name!r}")
+    timings, details = measure(probes, args.runs)
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'config': {'probes': probes, 'runs': args.runs},
+        'timings': timings,
+        'details': details,
+    }
+
+    print_report(results)
+    path = args.output or os.path.join(RESULTS_DIR, f"cold_start_{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults saved to {path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.max_regression, args.min_change_ms)
+        if regressions:
+            print("regressions: " + '; '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,468 @@
+"""In-memory stand-ins for the AWS services the app and the document processor call
+
+Each fake has configurable latency (mean plus uniform jitter, in milliseconds) and
+throttling: a service-side limit on concurrent calls, above which calls fail with
+ThrottlingException the way Bedrock does, and an optional random throttle rate.
+Errors are real botocore ClientErrors, so retry and admission code paths behave
+as they do against AWS.
+
+    fakes = FakeAWS(passages, bedrock=ServiceProfile(latency_ms=800, max_concurrent=4))
+    fakes.install('us-east-1')   # before importing qa_core / lambda_document_processor
+"""
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from urllib.parse import quote_plus
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+
+# Start of a fake 'PDF' that FakeTextract cannot read
+CORRUPT_DOCUMENT = b'%CORRUPT'
+
+
+def client_error(code, status, operation):
+    """A botocore ClientError as the real client would raise it"""
+    return ClientError(
+        {'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status}},
+        operation
+    )
+
+
+class ServiceProfile:
+    """Latency and throttling behaviour of one fake service
+
+    Args:
+        latency_ms (float): Mean time per call
+        jitter_ms (float): Calls take latency_ms +/- up to jitter_ms
+        max_concurrent (int): Calls in flight beyond this are throttled (None: no limit)
+        throttle_rate (float): Fraction of calls throttled at random
+        token_ms (float): Streaming APIs: delay between answer chunks
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, max_concurrent=None, throttle_rate=0.0,
+                 token_ms=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.max_concurrent = max_concurrent
+        self.throttle_rate = throttle_rate
+        self.token_ms = token_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+
+    def delay(self):
+        """Seconds one call takes"""
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def enter(self, operation):
+        """Start a call, raising ThrottlingException if the service is over its limits"""
+        with self._lock:
+            self.calls += 1
+            over_limit = self.max_concurrent is not None and self.in_flight >= self.max_concurrent
+            if over_limit or (self.throttle_rate and self._rng.random() < self.throttle_rate):
+                self.throttled += 1
+                raise client_error('ThrottlingException', 400, operation)
+            self.in_flight += 1
+
+    def exit(self):
+        """Finish a call started with enter()"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def call(self, operation, produce):
+        """Run produce() as one call: admission, simulated latency, then the result"""
+        self.enter(operation)
+        try:
+            time.sleep(self.delay())
+            return produce()
+        finally:
+            self.exit()
+
+    def stats(self):
+        """Calls made and calls throttled so far"""
+        return {'calls': self.calls, 'throttled': self.throttled}
+
+
+class FakeS3:
+    """Objects in a dict, with ETags, conditional GET/PUT, ranged GETs and multipart uploads"""
+
+    def __init__(self, profile=None):
+        self.profile = profile or ServiceProfile()
+        self.objects = {}
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def put(self, bucket, key, body):
+        """Seed an object directly (no latency)"""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        with self._lock:
+            self.objects[(bucket, key)] = (bytes(body), f'"{hashlib.md5(body).hexdigest()}"')
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, IfMatch=None, Range=None, **kwargs):
+        def produce():
+            with self._lock:
+                stored = self.objects.get((Bucket, Key))
+            if stored is None:
+                raise client_error('NoSuchKey', 404, 'GetObject')
+            body, etag = stored
+            if IfNoneMatch is not None and IfNoneMatch == etag:
+                raise client_error('304', 304, 'GetObject')
+            if IfMatch is not None and IfMatch != etag:
+                raise client_error('PreconditionFailed', 412, 'GetObject')
+            if Range:
+                # Only the 'bytes=start-end' form that ranged readers send
+                start, _, end = Range[len('bytes='):].partition('-')
+                body = body[int(start):int(end) + 1]
+            return {'Body': StreamingBody(io.BytesIO(body), len(body)), 'ETag': etag,
+                    'ContentLength': len(body)}
+        return self.profile.call('GetObject', produce)
+
+    def head_object(self, Bucket, Key, **kwargs):
+        def produce():
+            with self._lock:
+                stored = self.objects.get((Bucket, Key))
+            if stored is None:
+                raise client_error('404', 404, 'HeadObject')
+            return {'ETag': stored[1], 'ContentLength': len(stored[0])}
+        return self.profile.call('HeadObject', produce)
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        def produce():
+            body = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            with self._lock:
+                current = self.objects.get((Bucket, Key))
+                if IfNoneMatch == '*' and current is not None:
+                    raise client_error('PreconditionFailed', 412, 'PutObject')
+                if IfMatch is not None and (current is None or current[1] != IfMatch):
+                    raise client_error('PreconditionFailed', 412, 'PutObject')
+                self.objects[(Bucket, Key)] = (body, etag)
+            return {'ETag': etag}
+        return self.profile.call('PutObject', produce)
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        def produce():
+            with self._lock:
+                self.objects.pop((Bucket, Key), None)
+            return {}
+        return self.profile.call('DeleteObject', produce)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, **kwargs):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj.read())
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        def produce():
+            with self._lock:
+                upload_id = f'upload-{len(self._uploads) + 1}'
+                self._uploads[upload_id] = {}
+            return {'UploadId': upload_id}
+        return self.profile.call('CreateMultipartUpload', produce)
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        def produce():
+            body = bytes(Body)
+            with self._lock:
+                self._uploads[UploadId][PartNumber] = body
+            return {'ETag': f'"{hashlib.md5(body).hexdigest()}"'}
+        return self.profile.call('UploadPart', produce)
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        def produce():
+            with self._lock:
+                parts = self._uploads.pop(UploadId)
+            body = b''.join(parts[part['PartNumber']] for part in MultipartUpload['Parts'])
+            self.put(Bucket, Key, body)
+            return {}
+        return self.profile.call('CompleteMultipartUpload', produce)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+
+def _words(text):
+    """Lowercased word set, for overlap scoring"""
+    return set(text.lower().replace('?', ' ').split())
+
+
+class FakeBedrockAgentRuntime:
+    """Knowledge base stand-in: retrieves passages by word overlap and 'generates' from them"""
+
+    def __init__(self, passages, profile=None):
+        self.profile = profile or ServiceProfile()
+        self.passages = passages
+
+    def _search(self, text, limit=5):
+        question = _words(text)
+        scored = sorted(((len(question & _words(p)), i) for i, p in enumerate(self.passages)), reverse=True)
+        return [(score, self.passages[i]) for score, i in scored[:limit] if score]
+
+    def _answer(self, text):
+        found = self._search(text, 1)
+        if not found:
+            return "Unfortunately I couldn't find that in the school documents."
+        return f"According to the school documents: {found[0][1][:300]}"
+
+    def _citations(self, text):
+        return [{'retrievedReferences': [{'content': {'text': p}} for _, p in self._search(text)]}]
+
+    def retrieve_and_generate(self, input, retrieveAndGenerateConfiguration, **kwargs):
+        return self.profile.call('RetrieveAndGenerate', lambda: {
+            'output': {'text': self._answer(input['text'])},
+            'citations': self._citations(input['text']),
+        })
+
+    def retrieve_and_generate_stream(self, input, retrieveAndGenerateConfiguration, **kwargs):
+        answer = self.profile.call('RetrieveAndGenerateStream', lambda: self._answer(input['text']))
+        return {'stream': _text_events(answer, self.profile.token_ms, lambda t: {'output': {'text': t}})}
+
+    def retrieve(self, knowledgeBaseId, retrievalQuery, retrievalConfiguration=None, **kwargs):
+        limit = (retrievalConfiguration or {}).get('vectorSearchConfiguration', {}).get('numberOfResults', 5)
+        return self.profile.call('Retrieve', lambda: {'retrievalResults': [
+            {'content': {'text': p}, 'score': score / 10,
+             'location': {'type': 'S3', 's3Location': {'uri': f's3://fake/doc{i}.txt'}}}
+            for i, (score, p) in enumerate(self._search(retrievalQuery['text'], limit))
+        ]})
+
+
+class FakeBedrockRuntime:
+    """Converse stand-in that echoes the first search result in the prompt"""
+
+    def __init__(self, profile=None):
+        self.profile = profile or ServiceProfile()
+
+    @staticmethod
+    def _answer(messages):
+        prompt = messages[-1]['content'][0]['text']
+        passage = prompt.split('\n[1] ', 1)[-1].split('\n', 2)[-1][:300]
+        return f"According to the school documents: {passage}"
+
+    def converse(self, modelId, messages, **kwargs):
+        return self.profile.call('Converse', lambda: {
+            'output': {'message': {'content': [{'text': self._answer(messages)}]}},
+            'usage': {'inputTokens': 400, 'outputTokens': 60},
+        })
+
+    def converse_stream(self, modelId, messages, **kwargs):
+        answer = self.profile.call('ConverseStream', lambda: self._answer(messages))
+        events = _text_events(answer, self.profile.token_ms,
+                              lambda t: {'contentBlockDelta': {'delta': {'text': t}}})
+        return {'stream': _with_metadata(events)}
+
+
+def _text_events(answer, token_ms, make_event, words_per_chunk=4):
+    """Yield the answer a few words at a time, token_ms apart"""
+    words = answer.split(' ')
+    for start in range(0, len(words), words_per_chunk):
+        if token_ms:
+            time.sleep(token_ms / 1000)
+        chunk = ' '.join(words[start:start + words_per_chunk])
+        yield make_event(chunk if start == 0 else ' ' + chunk)
+
+
+def _with_metadata(events):
+    """Follow stream events with converse_stream's usage metadata event"""
+    yield from events
+    yield {'metadata': {'usage': {'inputTokens': 400, 'outputTokens': 60}}}
+
+
+class FakeBedrockAgent:
+    """Ingestion jobs (one at a time, finishing after a fixed duration) and direct document
+    ingestion (each document indexed document_seconds after it is submitted)"""
+
+    def __init__(self, profile=None, job_seconds=5.0, document_seconds=2.0):
+        self.profile = profile or ServiceProfile()
+        self.job_seconds = job_seconds
+        self.document_seconds = document_seconds
+        self.jobs = []
+        self.documents = {}
+        self._lock = threading.Lock()
+
+    def _running(self):
+        """Jobs started less than job_seconds ago"""
+        return [job for job in self.jobs if time.monotonic() - job['started'] < self.job_seconds]
+
+    def start_ingestion_job(self, knowledgeBaseId, dataSourceId, **kwargs):
+        def produce():
+            with self._lock:
+                if self._running():
+                    raise client_error('ConflictException', 409, 'StartIngestionJob')
+                job = {'ingestionJobId': f'job-{len(self.jobs) + 1}', 'started': time.monotonic()}
+                self.jobs.append(job)
+            return {'ingestionJob': {'ingestionJobId': job['ingestionJobId'], 'status': 'STARTING'}}
+        return self.profile.call('StartIngestionJob', produce)
+
+    def list_ingestion_jobs(self, knowledgeBaseId, dataSourceId, filters=None, **kwargs):
+        def produce():
+            wanted = {value for f in filters or [] for value in f['values']}
+            with self._lock:
+                running = self._running()
+                summaries = [
+                    {'ingestionJobId': job['ingestionJobId'],
+                     'status': 'IN_PROGRESS' if job in running else 'COMPLETE'}
+                    for job in reversed(self.jobs)
+                ]
+            return {'ingestionJobSummaries': [s for s in summaries if not wanted or s['status'] in wanted][:1]}
+        return self.profile.call('ListIngestionJobs', produce)
+
+    def _document_status(self, uri):
+        """Status of a directly ingested document, advancing with time"""
+        action, submitted = self.documents.get(uri, (None, None))
+        if action is None:
+            return 'NOT_FOUND'
+        done = time.monotonic() - submitted >= self.document_seconds
+        if action == 'delete':
+            return 'NOT_FOUND' if done else 'DELETE_IN_PROGRESS'
+        return 'INDEXED' if done else 'IN_PROGRESS'
+
+    def _details(self, uris):
+        return {'documentDetails': [
+            {'identifier': {'dataSourceType': 'S3', 's3': {'uri': uri}}, 'status': self._document_status(uri)}
+            for uri in uris
+        ]}
+
+    def ingest_knowledge_base_documents(self, knowledgeBaseId, dataSourceId, documents, **kwargs):
+        def produce():
+            uris = [document['content']['s3']['s3Location']['uri'] for document in documents]
+            with self._lock:
+                for uri in uris:
+                    self.documents[uri] = ('ingest', time.monotonic())
+            return {'documentDetails': [
+                {'identifier': {'dataSourceType': 'S3', 's3': {'uri': uri}}, 'status': 'STARTING'} for uri in uris
+            ]}
+        return self.profile.call('IngestKnowledgeBaseDocuments', produce)
+
+    def delete_knowledge_base_documents(self, knowledgeBaseId, dataSourceId, documentIdentifiers, **kwargs):
+        def produce():
+            uris = [identifier['s3']['uri'] for identifier in documentIdentifiers]
+            with self._lock:
+                for uri in uris:
+                    self.documents[uri] = ('delete', time.monotonic())
+            return {'documentDetails': [
+                {'identifier': {'dataSourceType': 'S3', 's3': {'uri': uri}}, 'status': 'DELETING'} for uri in uris
+            ]}
+        return self.profile.call('DeleteKnowledgeBaseDocuments', produce)
+
+    def get_knowledge_base_documents(self, knowledgeBaseId, dataSourceId, documentIdentifiers, **kwargs):
+        def produce():
+            with self._lock:
+                return self._details([identifier['s3']['uri'] for identifier in documentIdentifiers])
+        return self.profile.call('GetKnowledgeBaseDocuments', produce)
+
+
+class FakeTextract:
+    """Text detection over 'PDFs' in FakeS3 whose bytes are text, pages split by form feeds
+
+    Objects starting with CORRUPT_DOCUMENT are rejected as Textract rejects a damaged PDF.
+    """
+
+    def __init__(self, s3, profile=None):
+        self.profile = profile or ServiceProfile()
+        self.s3 = s3
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _blocks(self, document, operation):
+        location = document['S3Object']
+        body, _ = self.s3.objects[(location['Bucket'], location['Name'])]
+        if body.startswith(CORRUPT_DOCUMENT):
+            raise client_error('UnsupportedDocumentException', 400, operation)
+        return [
+            {'BlockType': 'LINE', 'Text': line, 'Page': page}
+            for page, text in enumerate(body.decode('utf-8').split('\f'), start=1)
+            for line in text.split('\n') if line.strip()
+        ]
+
+    def detect_document_text(self, Document, **kwargs):
+        return self.profile.call('DetectDocumentText', lambda: {'Blocks': self._blocks(Document, 'DetectDocumentText')})
+
+    def start_document_text_detection(self, DocumentLocation, **kwargs):
+        def produce():
+            with self._lock:
+                job_id = f'textract-{len(self._jobs) + 1}'
+                self._jobs[job_id] = self._blocks(DocumentLocation, 'StartDocumentTextDetection')
+            return {'JobId': job_id}
+        return self.profile.call('StartDocumentTextDetection', produce)
+
+    def get_document_text_detection(self, JobId, MaxResults=1000, NextToken=None, **kwargs):
+        def produce():
+            blocks = self._jobs[JobId]
+            start = int(NextToken or 0)
+            response = {'JobStatus': 'SUCCEEDED', 'Blocks': blocks[start:start + MaxResults]}
+            if start + MaxResults < len(blocks):
+                response['NextToken'] = str(start + MaxResults)
+            return response
+        return self.profile.call('GetDocumentTextDetection', produce)
+
+
+class FakeAWS:
+    """All fakes, wired into aws_clients so the app and the Lambda pick them up unchanged
+
+    Args:
+        passages (list): Knowledge base passages the Bedrock fakes answer from
+        s3, bedrock, textract, agent (ServiceProfile): Behaviour of each service;
+            bedrock covers both bedrock-agent-runtime and bedrock-runtime
+    """
+
+    def __init__(self, passages=(), s3=None, bedrock=None, textract=None, agent=None):
+        self.s3 = FakeS3(s3)
+        self.bedrock_profile = bedrock or ServiceProfile()
+        self.bedrock_agent_runtime = FakeBedrockAgentRuntime(list(passages), self.bedrock_profile)
+        self.bedrock_runtime = FakeBedrockRuntime(self.bedrock_profile)
+        self.bedrock_agent = FakeBedrockAgent(agent)
+        self.textract = FakeTextract(self.s3, textract)
+
+    def clients(self):
+        """Fake client for each AWS service name"""
+        return {
+            's3': self.s3,
+            'bedrock-agent-runtime': self.bedrock_agent_runtime,
+            'bedrock-runtime': self.bedrock_runtime,
+            'bedrock-agent': self.bedrock_agent,
+            'textract': self.textract,
+        }
+
+    def install(self, region_name):
+        """Register every fake with aws_clients, for the app's region and the Lambda's default"""
+        from aws_clients import set_client
+        for service_name, client in self.clients().items():
+            set_client(service_name, client, region_name=region_name)
+            set_client(service_name, client)
+
+    def stats(self):
+        """Calls and throttles per service"""
+        return {
+            's3': self.s3.profile.stats(),
+            'bedrock': self.bedrock_profile.stats(),
+            'textract': self.textract.profile.stats(),
+            'bedrock-agent': self.bedrock_agent.profile.stats(),
+        }
+
+
+def s3_event_record(bucket, key, event_name='ObjectCreated:Put', etag=None):
+    """One S3 event notification record, as S3 sends it (key URL-encoded)"""
+    obj = {'key': quote_plus(key, safe='/')}
+    if etag:
+        obj['eTag'] = etag
+    return {'eventSource': 'aws:s3', 'eventName': event_name, 's3': {'bucket': {'name': bucket}, 'object': obj}}
+
+
+def sqs_message(records, message_id, receive_count=1):
+    """One SQS message carrying an S3 event notification, as the Lambda event source delivers it"""
+    return {
+        'messageId': message_id,
+        'body': json.dumps({'Records': records}),
+        'attributes': {'ApproximateReceiveCount': str(receive_count)},
+        'eventSource': 'aws:sqs',
+    }
@@ -0,0 +1,360 @@
+"""Offline load test of the question path and the document processor, on local AWS fakes
+
+Drives the real code end to end against benchmarks/fakes.py:
+
+  lambda    Concurrent lambda_handler invocations, each with a batch of text and PDF
+            uploads (fixture documents and calendar samples, under fresh keys)
+  ask       N concurrent sessions calling query_agentcore_runtime with questions drawn
+            from the fixture question set (repeats hit the shared caches, as in production)
+  fallback  N concurrent sessions calling get_fallback_link on certain and uncertain answers
+
+Each scenario reports throughput and latency percentiles, plus per-stage timings from
+the tracer. Results are saved as JSON named after the current commit, and --compare
+prints the change against an earlier result file (exiting non-zero past
+--max-regression), so a slower commit is caught before it is deployed.
+
+    python benchmarks/load_test.py --sessions 20 --questions 10 --bedrock-latency-ms 800
+    python benchmarks/load_test.py --compare benchmarks/results/load_test_<commit>.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from fakes import FakeAWS, ServiceProfile  # noqa: E402
+
+CALENDAR_DIR = os.path.join(HERE, 'calendar_corpus')
+FIXTURE_DIR = os.path.join(HERE, 'retrieval_fixtures')
+RESULTS_DIR = os.path.join(HERE, 'results')
+REGION = 'us-east-1'
+BUCKET = 'school-qa-docs-v2'
+
+UNCERTAIN_ANSWER = "Unfortunately I couldn't find that in the school documents."
+
+
+def percentiles(samples):
+    """Summarize latencies in seconds as milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'count': 0}
+    last = len(ordered) - 1
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50_ms': round(ordered[min(last, int(len(ordered) * 0.50))] * 1000, 3),
+        'p95_ms': round(ordered[min(last, int(len(ordered) * 0.95))] * 1000, 3),
+        'p99_ms': round(ordered[min(last, int(len(ordered) * 0.99))] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def run_sessions(sessions, work):
+    """Run work(session_number) on `sessions` threads at once
+
+    Returns:
+        tuple: (list of every latency sample, Counter-like dict of outcomes, wall seconds)
+    """
+    samples, outcomes = [], {}
+    lock = threading.Lock()
+    start = threading.Barrier(sessions + 1)
+
+    def session(number):
+        start.wait()
+        for seconds, outcome in work(number):
+            with lock:
+                samples.append(seconds)
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return samples, outcomes, time.perf_counter() - started
+
+
+def scenario_result(samples, outcomes, wall_seconds, unit):
+    """Throughput and latency summary for one scenario"""
+    return {
+        'operations': len(samples),
+        'unit': unit,
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_per_s': round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+        'latency': percentiles(samples),
+        'outcomes': outcomes,
+    }
+
+
+def read(path):
+    """Contents of a UTF-8 text file"""
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def fixture_documents():
+    """[(file name, text)] of the documents uploaded in the lambda scenario"""
+    documents = []
+    for directory in (FIXTURE_DIR, CALENDAR_DIR):
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.txt') and not filename.endswith('.expected.txt'):
+                documents.append((filename, read(os.path.join(directory, filename))))
+    return documents
+
+
+def knowledge_base_passages():
+    """Paragraph-sized passages the Bedrock fakes answer from"""
+    passages = []
+    for _, text in fixture_documents():
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        for start in range(0, len(lines), 4):
+            passages.append(' '.join(lines[start:start + 4]))
+    return passages
+
+
+def seed_bucket(s3):
+    """Put the app's configuration where it loads it from"""
+    for name in ('bedrock_config.json', 'fallback_links.json', 'suggested_questions.json'):
+        s3.put(BUCKET, f'config/{name}', read(os.path.join(ROOT, name)))
+
+
+def lambda_scenario(lambda_module, s3, args):
+    """Concurrent invocations, each processing a fresh batch of uploads"""
+    documents = fixture_documents()
+    document_results = {}
+
+    def invocation_work(number):
+        for round_number in range(args.lambda_rounds):
+            records = []
+            for index in range(args.documents):
+                filename, text = documents[(number + index) % len(documents)]
+                stem = filename[:-4]
+                if index % 3 == 2:
+                    # Every third upload is a 'PDF': Textract pages split on form feeds
+                    key = f'school-docs/load-{number}-{round_number}-{index}-{stem}.pdf'
+                    body = text.replace('\n\n', '\f')
+                else:
+                    key = f'school-docs/load-{number}-{round_number}-{index}-{stem}.txt'
+                    body = text
+                s3.put(BUCKET, key, body)
+                records.append({'s3': {'bucket': {'name': BUCKET}, 'object': {'key': key}}})
+            started = time.perf_counter()
+            response = lambda_module.lambda_handler({'Records': records}, None)
+            seconds = time.perf_counter() - started
+            for result in json.loads(response['body']).get('results', []):
+                document_results.setdefault(result['status'], []).append(result['duration_ms'] / 1000)
+            yield seconds, str(response['statusCode'])
+
+    samples, outcomes, wall = run_sessions(args.invocations, invocation_work)
+    result = scenario_result(samples, outcomes, wall, 'invocation')
+    processed = document_results.get('processed', [])
+    result['documents'] = {status: len(durations) for status, durations in document_results.items()}
+    result['documents_per_s'] = round(sum(result['documents'].values()) / wall, 2) if wall else None
+    result['document_latency'] = percentiles(processed)
+    result['stages'] = lambda_module.tracer.percentiles()
+    return result
+
+
+def ask_scenario(qa_core, args):
+    """Concurrent sessions asking fixture questions"""
+    with open(os.path.join(FIXTURE_DIR, 'questions.json'), encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f)]
+    questions += [f"When is the {event}?" for event in ('christmas fair', 'carol service', 'nativity', 'half term')]
+
+    def session_work(number):
+        rng = random.Random(args.seed + number)
+        for _ in range(args.questions):
+            question = rng.choice(questions)
+            first_text = []
+            on_text = (lambda text: first_text or first_text.append(time.perf_counter())) if args.stream else None
+            started = time.perf_counter()
+            answer = qa_core.query_agentcore_runtime(question, on_text=on_text)
+            seconds = time.perf_counter() - started
+            if answer == qa_core.BUSY_MESSAGE:
+                outcome = 'busy'
+            elif answer.startswith('Error querying knowledge base'):
+                outcome = 'error'
+            else:
+                outcome = 'answered'
+            yield seconds, outcome
+
+    samples, outcomes, wall = run_sessions(args.sessions, session_work)
+    result = scenario_result(samples, outcomes, wall, 'question')
+    result['answer_cache'] = qa_core.get_answer_cache().stats()
+    result['admission'] = qa_core.get_admission().stats()
+    result['stages'] = qa_core.get_tracer().percentiles()
+    return result
+
+
+def fallback_scenario(qa_core, args):
+    """Concurrent sessions matching fallback links, a third of the answers uncertain"""
+    passages = knowledge_base_passages()
+
+    def session_work(number):
+        rng = random.Random(args.seed + number)
+        for call in range(args.fallback_calls):
+            question = f"what about {rng.choice(passages)[:60]}?"
+            answer = UNCERTAIN_ANSWER if call % 3 == 0 else rng.choice(passages)
+            started = time.perf_counter()
+            link = qa_core.get_fallback_link(question, answer)
+            yield time.perf_counter() - started, 'link' if link else 'none'
+
+    samples, outcomes, wall = run_sessions(args.sessions, session_work)
+    return scenario_result(samples, outcomes, wall, 'call')
+
+
+def git_commit():
+    """Short commit hash of the tree under test, marked -dirty with local changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except Exception:
+        return 'unknown'
+
+
+def compare(baseline, current, max_regression):
+    """Print throughput and p95 changes per scenario; return the regressions beyond the limit"""
+    regressions = []
+    print(f"\ncompared with {baseline.get('commit')} ({baseline.get('timestamp')})")
+    print(f"{'scenario':<10}{'throughput/s':>22}{'p95 ms':>24}")
+    for name, now in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        old_rate, new_rate = before['throughput_per_s'], now['throughput_per_s']
+        old_p95, new_p95 = before['latency'].get('p95_ms'), now['latency'].get('p95_ms')
+        rate_change = (new_rate - old_rate) / old_rate if old_rate else 0.0
+        p95_change = (new_p95 - old_p95) / old_p95 if old_p95 else 0.0
+        print(f"{name:<10}{old_rate:>9.1f} -> {new_rate:>7.1f} {rate_change:+5.0%}"
+              f"{old_p95:>10.1f} -> {new_p95:>7.1f} {p95_change:+5.0%}")
+        if rate_change < -max_regression:
+            regressions.append(f"{name} throughput {rate_change:+.0%}")
+        if p95_change > max_regression:
+            regressions.append(f"{name} p95 latency {p95_change:+.0%}")
+    return regressions
+
+
+def print_summary(results):
+    """One line per scenario, then the slowest stages"""
+    print(f"commit {results['commit']}, {results['config']['sessions']} sessions\n")
+    print(f"{'scenario':<10}{'ops':>7}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  outcomes")
+    for name, result in results['scenarios'].items():
+        latency = result['latency']
+        print(f"{name:<10}{result['operations']:>7}{result['throughput_per_s']:>10.1f}"
+              f"{latency.get('p50_ms', 0):>10.2f}{latency.get('p95_ms', 0):>10.2f}"
+              f"{latency.get('p99_ms', 0):>10.2f}  {result['outcomes']}")
+    for name, result in results['scenarios'].items():
+        stages = result.get('stages')
+        if stages:
+            slowest = sorted(stages.items(), key=lambda item: -item[1]['p95_ms'])[:6]
+            print(f"\n{name} stages (p95 ms): " + ', '.join(f"{stage} {row['p95_ms']}" for stage, row in slowest))
+
+
+def main():
+    """Run the chosen scenarios against the fakes and save the results"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default='lambda,ask,fallback', help='comma-separated scenarios to run')
+    parser.add_argument('--sessions', type=int, default=20, help='concurrent sessions (ask, fallback)')
+    parser.add_argument('--questions', type=int, default=10, help='questions per session')
+    parser.add_argument('--fallback-calls', type=int, default=500, help='get_fallback_link calls per session')
+    parser.add_argument('--stream', action='store_true', help='ask with streaming (on_text callback)')
+    parser.add_argument('--invocations', type=int, default=4, help='concurrent Lambda invocations')
+    parser.add_argument('--lambda-rounds', type=int, default=2, help='invocations per concurrent slot')
+    parser.add_argument('--documents', type=int, default=6, help='uploads per Lambda invocation')
+    parser.add_argument('--bedrock-latency-ms', type=float, default=800)
+    parser.add_argument('--bedrock-jitter-ms', type=float, default=200)
+    parser.add_argument('--bedrock-token-ms', type=float, default=20, help='delay between streamed chunks')
+    parser.add_argument('--bedrock-max-concurrent', type=int, default=None,
+                        help='service-side concurrency before ThrottlingException (default: unlimited)')
+    parser.add_argument('--bedrock-throttle-rate', type=float, default=0.0, help='fraction of calls throttled')
+    parser.add_argument('--s3-latency-ms', type=float, default=15)
+    parser.add_argument('--textract-latency-ms', type=float, default=300)
+    parser.add_argument('--no-answer-cache', action='store_true', help='expire cached answers immediately')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help=f'results file (default {RESULTS_DIR}/load_test_<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare with')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='with --compare: fail if throughput drops or p95 grows by more than this fraction')
+    parser.add_argument('--verbose', action='store_true', help="show the app's and Lambda's own log lines")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they go in the environment first
+    os.environ.update({
+        'AWS_DEFAULT_REGION': REGION, 'AWS_REGION': REGION,
+        'AWS_ACCESS_KEY_ID': 'load-test', 'AWS_SECRET_ACCESS_KEY': 'load-test',
+        'EMF_METRICS': 'true' if args.verbose else 'false',
+        'STREAM_ANSWERS': 'true' if args.stream else 'false',
+    })
+    if args.no_answer_cache:
+        os.environ['ANSWER_CACHE_TTL_SECONDS'] = '0'
+        os.environ['RETRIEVAL_CACHE_TTL_SECONDS'] = '0'
+
+    fakes = FakeAWS(
+        knowledge_base_passages(),
+        s3=ServiceProfile(latency_ms=args.s3_latency_ms, jitter_ms=args.s3_latency_ms / 3, seed=args.seed),
+        bedrock=ServiceProfile(latency_ms=args.bedrock_latency_ms, jitter_ms=args.bedrock_jitter_ms,
+                               max_concurrent=args.bedrock_max_concurrent,
+                               throttle_rate=args.bedrock_throttle_rate,
+                               token_ms=args.bedrock_token_ms, seed=args.seed),
+        textract=ServiceProfile(latency_ms=args.textract_latency_ms, seed=args.seed),
+    )
+    fakes.install(REGION)
+    seed_bucket(fakes.s3)
+
+    import lambda_document_processor  # noqa: E402
+    import qa_core  # noqa: E402
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'config': vars(args),
+        'scenarios': {},
+    }
+    output = sys.stdout if args.verbose else io.StringIO()
+    for name in scenarios:
+        with contextlib.redirect_stdout(output):
+            if name == 'lambda':
+                results['scenarios'][name] = lambda_scenario(lambda_document_processor, fakes.s3, args)
+            elif name == 'ask':
+                results['scenarios'][name] = ask_scenario(qa_core, args)
+            elif name == 'fallback':
+                results['scenarios'][name] = fallback_scenario(qa_core, args)
+            else:
+                parser.error(f"unknown scenario {name!r}")
+    results['services'] = fakes.stats()
+
+    print_summary(results)
+    path = args.output or os.path.join(RESULTS_DIR, f"load_test_{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nresults saved to {path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.max_regression)
+        if regressions:
+            print("regressions: " + '; '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Local S3 stand-in over HTTP, for benchmarks that need the real boto3 transfer manager
+
+Serves the subset of the S3 REST API that uploads and the ingestion scheduler use
+(PutObject, GetObject, conditional writes, multipart uploads) from memory, with a
+fixed latency per request and a bandwidth cap per connection, so parallel parts
+and parallel files behave as they do over a real network link:
+
+    with LocalS3(latency_ms=30, mbps_per_connection=40) as s3:
+        client = boto3.client('s3', endpoint_url=s3.url, ...)
+"""
+import hashlib
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.etree import ElementTree
+
+
+def _read_aws_chunked(body):
+    """Decode an aws-chunked body (botocore sends checksums as trailers this way)"""
+    data, position = bytearray(), 0
+    while True:
+        line_end = body.index(b'\r\n', position)
+        size = int(body[position:line_end].split(b';')[0], 16)
+        position = line_end + 2
+        if size == 0:
+            return bytes(data)
+        data += body[position:position + size]
+        position += size + 2
+
+
+def _metadata(headers):
+    """User metadata (x-amz-meta-*) sent with an object"""
+    return {name.lower()[len('x-amz-meta-'):]: value for name, value in headers.items()
+            if name.lower().startswith('x-amz-meta-')}
+
+
+class LocalS3:
+    """In-memory S3 on 127.0.0.1, started and stopped as a context manager
+
+    Args:
+        latency_ms (float): Added to every request
+        mbps_per_connection (float): Upload bandwidth of one connection in megabits per second,
+            or None for unlimited
+    """
+
+    def __init__(self, latency_ms=0.0, mbps_per_connection=None):
+        self.latency_ms = latency_ms
+        self.mbps_per_connection = mbps_per_connection
+        self.objects = {}
+        self.metadata = {}
+        self.uploads = {}
+        self.requests = {}
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        """Endpoint URL for boto3 clients"""
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        store = self
+
+        class Handler(_Handler):
+            s3 = store
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='local-s3', daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, operation, received=0):
+        """Tally one request and the body bytes it carried"""
+        with self._lock:
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+            self.bytes_received += received
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler; the LocalS3 instance is set on a subclass"""
+    protocol_version = 'HTTP/1.1'
+    s3 = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _target(self):
+        parsed = urlparse(self.path)
+        bucket, _, key = unquote(parsed.path).lstrip('/').partition('/')
+        return bucket, key, {name: values[0] for name, values in parse_qs(parsed.query, keep_blank_values=True).items()}
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if 'aws-chunked' in (self.headers.get('Content-Encoding') or ''):
+            body = _read_aws_chunked(body)
+        if self.s3.mbps_per_connection:
+            time.sleep(len(body) * 8 / (self.s3.mbps_per_connection * 1_000_000))
+        return body
+
+    def _reply(self, status, body=b'', headers=None):
+        if self.s3.latency_ms:
+            time.sleep(self.s3.latency_ms / 1000)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status, code):
+        body = f"<Error><Code>{code}</Code><Message>{code}</Message></Error>".encode()
+        self._reply(status, body, {'Content-Type': 'application/xml'})
+
+    def do_GET(self):
+        bucket, key, _ = self._target()
+        self.s3.count('GetObject')
+        stored = self.s3.objects.get((bucket, key))
+        if stored is None:
+            return self._error(404, 'NoSuchKey')
+        body, etag = stored
+        if self.headers.get('If-None-Match') == etag:
+            return self._reply(304, headers={'ETag': etag})
+        self._reply(200, body, {'ETag': etag, 'Content-Type': 'application/octet-stream'})
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_PUT(self):
+        bucket, key, query = self._target()
+        body = self._body()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if 'uploadId' in query:
+            self.s3.count('UploadPart', len(body))
+            with self.s3._lock:
+                parts = self.s3.uploads.get(query['uploadId'])
+                if parts is not None:
+                    parts[int(query['partNumber'])] = body
+            if parts is None:
+                return self._error(404, 'NoSuchUpload')
+            return self._reply(200, headers={'ETag': etag})
+
+        self.s3.count('PutObject', len(body))
+        if_match = self.headers.get('If-Match')
+        with self.s3._lock:
+            current = self.s3.objects.get((bucket, key))
+            conflict = ((self.headers.get('If-None-Match') == '*' and current is not None)
+                        or (if_match is not None and (current is None or current[1] != if_match)))
+            if not conflict:
+                self.s3.objects[(bucket, key)] = (body, etag)
+                self.s3.metadata[(bucket, key)] = _metadata(self.headers)
+        if conflict:
+            return self._error(412, 'PreconditionFailed')
+        self._reply(200, headers={'ETag': etag})
+
+    def do_POST(self):
+        bucket, key, query = self._target()
+        body = self._body()
+        if 'uploads' in query:
+            self.s3.count('CreateMultipartUpload')
+            upload_id = uuid.uuid4().hex
+            with self.s3._lock:
+                self.s3.uploads[upload_id] = {}
+                self.s3.metadata[(bucket, key)] = _metadata(self.headers)
+            xml = (f"<InitiateMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{key}</Key>"
+                   f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+            return self._reply(200, xml.encode(), {'Content-Type': 'application/xml'})
+
+        if 'uploadId' in query:
+            self.s3.count('CompleteMultipartUpload')
+            numbers = [int(element.text) for element in ElementTree.fromstring(body).iter()
+                       if element.tag.endswith('PartNumber')]
+            with self.s3._lock:
+                parts = self.s3.uploads.pop(query['uploadId'], None)
+                if parts is not None:
+                    data = b''.join(parts[number] for number in numbers)
+                    etag = f'"{hashlib.md5(data).hexdigest()}-{len(numbers)}"'
+                    self.s3.objects[(bucket, key)] = (data, etag)
+            if parts is None:
+                return self._error(404, 'NoSuchUpload')
+            xml = (f"<CompleteMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{key}</Key>"
+                   f"<ETag>{etag}</ETag></CompleteMultipartUploadResult>")
+            return self._reply(200, xml.encode(), {'Content-Type': 'application/xml'})
+        self._error(400, 'InvalidRequest')
+
+    def do_DELETE(self):
+        bucket, key, query = self._target()
+        self.s3.count('DeleteObject')
+        with self.s3._lock:
+            if 'uploadId' in query:
+                self.s3.uploads.pop(query['uploadId'], None)
+            else:
+                self.s3.objects.pop((bucket, key), None)
+        self._reply(204)
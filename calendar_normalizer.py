@@ -0,0 +1,268 @@
+# Single-pass normalizer for OCR'd school calendar text
+import re
+from datetime import date
+
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December')
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Location codes used in the school calendar key, e.g. "SH = School Hall"
+LOCATIONS = {
+    'SH': 'School Hall',
+    'SMC': "St Mary's Church",
+    'IS': 'Infant Site',
+    'MS': 'Middle Site',
+    'JS': 'Junior Site',
+}
+
+# Key/legend lines ("KEY:", "SH = School Hall", "TBC = to be confirmed") carry no events
+_SKIP_RE = re.compile(
+    r'key:|(?<!\w)(?:' + '|'.join(list(LOCATIONS) + ['TBC']) + r')\s*=',
+    re.IGNORECASE
+)
+
+_YEAR_RE = re.compile(r'(?<!\d)(20\d{2})(?!\d)')
+
+_MONTH_SET = frozenset(MONTHS)
+
+# One alternation covers every token we act on, so each line is scanned once and
+# every rewrite comes from the tables above rather than per-case replacements.
+_TOKEN_RE = re.compile(
+    r'(?=[\s\dA-Z])(?:'
+    r'(?<![\w:])(?P<number>\d{1,2})(?:'
+    r'\s+(?P<suffix>st|nd|rd|th)\b'
+    r'|:(?P<minute>[0-5]\d)(?![\d:])(?!\s?[ap]\.?m\b))'
+    r'| (?P<code>' + '|'.join(sorted(LOCATIONS, key=len, reverse=True)) + r')(?![\w=])'
+    r'|\b(?P<word>' + '|'.join(MONTHS + WEEKDAYS) + r')\b'
+    r'|(?<!\d)(?P<year>20\d{2})(?!\d))'
+)
+
+# Text next to a location code that makes it a place: a time or date before it
+# ("16:00 SH", "4pm SH", "Monday 8th SH") or a time after it ("SMC 10:00am")
+_LOCATION_BEFORE_RE = re.compile(r'(?:\d|[ap]\.?m\.?|\d\s?(?:st|nd|rd|th))$')
+_LOCATION_AFTER_RE = re.compile(r' \d{1,2}(?:[:.]\d{2}|\s?[ap]\.?m\b)')
+
+_DAY_RE = re.compile(r'(?=[MTWFS])\b(?:' + '|'.join(WEEKDAYS) + r') \d{1,2}(?:st|nd|rd|th)\b')
+
+# Month (and year) left at the start of an event's details, e.g. "September 2025: ..."
+_EVENT_MONTH_RE = re.compile(r'^(?:' + '|'.join(MONTHS) + r')\b(?: 20\d{2})?\s*:?\s*')
+
+# Second half of a date range, e.g. "– Friday 24th Half term"
+_RANGE_END_RE = re.compile(r'^[–-]\s*(?:' + '|'.join(WEEKDAYS) + r') (\d{1,2})(?:st|nd|rd|th)\b\s*:?\s*')
+
+
+def to_12_hour(hour, minute):
+    """Format a 24-hour time as 12-hour text, e.g. (15, '30') -> '3:30pm'"""
+    suffix = 'am' if hour < 12 else 'pm'
+    return f"{hour % 12 or 12}:{minute}{suffix}"
+
+
+def _is_location(line, start, end):
+    """Whether a code such as "IS" at line[start:end] names a place rather than being a word
+
+    Codes count next to a time or after a date, or at the end of the line after a
+    lowercase word ("Class photos IS"). In capitals ("SPORTS DAY IS CANCELLED",
+    "PHOTOS MS AND JS") they are read as ordinary words.
+    """
+    if _LOCATION_BEFORE_RE.search(line, max(0, start - 8), start) or _LOCATION_AFTER_RE.match(line, end):
+        return True
+    if line[end:].strip(' .'):
+        return False
+    before = line[:start].split()
+    return bool(before) and before[-1] != before[-1].upper()
+
+
+def _is_unambiguous_hour(hour_text):
+    """Whether an hour before ':MM' means the same as a 24-hour time (not unpadded 1-9)"""
+    return (len(hour_text) == 2 or hour_text == '0') and int(hour_text) < 24
+
+
+class _Line:
+    """Result of scanning one line: rewritten text plus the tokens that were seen"""
+    __slots__ = ('text', 'months', 'weekdays', 'years', 'locations')
+
+    def __init__(self, raw):
+        self.months = []
+        self.weekdays = []
+        self.years = []
+        self.locations = []
+        self.text = _TOKEN_RE.sub(self._rewrite, raw)
+
+    def _rewrite(self, match):
+        word = match['word']
+        if word:
+            (self.months if word in _MONTH_SET else self.weekdays).append(word)
+            return word
+        if match['suffix']:
+            # Fix OCR spacing: "8 th" -> "8th"
+            return match['number'] + match['suffix']
+        if match['minute']:
+            # "1:30" in a school letter means half past one in the afternoon, so only hours
+            # that read the same on either clock are converted: "09:15", "10:45", "15:30"
+            if _is_unambiguous_hour(match['number']):
+                return to_12_hour(int(match['number']), match['minute'])
+            return match[0]
+        if match['code']:
+            if not _is_location(match.string, match.start(), match.end()):
+                return match[0]
+            self.locations.append(LOCATIONS[match['code']])
+            return ', ' + LOCATIONS[match['code']]
+        self.years.append(match['year'])
+        return match['year']
+
+
+class CalendarNormalizer:
+    """Turn OCR'd calendar text into month sections of self-contained event lines
+
+    Input:  "Monday 8 th Year 6 Curriculum meeting for parents, 15:30 – 16:00 SH"
+    Output: "Monday 8th September 2025: Year 6 Curriculum meeting for parents, 3:30pm – 4:00pm, School Hall"
+
+    Lines are consumed lazily. Lines before the first one mentioning a year are
+    held back until the document year is known, then everything streams. Events
+    take their year from the month header above them, else the document year.
+    """
+
+    def __init__(self, default_year, on_event=None):
+        """
+        Args:
+            default_year (str): Year used when the document never mentions one
+            on_event: Optional callable receiving a dict for every dated event line
+                (date, end_date, title, location and the formatted text)
+        """
+        self.default_year = str(default_year)
+        self.on_event = on_event
+
+    def normalize(self, lines):
+        """Normalize calendar lines
+
+        Args:
+            lines: Iterable of raw text lines
+
+        Returns:
+            str: Cleaned calendar text
+        """
+        return '\n'.join(self.iter_normalized(lines))
+
+    def iter_normalized(self, lines):
+        """Yield cleaned output lines for an iterable of raw lines"""
+        state = {'year': None, 'month': None, 'month_year': None}
+        held = []
+        for raw in lines:
+            if state['year'] is None:
+                year = _YEAR_RE.findall(raw)
+                if not year:
+                    held.append(raw)
+                    continue
+                # As before, the first line with a year decides, and its last year wins
+                state['year'] = year[-1]
+                for held_line in held:
+                    out = self._normalize_line(held_line, state)
+                    if out is not None:
+                        yield out
+                held = []
+            out = self._normalize_line(raw, state)
+            if out is not None:
+                yield out
+
+        # No year anywhere: fall back to the default for the held lines
+        for held_line in held:
+            out = self._normalize_line(held_line, state)
+            if out is not None:
+                yield out
+
+    def format_event(self, line, month, year):
+        """Format one event line, adding the month and year if the line lacks them"""
+        return self._format_scanned(_Line(' '.join(line.split())), month, year)
+
+    def _normalize_line(self, raw, state):
+        """Return the cleaned form of one line, or None to drop it"""
+        # Collapse OCR spacing so every token is separated by exactly one space
+        line = ' '.join(raw.split())
+        if not line or ('=' in line or ':' in line) and _SKIP_RE.search(line):
+            return None
+
+        scanned = _Line(line)
+
+        # Month headers, e.g. "September 2025" (or a bare "September" in a document
+        # with no year at all); lines naming a weekday are events, not headers
+        if scanned.months and not scanned.weekdays and (
+                scanned.years or (state['year'] is None and line in MONTHS)):
+            state['month'] = scanned.months[0]
+            # Academic-year calendars span two years, so each header sets its own
+            state['month_year'] = scanned.years[0] if scanned.years else None
+            return f"\n{state['month'].upper()} {self._year(state)} EVENTS:\n"
+        if state['month'] and scanned.weekdays:
+            year = self._year(state)
+            line = self._format_scanned(scanned, state['month'], year)
+            if self.on_event is not None:
+                event = self._event(scanned, state['month'], year, line)
+                if event:
+                    self.on_event(event)
+            return line
+        if not line.startswith(('KEY:', 'Please note')):
+            return line
+        return None
+
+    def _year(self, state):
+        return state['month_year'] or state['year'] or self.default_year
+
+    def _format_scanned(self, scanned, month, year):
+        line = scanned.text
+        if month in scanned.months:
+            return line
+
+        # Rebuild as "<Weekday> <day> <Month> <Year>: <details>"
+        match, details = _split_day(line)
+        if not match:
+            return line
+        return f"{match[0]} {month} {year}: {details}"
+
+    def _event(self, scanned, month, year, line):
+        """Structured form of an event line, or None if it has no valid date"""
+        match, details = _split_day(scanned.text)
+        if not match:
+            return None
+        month_number = MONTHS.index(month) + 1
+        try:
+            start = date(int(year), month_number, int(match[0].split(' ')[1][:-2]))
+        except ValueError:
+            return None
+
+        title = _EVENT_MONTH_RE.sub('', details)
+        end = None
+        range_end = _RANGE_END_RE.match(title)
+        if range_end:
+            title = title[range_end.end():]
+            end = _range_end_date(start, int(range_end[1]))
+        for location in scanned.locations:
+            title = title.replace(', ' + location, '')
+
+        return {
+            'date': start.isoformat(),
+            'end_date': end.isoformat() if end else None,
+            'title': title.strip(' ,:'),
+            'location': scanned.locations[0] if scanned.locations else None,
+            'text': line,
+        }
+
+
+def _split_day(text):
+    """Find "<Weekday> <day>" in a line; returns (match, the rest of the line) or (None, None)"""
+    match = _DAY_RE.search(text)
+    if not match:
+        return None, None
+    before = text[:match.start()].strip()
+    after = text[match.end():].strip().lstrip(':').strip()
+    return match, f"{before} {after}".strip()
+
+
+def _range_end_date(start, end_day):
+    """End of a range like "Monday 27th – Friday 3rd", which may run into the next month"""
+    try:
+        if end_day >= start.day:
+            return start.replace(day=end_day)
+        if start.month == 12:
+            return date(start.year + 1, 1, end_day)
+        return date(start.year, start.month + 1, end_day)
+    except ValueError:
+        return None
@@ -23,4 +23,69 @@ S3_BUCKET = os.getenv("S3_BUCKET", "school-qa-docs-v2")
 S3_PREFIX = "school-docs/"
 
 # Application settings
-SEARCH_RESULTS_LIMIT = 5
+SEARCH_RESULTS_LIMIT = int(os.getenv("SEARCH_RESULTS_LIMIT", "5"))
+
+# "retrieve_and_generate" (one Bedrock call) or "two_stage" (cached Retrieve, trimmed passages, then Converse)
+QUERY_MODE = os.getenv("QUERY_MODE", "retrieve_and_generate")
+
+# Two-stage mode: Retrieve results cache, passage token budget and relative score cut-off
+RETRIEVAL_CACHE_TTL_SECONDS = int(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "900"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+MIN_RELATIVE_SCORE = float(os.getenv("MIN_RELATIVE_SCORE", "0.5"))
+
+# Narrow retrieval with metadata filters for the month, year, term and topic named in a question
+RETRIEVAL_FILTERS = os.getenv("RETRIEVAL_FILTERS", "true").lower() == "true"
+
+# Answer cache shared across sessions (entries also clear when the KB re-ingests)
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+# Stream answers token-by-token with retrieve_and_generate_stream ("false" waits for the full answer)
+STREAM_ANSWERS = os.getenv("STREAM_ANSWERS", "true").lower() == "true"
+
+# Age (seconds) after which S3 config files are re-checked in the background
+CONFIG_REFRESH_SECONDS = int(os.getenv("CONFIG_REFRESH_SECONDS", "300"))
+
+# Knowledge base syncs wait until uploads have been quiet this long (seconds)
+INGESTION_QUIET_SECONDS = int(os.getenv("INGESTION_QUIET_SECONDS", "60"))
+
+# "incremental": the document processor pushes/deletes single documents and the app tracks their
+# status; "full": every change is synced with a data-source ingestion job. Match the Lambda's setting.
+INGESTION_MODE = os.getenv("INGESTION_MODE", "incremental")
+
+# Admin uploads: files sent at once, size (MB) above which a file goes as a multipart upload,
+# part size (MB) and parts sent at once per file
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+UPLOAD_MULTIPART_THRESHOLD_MB = int(os.getenv("UPLOAD_MULTIPART_THRESHOLD_MB", "8"))
+UPLOAD_PART_SIZE_MB = int(os.getenv("UPLOAD_PART_SIZE_MB", "8"))
+UPLOAD_PART_CONCURRENCY = int(os.getenv("UPLOAD_PART_CONCURRENCY", "4"))
+
+# Answer the suggested questions in the background at startup and after each ingestion, so clicks on
+# them are answer cache hits; admins edit the questions in the admin panel (config/suggested_questions.json)
+WARM_UP = os.getenv("WARM_UP", "true").lower() == "true"
+MAX_SUGGESTED_QUESTIONS = int(os.getenv("MAX_SUGGESTED_QUESTIONS", "8"))
+
+# Answer clear "when is X?" questions from the calendar event index instead of the LLM
+EVENT_INDEX_ANSWERS = os.getenv("EVENT_INDEX_ANSWERS", "true").lower() == "true"
+
+# Admission control for Bedrock calls in each process (app or API task): calls per second, burst,
+# calls in flight, the seconds a call may spend queued and retrying throttles, and attempts per call
+BEDROCK_RATE_PER_SECOND = float(os.getenv("BEDROCK_RATE_PER_SECOND", "2"))
+BEDROCK_BURST = int(os.getenv("BEDROCK_BURST", "4"))
+BEDROCK_MAX_CONCURRENT = int(os.getenv("BEDROCK_MAX_CONCURRENT", "4"))
+BEDROCK_QUEUE_DEADLINE_SECONDS = float(os.getenv("BEDROCK_QUEUE_DEADLINE_SECONDS", "20"))
+BEDROCK_MAX_ATTEMPTS = int(os.getenv("BEDROCK_MAX_ATTEMPTS", "4"))
+
+# Per-stage timings are logged as CloudWatch embedded metric format (EMF) JSON lines in this namespace
+EMF_METRICS = os.getenv("EMF_METRICS", "true").lower() == "true"
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "SchoolQA")
+
+# Query API service (api_service.py). When QUERY_API_URL is set, e.g. "http://school-qa-api:8000",
+# the Streamlit UI sends questions and uploads there instead of calling Bedrock itself.
+QUERY_API_URL = os.getenv("QUERY_API_URL", "")
+# Shared secret for POST /upload (X-Api-Key header); uploads through the API are refused while unset
+API_UPLOAD_KEY = os.getenv("API_UPLOAD_KEY", "")
+# Questions the service answers at once, and how long (seconds) a question may wait for a free slot
+MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "8"))
+QUERY_QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUERY_QUEUE_TIMEOUT_SECONDS", "10"))
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
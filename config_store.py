@@ -0,0 +1,174 @@
+# Background-refreshed JSON configuration loaded from S3 with ETag conditional GETs
+import hashlib
+import json
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+
+def config_fingerprint(config):
+    """Hash a configuration dict into a short, stable version string
+
+    Args:
+        config (dict): Parsed configuration
+
+    Returns:
+        str: Hex digest that changes whenever the configuration changes
+    """
+    payload = json.dumps(config, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+# _fetch result for a 304: the copy we have is current
+_NOT_MODIFIED = object()
+
+
+def _is_not_modified(error):
+    """True if a ClientError is S3's 304 response to an IfNoneMatch GET"""
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    code = error.response.get('Error', {}).get('Code')
+    return status == 304 or code in ('304', 'NotModified')
+
+
+class ConfigStore:
+    """Serve a JSON config from S3, refreshing it in the background once it goes stale
+
+    The first get() loads synchronously. After that, get() always returns the last
+    good value immediately; when it is older than refresh_seconds, one background
+    thread re-fetches it with IfNoneMatch so an unchanged object costs a 304 and no
+    parse. If S3 cannot be reached at all, the local copy bundled with the app is used.
+    """
+
+    def __init__(self, s3_client, bucket, key, local_path, refresh_seconds=300,
+                 transform=None, clock=time.monotonic):
+        """
+        Args:
+            s3_client: boto3 S3 client
+            bucket (str): Bucket holding the config object
+            key (str): Object key, e.g. 'config/bedrock_config.json'
+            local_path (str): Bundled fallback file, or None to start from an empty object
+            refresh_seconds (int): Age after which a background refresh is started
+            transform: Optional callable applied to the parsed JSON when it loads
+            clock: Monotonic clock, injectable for tests
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.local_path = local_path
+        self.refresh_seconds = refresh_seconds
+        self.transform = transform
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._etag = None
+        self._loaded_at = None
+        self._refreshing = False
+
+    def get(self):
+        """Return the current config value, scheduling a refresh if it is stale"""
+        return self.snapshot()[0]
+
+    @property
+    def version(self):
+        """Version of the current value (S3 ETag, or a content hash for the local file)"""
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """Return (value, version) as a consistent pair
+
+        Never waits for a refresh: once a value has loaded, a stale one is returned
+        straight away while the refresh runs in the background.
+        """
+        if self._value is None:
+            with self._lock:
+                # Nothing to serve yet, so the first load is the one wait readers share
+                if self._value is None:
+                    self._apply(None, self._fetch(None))
+        elif self._clock() - self._loaded_at >= self.refresh_seconds:
+            self._refresh_in_background()
+        with self._lock:
+            return self._value, self._version
+
+    def refresh(self):
+        """Re-fetch the config now; readers keep getting the current value meanwhile
+
+        Returns:
+            bool: True if a new version was loaded
+        """
+        with self._lock:
+            etag = self._etag
+        result = self._fetch(etag)
+        with self._lock:
+            return self._apply(etag, result)
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name=f"config-refresh-{self.key}", daemon=True).start()
+
+    def _fetch(self, etag):
+        """GET and parse the object without holding the lock
+
+        Returns:
+            (value, version, etag) if it loaded, _NOT_MODIFIED for a 304, or None on failure
+        """
+        request = {'Bucket': self.bucket, 'Key': self.key}
+        if etag:
+            request['IfNoneMatch'] = etag
+        try:
+            response = self.s3_client.get_object(**request)
+            raw = json.loads(response['Body'].read().decode('utf-8'))
+            version = response.get('ETag', '').strip('"') or config_fingerprint(raw)
+            return self._transform(raw), version, response.get('ETag')
+        except ClientError as e:
+            if _is_not_modified(e):
+                return _NOT_MODIFIED
+            print(f"Could not load s3://{self.bucket}/{self.key}: {e}")
+        except Exception as e:
+            print(f"Could not load s3://{self.bucket}/{self.key}: {e}")
+        return None
+
+    def _apply(self, requested_etag, result):
+        """Install a fetch result; caller holds the lock
+
+        A loaded value is dropped if another refresh installed a version after this
+        fetch started, so an older response never replaces a newer one.
+        """
+        if result is _NOT_MODIFIED:
+            self._loaded_at = self._clock()
+            return False
+        if result is not None:
+            if self._value is not None and self._etag != requested_etag:
+                return False
+            self._value, self._version, self._etag = result
+            self._loaded_at = self._clock()
+            return True
+
+        # Keep serving the last good value; only fall back to the local file if we have none
+        if self._value is None:
+            if self.local_path is None:
+                raw = {}
+            else:
+                with open(self.local_path, 'r') as f:
+                    raw = json.load(f)
+            self._value = self._transform(raw)
+            self._version = f"local-{config_fingerprint(raw)}"
+            self._loaded_at = self._clock()
+            return True
+        self._loaded_at = self._clock()
+        return False
+
+    def _transform(self, raw):
+        return self.transform(raw) if self.transform else raw
@@ -0,0 +1,7 @@
+# pytest setup: the AWS fakes from benchmarks/ on the path and a region for boto3 clients
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('EMF_METRICS', 'false')
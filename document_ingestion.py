@@ -0,0 +1,228 @@
+# Incremental knowledge-base ingestion: push or delete single documents and track their status
+import time
+from datetime import datetime, timezone
+
+from s3_conditional import read_json, update_json
+
+DOCUMENT_STATUS_KEY = 'state/document-status.json'
+
+# IngestKnowledgeBaseDocuments, DeleteKnowledgeBaseDocuments and GetKnowledgeBaseDocuments take at most 10
+API_BATCH_SIZE = 10
+
+# Statuses after which a document no longer changes on its own
+FINAL_STATUSES = {
+    'INDEXED', 'PARTIALLY_INDEXED', 'METADATA_PARTIALLY_INDEXED', 'METADATA_UPDATE_FAILED',
+    'FAILED', 'IGNORED', 'NOT_FOUND', 'DELETED',
+}
+# Final statuses in which the document's text can be retrieved
+QUERYABLE_STATUSES = {'INDEXED', 'PARTIALLY_INDEXED', 'METADATA_PARTIALLY_INDEXED', 'METADATA_UPDATE_FAILED'}
+
+# Entries kept in the status object (oldest submissions are dropped first)
+MAX_TRACKED_DOCUMENTS = 200
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def _batches(items, size=API_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def s3_uri(bucket, key):
+    """s3:// URI of an object"""
+    return f"s3://{bucket}/{key}"
+
+
+def key_from_uri(uri):
+    """Object key of an s3:// URI"""
+    return uri.split('/', 3)[3] if uri.count('/') >= 3 else uri
+
+
+class DocumentIngestor:
+    """Add, replace or remove individual documents in an S3 knowledge base data source
+
+    Instead of an ingestion job that rescans the whole data source, each processed
+    document is sent with IngestKnowledgeBaseDocuments (its metadata sidecar with
+    it) and each removed one with DeleteKnowledgeBaseDocuments, ten per call.
+
+    Every submitted document is recorded in a small JSON object in S3 with its
+    status. refresh() asks Bedrock for the documents that are not final yet, and
+    records when each became queryable. The status object is updated with
+    conditional writes (like the ingestion scheduler's state), so the Lambda and
+    the app never lose each other's updates. Its 'generation' goes up whenever
+    documents reach a final status, which the app uses to drop cached answers.
+    """
+
+    def __init__(self, bedrock_agent, s3_client, bucket, knowledge_base_id, data_source_id,
+                 status_key=DOCUMENT_STATUS_KEY, sidecar_key=None, clock=time.time):
+        """
+        Args:
+            bedrock_agent: boto3 bedrock-agent client (or a local fake)
+            s3_client: boto3 S3 client (or a local fake)
+            bucket (str): Bucket holding the processed documents and the status object
+            knowledge_base_id (str): Knowledge base to update
+            data_source_id (str): S3 data source the documents belong to
+            status_key (str): Object key for the per-document status
+            sidecar_key: Optional callable mapping a document key to its metadata sidecar key
+            clock: Returns the current time in epoch seconds, injectable for tests
+        """
+        self.bedrock_agent = bedrock_agent
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.knowledge_base_id = knowledge_base_id
+        self.data_source_id = data_source_id
+        self.status_key = status_key
+        self.sidecar_key = sidecar_key
+        self._clock = clock
+
+    def ingest(self, documents):
+        """Add or replace documents in the knowledge base
+
+        Args:
+            documents (list): (source key, processed key) pairs
+
+        Returns:
+            list: Processed keys submitted
+        """
+        def request(batch):
+            ingest_documents = []
+            for _, key in batch:
+                document = {'content': {'dataSourceType': 'S3', 's3': {'s3Location': {'uri': s3_uri(self.bucket, key)}}}}
+                if self.sidecar_key:
+                    document['metadata'] = {
+                        'type': 'S3_LOCATION',
+                        's3Location': {'uri': s3_uri(self.bucket, self.sidecar_key(key))},
+                    }
+                ingest_documents.append(document)
+            return self.bedrock_agent.ingest_knowledge_base_documents(
+                knowledgeBaseId=self.knowledge_base_id,
+                dataSourceId=self.data_source_id,
+                documents=ingest_documents
+            )
+
+        return self._submit('ingest', documents, request)
+
+    def delete(self, documents):
+        """Remove documents from the knowledge base
+
+        Args:
+            documents (list): (source key, processed key) pairs
+
+        Returns:
+            list: Processed keys submitted
+        """
+        def request(batch):
+            return self.bedrock_agent.delete_knowledge_base_documents(
+                knowledgeBaseId=self.knowledge_base_id,
+                dataSourceId=self.data_source_id,
+                documentIdentifiers=[
+                    {'dataSourceType': 'S3', 's3': {'uri': s3_uri(self.bucket, key)}} for _, key in batch
+                ]
+            )
+
+        return self._submit('delete', documents, request)
+
+    def refresh(self):
+        """Ask Bedrock for the status of documents still being indexed or deleted, and record it
+
+        Returns:
+            dict: The status object ({'generation': int, 'documents': {processed key: entry}})
+        """
+        state, _ = self._read_state()
+        pending = [key for key, entry in state.get('documents', {}).items()
+                   if entry.get('status') not in FINAL_STATUSES]
+        if not pending:
+            return state
+
+        updates = {}
+        for batch in _batches(pending):
+            response = self.bedrock_agent.get_knowledge_base_documents(
+                knowledgeBaseId=self.knowledge_base_id,
+                dataSourceId=self.data_source_id,
+                documentIdentifiers=[{'dataSourceType': 'S3', 's3': {'uri': s3_uri(self.bucket, key)}} for key in batch]
+            )
+            for detail in response.get('documentDetails', []):
+                key = key_from_uri(detail.get('identifier', {}).get('s3', {}).get('uri', ''))
+                updates[key] = (detail.get('status'), detail.get('statusReason'))
+        if not updates:
+            return state
+
+        def apply(state):
+            documents = state.setdefault('documents', {})
+            changed = reached_final = False
+            for key, (status, reason) in updates.items():
+                entry = documents.get(key)
+                if entry is None or entry.get('status') in FINAL_STATUSES:
+                    continue
+                if entry.get('action') == 'delete' and status == 'NOT_FOUND':
+                    status = 'DELETED'
+                if status == entry.get('status'):
+                    continue
+                entry.update(status=status, reason=reason, updated_at=_now())
+                changed = True
+                if status in FINAL_STATUSES:
+                    entry['final_at'] = entry['updated_at']
+                    entry['seconds_to_final'] = round(self._clock() - entry.get('submitted_epoch', self._clock()))
+                    reached_final = True
+            if reached_final:
+                state['generation'] = state.get('generation', 0) + 1
+            return state if changed else None
+
+        return self._update_state(apply)
+
+    def statuses(self):
+        """Current status object, without asking Bedrock"""
+        return self._read_state()[0]
+
+    def _submit(self, action, documents, request):
+        """Send documents in batches of ten and record what Bedrock reported for each"""
+        documents = list(documents)
+        if not documents:
+            return []
+        sources = {processed_key: source_key for source_key, processed_key in documents}
+        reported = {}
+        for batch in _batches(documents):
+            response = request(batch)
+            for detail in response.get('documentDetails', []):
+                key = key_from_uri(detail.get('identifier', {}).get('s3', {}).get('uri', ''))
+                reported[key] = (detail.get('status'), detail.get('statusReason'))
+
+        submitted_epoch = self._clock()
+
+        def apply(state):
+            documents_state = state.setdefault('documents', {})
+            for processed_key, source_key in sources.items():
+                status, reason = reported.get(processed_key, ('STARTING', None))
+                if action == 'delete' and status == 'NOT_FOUND':
+                    status = 'DELETED'
+                documents_state[processed_key] = {
+                    'source_key': source_key,
+                    'action': action,
+                    'status': status,
+                    'reason': reason,
+                    'submitted_at': _now(),
+                    'submitted_epoch': submitted_epoch,
+                    'updated_at': _now(),
+                }
+                if status in FINAL_STATUSES:
+                    documents_state[processed_key].update(final_at=_now(), seconds_to_final=0)
+                    state['generation'] = state.get('generation', 0) + 1
+            if len(documents_state) > MAX_TRACKED_DOCUMENTS:
+                oldest = sorted(documents_state, key=lambda k: documents_state[k].get('submitted_epoch', 0))
+                for key in oldest[:len(documents_state) - MAX_TRACKED_DOCUMENTS]:
+                    del documents_state[key]
+            return state
+
+        self._update_state(apply)
+        print(f"✅ Submitted {len(sources)} document(s) to {action} in the knowledge base")
+        return list(sources)
+
+    def _read_state(self):
+        """Return (status object, ETag) or ({}, None) if none has been written yet"""
+        return read_json(self.s3_client, self.bucket, self.status_key)
+
+    def _update_state(self, mutate):
+        """Read-modify-write the status object; mutate returns None to leave it as it is"""
+        return update_json(self.s3_client, self.bucket, self.status_key, mutate, indent=1, sort_keys=True)[0]
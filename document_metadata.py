@@ -0,0 +1,123 @@
+# Knowledge base metadata for processed documents, and matching retrieval filters for questions
+import json
+import re
+
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December')
+
+# School term of each calendar month (1-12)
+MONTH_TERMS = {
+    1: 'spring', 2: 'spring', 3: 'spring',
+    4: 'summer', 5: 'summer', 6: 'summer', 7: 'summer', 8: 'summer',
+    9: 'autumn', 10: 'autumn', 11: 'autumn', 12: 'autumn',
+}
+
+# Document types, judged by words in the file name; the first match wins
+DOC_TYPES = (
+    ('calendar', ('calendar', 'dates')),
+    ('staffing', ('staff',)),
+    ('policy', ('policy', 'policies')),
+    ('newsletter', ('newsletter',)),
+    ('timetable', ('timetable',)),
+)
+
+# Question words that point at one document type
+TOPIC_KEYWORDS = {
+    'staffing': ('staff', 'teacher', 'teachers', 'head teacher', 'headteacher'),
+    'policy': ('policy', 'policies'),
+    'timetable': ('timetable',),
+}
+
+_YEAR_RE = re.compile(r'(?<!\d)(20\d{2})(?!\d)')
+_MONTH_RE = re.compile(r'\b(' + '|'.join(MONTHS) + r')\b', re.IGNORECASE)
+_TERM_RE = re.compile(r'\b(autumn|spring|summer)\s+term\b', re.IGNORECASE)
+_TOPIC_RES = {
+    doc_type: re.compile(r'\b(?:' + '|'.join(re.escape(k) for k in keywords) + r')\b', re.IGNORECASE)
+    for doc_type, keywords in TOPIC_KEYWORDS.items()
+}
+
+
+def document_type(filename):
+    """Classify a document by its file name, e.g. 'calendar', 'staffing' or 'general'"""
+    name = filename.lower()
+    for doc_type, words in DOC_TYPES:
+        if any(word in name for word in words):
+            return doc_type
+    return 'general'
+
+
+def sidecar_key(processed_key):
+    """Key of the Bedrock metadata file that belongs to a processed document"""
+    return f"{processed_key}.metadata.json"
+
+
+class DocumentProfile:
+    """Collect the years, months and terms a processed document covers
+
+    Calendars report their events (exact months and terms); for every document the
+    processed text is scanned for years as it is written.
+    """
+
+    def __init__(self, filename):
+        self.doc_type = document_type(filename)
+        self.years = set(_YEAR_RE.findall(filename))
+        self.months = set()
+        self.terms = set()
+
+    def observe_text(self, text):
+        """Note the years mentioned in a chunk of processed text"""
+        self.years.update(_YEAR_RE.findall(text))
+
+    def observe_events(self, events):
+        """Note the dates of structured calendar events"""
+        for event in events:
+            year, month = event['date'][:4], int(event['date'][5:7])
+            self.years.add(year)
+            self.months.add(MONTHS[month - 1])
+            self.terms.add(MONTH_TERMS[month])
+
+    def attributes(self):
+        """Metadata attributes for the sidecar; empty lists are left out"""
+        attributes = {'doc_type': self.doc_type}
+        for name, values in (('years', self.years), ('months', self.months), ('terms', self.terms)):
+            if values:
+                attributes[name] = sorted(values)
+        return attributes
+
+    def sidecar_body(self):
+        """Contents of the .metadata.json sidecar, as bytes"""
+        return json.dumps({'metadataAttributes': self.attributes()}, sort_keys=True).encode('utf-8')
+
+
+def question_filter(question):
+    """Build a Bedrock retrieval filter from the month, year, term and topic in a question
+
+    Returns:
+        dict: Filter for vectorSearchConfiguration, or None if the question names none
+    """
+    conditions = []
+    for year in sorted(set(_YEAR_RE.findall(question))):
+        conditions.append({'listContains': {'key': 'years', 'value': year}})
+    # Only calendar sidecars list months and terms, so those conditions apply to
+    # calendars alone; other documents only have to match the year and topic
+    dated = []
+    for month in sorted({m.capitalize() for m in _MONTH_RE.findall(question)}):
+        # "May" is usually a verb in a question; only trust it alongside a year
+        if month == 'May' and not conditions:
+            continue
+        dated.append({'listContains': {'key': 'months', 'value': month}})
+    for term in sorted({t.lower() for t in _TERM_RE.findall(question)}):
+        dated.append({'listContains': {'key': 'terms', 'value': term}})
+    if dated:
+        conditions.append({'orAll': [
+            {'notEquals': {'key': 'doc_type', 'value': 'calendar'}},
+            dated[0] if len(dated) == 1 else {'andAll': dated},
+        ]})
+    for doc_type, pattern in _TOPIC_RES.items():
+        if pattern.search(question):
+            conditions.append({'equals': {'key': 'doc_type', 'value': doc_type}})
+            break
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {'andAll': conditions}
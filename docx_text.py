@@ -0,0 +1,139 @@
+# Streaming text extraction from Word .docx files using only the standard library
+import posixpath
+import zipfile
+from xml.etree import ElementTree
+
+# Fallback location of the main document part when _rels/.rels does not name it
+DEFAULT_DOCUMENT_PART = 'word/document.xml'
+
+# Decompressed XML fed to the parser at a time
+READ_SIZE = 64 * 1024
+
+# Separates the cells of a table row on its line (whitespace, so text cleaning treats
+# a row like a line of OCR'd text)
+CELL_SEPARATOR = '\t'
+
+_OFFICE_DOCUMENT_REL = '/officeDocument'
+
+# Inline elements that stand for characters in a run
+_INLINE_TEXT = {'tab': '\t', 'br': '\n', 'cr': '\n', 'noBreakHyphen': '-'}
+
+# Containers whose text is not part of the visible document: content moved away
+# (tracked changes) and the fallback copy of markup-compatibility blocks
+_HIDDEN = {'moveFrom', 'Fallback'}
+
+
+def _local(tag):
+    """Tag name without its namespace (Transitional and Strict OOXML use different ones)"""
+    return tag.rpartition('}')[2]
+
+
+def main_document_part(archive):
+    """Name of the main document part in an open .docx zip"""
+    try:
+        rels = ElementTree.fromstring(archive.read('_rels/.rels'))
+    except KeyError:
+        return DEFAULT_DOCUMENT_PART
+    for rel in rels:
+        if rel.get('Type', '').endswith(_OFFICE_DOCUMENT_REL) and rel.get('Target'):
+            return posixpath.normpath(rel.get('Target').lstrip('/'))
+    return DEFAULT_DOCUMENT_PART
+
+
+def iter_docx_lines(fileobj, read_size=READ_SIZE):
+    """Yield the text of a .docx one paragraph or table row at a time
+
+    The main document XML is decompressed straight out of the zip and fed to an
+    incremental parser in read_size pieces. Each element is dropped from the tree
+    as soon as it ends, so memory stays flat however long the document is. Every
+    paragraph becomes one line (line breaks inside it become newlines, tabs stay
+    tabs). Every table row becomes one line with its cells separated by
+    CELL_SEPARATOR; paragraphs within a cell, and nested tables, are joined into
+    the cell's text. Deleted and moved-away tracked changes are left out.
+
+    Args:
+        fileobj: Seekable binary file holding the .docx (e.g. from open_s3_object)
+        read_size (int): Bytes of XML parsed at a time
+
+    Raises:
+        zipfile.BadZipFile: The file is not a .docx (for example a legacy .doc)
+        xml.etree.ElementTree.ParseError: The document XML is damaged
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        with archive.open(main_document_part(archive)) as document:
+            yield from _iter_document_lines(document, read_size)
+
+
+def _iter_document_lines(document, read_size):
+    """Parse a WordprocessingML document stream, yielding lines as paragraphs and rows end"""
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    elements = []     # open elements, to detach each one from its parent when it ends
+    paragraphs = []   # text pieces of each open paragraph (text boxes nest them)
+    tables = []       # per open table: {'row': [cell texts], 'cell': [paragraph texts]}
+    hidden = 0        # depth inside content that is not shown
+    names = {}        # namespaced tag -> local name
+
+    while True:
+        data = document.read(read_size)
+        if data:
+            parser.feed(data)
+        else:
+            parser.close()
+        for event, element in parser.read_events():
+            name = names.get(element.tag)
+            if name is None:
+                name = names[element.tag] = _local(element.tag)
+            if event == 'start':
+                elements.append(element)
+                if name in _HIDDEN:
+                    hidden += 1
+                elif name == 'p':
+                    paragraphs.append([])
+                elif name == 'tbl':
+                    tables.append({'row': None, 'cell': None})
+                elif name == 'tr' and tables:
+                    tables[-1]['row'] = []
+                elif name == 'tc' and tables:
+                    tables[-1]['cell'] = []
+                continue
+
+            elements.pop()
+            line = None
+            # Where a finished paragraph or row goes: the open cell around it, if any
+            enclosing = tables
+            if name in _HIDDEN:
+                hidden -= 1
+            elif name == 't':
+                if paragraphs and not hidden and element.text:
+                    paragraphs[-1].append(element.text)
+            elif name in _INLINE_TEXT:
+                # <w:tabs><w:tab/></w:tabs> in paragraph properties defines tab stops, not tabs
+                if paragraphs and not hidden and not (elements and elements[-1].tag.endswith('}tabs')):
+                    paragraphs[-1].append(_INLINE_TEXT[name])
+            elif name == 'p' and paragraphs:
+                pieces = paragraphs.pop()
+                if not hidden:
+                    line = ''.join(pieces)
+            elif name == 'tc' and tables and tables[-1]['cell'] is not None:
+                cell = ' '.join(text for text in tables[-1]['cell'] if text.strip())
+                tables[-1]['row'].append(cell.replace(CELL_SEPARATOR, ' '))
+                tables[-1]['cell'] = None
+            elif name == 'tr' and tables and tables[-1]['row'] is not None:
+                line = CELL_SEPARATOR.join(tables[-1]['row'])
+                tables[-1]['row'] = None
+                # A row of a nested table belongs to the cell of the table around it
+                enclosing = tables[:-1]
+            elif name == 'tbl' and tables:
+                tables.pop()
+
+            if line is not None:
+                if enclosing and enclosing[-1]['cell'] is not None:
+                    enclosing[-1]['cell'].append(line)
+                else:
+                    yield line
+
+            # Everything needed from this element has been taken; let it be freed
+            if elements:
+                elements[-1].remove(element)
+        if not data:
+            return
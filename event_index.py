@@ -0,0 +1,220 @@
+# Structured calendar event index: written by the document processor, used by the app for date questions
+import re
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+
+from s3_conditional import update_json
+
+EVENT_INDEX_KEY = 'state/calendar-events.json'
+
+# "When is ...", "What date is ...", "Which day does ..." - questions the index can answer
+_DATE_QUESTION_RE = re.compile(r"^\s*(?:when(?:'s)?|what (?:date|day)|which (?:date|day))\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_TIME_RE = re.compile(r'\b\d{1,2}:\d{2}(?:am|pm)\b')
+_YEAR_RE = re.compile(r'^20\d{2}$')
+
+# Question words that say nothing about which event is meant
+STOP_WORDS = frozenset((
+    'when', 'what', 'which', 'date', 'dates', 'day', 'is', 'are', 'was', 'does', 'do', 'did',
+    'will', 'be', 'the', 'a', 'an', 'of', 'on', 'for', 'in', 'at', 'to', 'this', 'next',
+    'our', 'my', 's', 'happen', 'happening', 'held', 'take', 'place', 'please',
+))
+# Words that fit many kinds of event ("When is the school closed?" covers INSET days,
+# bank holidays and half terms), so a question needs at least one other word to be answered
+GENERIC_WORDS = frozenset((
+    'school', 'closed', 'close', 'closure', 'shut', 'open', 'holiday', 'break', 'term', 'week',
+    'event', 'start', 'end', 'finish', 'pupil', 'child', 'children', 'parent', 'class',
+))
+
+
+def _words(text):
+    """Lowercase word tokens, with a trailing plural 's' dropped so "fairs" matches "fair" """
+    words = []
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def _readable_date(iso_date):
+    """Format an ISO date the way the cleaned calendar does, e.g. 'Friday 24th October 2025'"""
+    day = date.fromisoformat(iso_date)
+    suffix = 'th' if 11 <= day.day <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day.day % 10, 'th')
+    return f"{day:%A} {day.day}{suffix} {day:%B %Y}"
+
+
+def event_answer_line(event):
+    """One line of an answer: the cleaned calendar line, or "title: start to end" for ranges"""
+    if event.get('end_date'):
+        return (f"{event['title']}: {_readable_date(event['date'])} "
+                f"to {_readable_date(event['end_date'])}")
+    return event['text']
+
+
+class EventIndexWriter:
+    """Collect calendar events per source document and merge them into the S3 index
+
+    The document processor calls set_events() for each calendar it processes and
+    save() once per invocation. save() merges into the latest stored index with a
+    conditional PUT, so concurrent invocations don't drop each other's documents.
+    """
+
+    def __init__(self, s3_client, bucket, key=EVENT_INDEX_KEY):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self._updates = {}
+        self._lock = threading.Lock()
+
+    def set_events(self, source_key, events):
+        """Replace the events indexed for a source document (an empty list removes it)"""
+        with self._lock:
+            self._updates[source_key] = list(events)
+
+    def save(self, attempts=5):
+        """Merge collected events into the stored index
+
+        Returns:
+            int: Number of source documents updated
+        """
+        with self._lock:
+            updates = dict(self._updates)
+        if not updates:
+            return 0
+
+        def merge(index):
+            sources = index.setdefault('sources', {})
+            for source_key, events in updates.items():
+                if events:
+                    sources[source_key] = events
+                else:
+                    sources.pop(source_key, None)
+            index['updated_at'] = datetime.utcnow().isoformat()
+            return index
+
+        update_json(self.s3_client, self.bucket, self.key, merge, attempts, separators=(',', ':'))
+        with self._lock:
+            for source_key in updates:
+                self._updates.pop(source_key, None)
+        return len(updates)
+
+
+class EventLookup:
+    """Answer "when is X?" questions straight from the event index, without the LLM
+
+    Event titles are tokenized into an inverted index once when the index loads, so
+    a lookup is a few set intersections. An answer is only given when the question
+    is clearly a date question, names the event with at least one word that is not
+    in GENERIC_WORDS, and every meaningful word in it appears in the title of exactly
+    one kind of event (repeats of the same event, such as two half terms, are listed
+    together). Anything less certain returns None and goes to the knowledge base.
+
+    Unless the question names a year, events that are over are left out when the
+    same event is still to come; past events that are listed are labelled as such.
+    """
+
+    def __init__(self, events, max_dates=5, today=date.today):
+        """
+        Args:
+            events (list): Event dicts (date, end_date, title, location, text, source)
+            max_dates (int): Most dates listed for a repeated event
+            today: Returns the current date, injectable for tests
+        """
+        self.events = sorted(events, key=lambda event: event['date'])
+        self.max_dates = max_dates
+        self._today = today
+        self._postings = {}
+        self._title_keys = []
+        for position, event in enumerate(self.events):
+            words = _words(_TIME_RE.sub(' ', event['title']))
+            self._title_keys.append(' '.join(words))
+            for word in set(words) | set(_words(event.get('location') or '')):
+                self._postings.setdefault(word, set()).add(position)
+
+    @classmethod
+    def from_index(cls, index):
+        """Build a lookup from the parsed calendar-events.json"""
+        events = []
+        for source_key, source_events in index.get('sources', {}).items():
+            for event in source_events:
+                events.append(dict(event, source=source_key))
+        return cls(events)
+
+    def answer(self, question):
+        """Return an answer for a clear date question, or None if the index isn't confident"""
+        if not _DATE_QUESTION_RE.match(question):
+            return None
+
+        words = [word for word in _words(question) if word not in STOP_WORDS]
+        years = {word for word in words if _YEAR_RE.match(word)}
+        words = [word for word in words if word not in years]
+        if not words or all(word in GENERIC_WORDS for word in words):
+            return None
+
+        matches = None
+        for word in words:
+            positions = self._postings.get(word)
+            if not positions:
+                return None
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                return None
+
+        today = self._today().isoformat()
+
+        def is_past(event):
+            return (event.get('end_date') or event['date']) < today
+
+        positions = sorted(matches)
+        if years:
+            positions = [p for p in positions if self.events[p]['date'][:4] in years]
+        else:
+            upcoming = [p for p in positions if not is_past(self.events[p])]
+            positions = upcoming or positions
+        if not positions or len({self._title_keys[p] for p in positions}) != 1:
+            return None
+
+        events = [self.events[p] for p in positions[:self.max_dates]]
+        sources = sorted({event['source'].split('/')[-1] for event in events})
+        answer = '; '.join(event_answer_line(event) + (' (already happened)' if is_past(event) else '')
+                           for event in events)
+        return f"{answer}\n\n(From the school calendar: {', '.join(sources)})"
+
+
+class LookupStats:
+    """Thread-safe hit rate and latency of event index lookups"""
+
+    def __init__(self, window=200):
+        self.questions = 0
+        self.hits = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, hit, seconds):
+        """Count one lookup and its duration"""
+        with self._lock:
+            self.questions += 1
+            self.hits += 1 if hit else 0
+            self._latencies.append(seconds)
+
+    def stats(self):
+        """Return lookup counters and the median latency in milliseconds"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                'questions': self.questions,
+                'hits': self.hits,
+                'hit_rate': self.hits / self.questions if self.questions else 0.0,
+                'median_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+            }
+
+
+def timed_answer(lookup, question, stats, clock=time.perf_counter):
+    """Look a question up in the index, recording the outcome in stats"""
+    started = clock()
+    answer = lookup.answer(question)
+    stats.record(answer is not None, clock() - started)
+    return answer
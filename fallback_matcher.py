@@ -0,0 +1,94 @@
+# Compiled matcher for fallback links: one scan per answer and per question
+import re
+
+
+def _normalize_phrase(phrase):
+    """Lowercase a keyword/topic and collapse its whitespace"""
+    return ' '.join(phrase.lower().split())
+
+
+def _trie_regex(phrases):
+    """Build a regex matching any of the phrases, factored into a prefix trie
+
+    Shared prefixes are matched once instead of once per phrase, so the cost of a
+    scan grows with the text length rather than with the number of phrases. At each
+    branch the longer continuation is tried first, so the longest phrase wins.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = []
+        for char in sorted(k for k in node if k):
+            # Any run of whitespace in the text matches a single space in a phrase
+            token = r'\s+' if char == ' ' else re.escape(char)
+            branches.append(token + build(node[char]))
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+
+def compile_phrases(phrases):
+    """Compile phrases into one case-insensitive, whole-word regex, or None if empty"""
+    normalized = sorted({_normalize_phrase(p) for p in phrases if p.strip()})
+    if not normalized:
+        return None
+    return re.compile(r'(?<!\w)(?:' + _trie_regex(normalized) + r')(?!\w)', re.IGNORECASE)
+
+
+class FallbackMatcher:
+    """Fallback link lookup compiled once from fallback_links.json
+
+    Uncertainty keywords and topics are matched as whole words. When a question
+    mentions several topics, the longest one wins (so "term dates" beats "dates"),
+    then the earliest.
+    """
+
+    def __init__(self, fallback_links, uncertainty_keywords):
+        """
+        Args:
+            fallback_links (dict): Topic -> URL, including a 'default' entry
+            uncertainty_keywords (list): Phrases that mark an answer as uncertain
+        """
+        self.default_link = fallback_links.get('default')
+        self._links = {
+            _normalize_phrase(topic): link
+            for topic, link in fallback_links.items() if topic != 'default'
+        }
+        self._uncertainty = compile_phrases(uncertainty_keywords)
+        self._topics = compile_phrases(self._links)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a matcher from the parsed fallback_links.json"""
+        return cls(config['fallback_links'], config['uncertainty_keywords'])
+
+    def is_uncertain(self, answer):
+        """True if the answer contains any uncertainty keyword"""
+        return self._uncertainty is not None and self._uncertainty.search(answer) is not None
+
+    def match_topic(self, question):
+        """Return the best matching topic in the question, or None"""
+        if self._topics is None:
+            return None
+        best = None
+        for match in self._topics.finditer(question):
+            if best is None or len(match.group()) > len(best.group()):
+                best = match
+        return _normalize_phrase(best.group()) if best else None
+
+    def link_for(self, question, answer):
+        """Return the fallback link for an uncertain answer, or None if the answer is confident"""
+        if not self.is_uncertain(answer):
+            return None
+        topic = self.match_topic(question)
+        return self._links[topic] if topic else self.default_link
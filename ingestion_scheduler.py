@@ -0,0 +1,162 @@
+# Debounced knowledge-base ingestion: bursts of document changes collapse into one sync
+import time
+
+from botocore.exceptions import ClientError
+
+from s3_conditional import error_code, read_json, update_json, write_json
+
+# Ingestion job states that mean a sync is already running
+ACTIVE_JOB_STATUSES = ['STARTING', 'IN_PROGRESS', 'STOPPING']
+
+
+class IngestionScheduler:
+    """Record pending document changes in S3 and start one ingestion job once they settle
+
+    Instead of sleeping and then syncing on every upload, callers record_change()
+    and call flush(). flush() only starts an ingestion job when changes are pending,
+    nothing has changed for quiet_seconds (or the oldest change has waited
+    max_delay_seconds), and no other job is running. Otherwise the changes stay
+    pending for the next flush, which a scheduled invocation provides.
+
+    The pending state is one small JSON object updated with S3 conditional writes,
+    so concurrent Lambda invocations and the app never lose each other's changes.
+    """
+
+    def __init__(self, s3_client, bedrock_agent, bucket, knowledge_base_id, data_source_id,
+                 quiet_seconds=60, max_delay_seconds=600, state_key='state/pending-sync.json',
+                 clock=time.time):
+        """
+        Args:
+            s3_client: boto3 S3 client (or a local fake)
+            bedrock_agent: boto3 bedrock-agent client (or a local fake)
+            bucket (str): Bucket holding the state object
+            knowledge_base_id (str): Knowledge base to sync
+            data_source_id (str): Data source to sync
+            quiet_seconds (int): How long changes must settle before syncing
+            max_delay_seconds (int): Sync anyway once the oldest change is this old
+            state_key (str): Object key for the pending-change state
+            clock: Returns the current time in epoch seconds, injectable for tests
+        """
+        self.s3_client = s3_client
+        self.bedrock_agent = bedrock_agent
+        self.bucket = bucket
+        self.knowledge_base_id = knowledge_base_id
+        self.data_source_id = data_source_id
+        self.quiet_seconds = quiet_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.state_key = state_key
+        self._clock = clock
+
+    def record_change(self, keys):
+        """Mark documents as changed so the next eligible flush syncs them
+
+        Args:
+            keys (list): Keys of the changed documents (for logging/inspection)
+        """
+        now = self._clock()
+
+        def mark_pending(state):
+            if not state.get('pending'):
+                state['first_change'] = now
+                state['changes'] = []
+            state['pending'] = True
+            state['last_change'] = now
+            # Keep the list short; it is only for visibility
+            state['changes'] = (state.get('changes', []) + list(keys))[-50:]
+            return state
+
+        self._update_state(mark_pending)
+
+    def flush(self, force=False):
+        """Start an ingestion job if pending changes have settled and none is running
+
+        Args:
+            force (bool): Skip the quiet-period check (still waits for a running job)
+
+        Returns:
+            str: The started ingestion job ID, or None if no job was started
+        """
+        state, etag = self._read_state()
+        if not state.get('pending'):
+            return None
+
+        now = self._clock()
+        settled = now - state['last_change'] >= self.quiet_seconds
+        overdue = now - state.get('first_change', now) >= self.max_delay_seconds
+        if not (force or settled or overdue):
+            print(f"Sync deferred: last change {now - state['last_change']:.0f}s ago")
+            return None
+
+        if self.job_in_progress():
+            print("Sync deferred: an ingestion job is already running")
+            return None
+
+        # Claim the pending changes before starting the job; if someone else
+        # changed the state in the meantime, leave it for the next flush
+        claimed = {'pending': False, 'last_sync': now}
+        if not self._write_state(claimed, etag):
+            return None
+
+        try:
+            response = self.bedrock_agent.start_ingestion_job(
+                knowledgeBaseId=self.knowledge_base_id,
+                dataSourceId=self.data_source_id
+            )
+        except Exception as e:
+            # Put the claimed changes back whatever went wrong, so they are not lost.
+            # A ClientError is usually a job started elsewhere since our check, which
+            # the next flush handles; anything else is still raised to the caller.
+            reason = error_code(e) if isinstance(e, ClientError) else type(e).__name__
+            print(f"Could not start ingestion job ({reason}), keeping changes pending")
+            self._restore_pending(state)
+            if isinstance(e, ClientError):
+                return None
+            raise
+
+        job_id = response.get('ingestionJob', {}).get('ingestionJobId')
+        print(f"✅ Knowledge Base sync started with job ID: {job_id} "
+              f"({len(state.get('changes', []))} pending changes)")
+        return job_id
+
+    def job_in_progress(self):
+        """True if an ingestion job for the data source is currently running"""
+        response = self.bedrock_agent.list_ingestion_jobs(
+            knowledgeBaseId=self.knowledge_base_id,
+            dataSourceId=self.data_source_id,
+            filters=[{'attribute': 'STATUS', 'operator': 'EQ', 'values': ACTIVE_JOB_STATUSES}],
+            maxResults=1
+        )
+        return bool(response.get('ingestionJobSummaries'))
+
+    def pending_state(self):
+        """Return the current pending-change state (for display)"""
+        return self._read_state()[0]
+
+    def _restore_pending(self, claimed_state):
+        """Mark claimed changes pending again, merged with any recorded since the claim"""
+        def restore(state):
+            if state.get('pending'):
+                state['first_change'] = min(state['first_change'], claimed_state['first_change'])
+                state['last_change'] = max(state['last_change'], claimed_state['last_change'])
+                state['changes'] = (claimed_state.get('changes', []) + state.get('changes', []))[-50:]
+            else:
+                state.update(claimed_state)
+            return state
+
+        self._update_state(restore)
+
+    def _read_state(self):
+        """Return (state dict, ETag) or ({}, None) if no state has been written yet"""
+        return read_json(self.s3_client, self.bucket, self.state_key)
+
+    def _write_state(self, state, etag):
+        """Write the state only if it is unchanged since it was read
+
+        Returns:
+            bool: False if another writer got there first
+        """
+        return write_json(self.s3_client, self.bucket, self.state_key, state, etag) is not None
+
+    def _update_state(self, mutate):
+        """Read-modify-write the state, retrying if a concurrent writer wins"""
+        update_json(self.s3_client, self.bucket, self.state_key, mutate)
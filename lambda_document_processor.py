@@ -1,86 +1,85 @@
-import boto3
 import json
 import time
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import unquote_plus
+from aws_clients import get_client
+from ingestion_scheduler import IngestionScheduler
+from document_ingestion import DocumentIngestor
+import calendar_normalizer
+import document_metadata
+import docx_text
+from event_index import EventIndexWriter
+from processing_manifest import ProcessingManifest, code_fingerprint, s3_object_sha256, text_sha256
+from s3_range_reader import open_s3_object
+from s3_stream_writer import S3StreamWriter
+from tracing import Tracer
+
+# Clients live at module scope so warm invocations reuse their connections. Every
+# invocation reads S3 and updates the knowledge base, so those two are built during
+# init; Textract is only needed for PDFs (see textract_client)
+s3_client = get_client('s3')
+bedrock_agent = get_client('bedrock-agent')
+
+# Identifies the extraction/cleaning code; documents processed by other code are redone
+PROCESSOR_VERSION = code_fingerprint(__file__, calendar_normalizer.__file__, document_metadata.__file__,
+                                     docx_text.__file__)
+
+# In-memory copy of the processing manifest, reused (and conditionally refreshed) while warm
+manifest = ProcessingManifest(s3_client, os.environ.get('SOURCE_BUCKET', 'school-qa-docs-v2'))
+
+# Per-stage timings (S3 GET, Textract, cleaning, PUT, ingestion trigger) logged as CloudWatch EMF
+tracer = Tracer(
+    os.environ.get('METRICS_NAMESPACE', 'SchoolQA'), 'document-processor',
+    enabled=os.environ.get('EMF_METRICS', 'true').lower() == 'true'
+)
+
+# Structured calendar events, merged into state/calendar-events.json for the app's date answers
+event_index = EventIndexWriter(s3_client, os.environ.get('SOURCE_BUCKET', 'school-qa-docs-v2'))
 
 def lambda_handler(event, context):
     """
     Process uploaded documents: convert to clean text, then trigger knowledge base sync
     """
+    with tracer.trace('invocation', records=len(event.get('Records', []))):
+        return handle_event(event)
+
+def handle_event(event):
+    """Body of lambda_handler, run inside the invocation trace"""
     
-    # Configuration
-    source_bucket = os.environ.get('SOURCE_BUCKET', 'school-qa-docs-v2')
-    source_prefix = os.environ.get('SOURCE_PREFIX', 'school-docs/')
-    processed_prefix = os.environ.get('PROCESSED_PREFIX', 'processed-docs/')
-    knowledge_base_id = os.environ.get('KNOWLEDGE_BASE_ID', 'D5MRCKWCTD')
-    data_source_id = os.environ.get('DATA_SOURCE_ID', 'T4PVH55UXI')
-    delay_seconds = int(os.environ.get('SYNC_DELAY_SECONDS', '60'))
-    
-    s3_client = boto3.client('s3')
-    bedrock_agent = boto3.client('bedrock-agent')
+    settings = load_settings()
+    scheduler, ingestor = ingestion_clients(settings)
     
     try:
         print(f"Received event: {json.dumps(event)}")
         
-        processed_files = []
-        
-        # Process each S3 event record
-        for record in event.get('Records', []):
-            bucket = record['s3']['bucket']['name']
-            key = record['s3']['object']['key']
-            
-            print(f"Processing file: {key}")
-            
-            # Skip if already processed or not in source folder
-            if key.startswith(processed_prefix):
-                print(f"Skipping already processed file: {key}")
-                continue
-                
-            if not key.startswith(source_prefix):
-                print(f"Skipping file outside source folder: {key}")
-                continue
-            
-            # Skip folder entries
-            if key.endswith('/'):
-                print(f"Skipping folder: {key}")
-                continue
-            
-            # Process the file based on type
-            processed_text = process_document(s3_client, bucket, key)
-            
-            if processed_text:
-                # Save processed text
-                processed_key = save_processed_text(
-                    s3_client, bucket, key, processed_text, processed_prefix
-                )
-                processed_files.append(processed_key)
-                print(f"✅ Processed and saved: {processed_key}")
-            else:
-                print(f"⚠️ Could not process file: {key}")
-        
-        # If we processed any files, trigger knowledge base sync
-        if processed_files:
-            if delay_seconds > 0:
-                print(f"Waiting {delay_seconds} seconds before triggering sync...")
-                time.sleep(delay_seconds)
-            
-            trigger_knowledge_base_sync(bedrock_agent, knowledge_base_id, data_source_id)
-            
-            return {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'message': 'Documents processed and sync triggered',
-                    'processed_files': processed_files
-                })
-            }
-        else:
+        if 'Records' not in event:
+            # Scheduled tick (EventBridge): sync changes that have settled since the last upload
+            with tracer.span('ingestion_trigger'):
+                if settings['ingestion_mode'] == 'incremental':
+                    refresh_document_status(ingestor)
+                    request_periodic_full_sync(scheduler, settings['full_sync_interval_hours'])
+                job_id = trigger_knowledge_base_sync(scheduler, [])
             return {
                 'statusCode': 200,
-                'body': json.dumps('No files processed')
+                'body': json.dumps({'message': 'Scheduled sync check', 'ingestion_job_id': job_id})
             }
         
+        manifest.refresh()
+        
+        # Process records concurrently; each file succeeds or fails on its own
+        records = event.get('Records', [])
+        results = process_records(records, settings['source_prefix'], settings['processed_prefix'],
+                                  settings['max_workers'])
+        body = finish_records(results, settings, scheduler, ingestor)
+        
+        return {
+            # 207 Multi-Status: some files failed, see per-file results
+            'statusCode': 207 if body['failed_files'] else 200,
+            'body': json.dumps(body)
+        }
+        
     except Exception as e:
         print(f"Error processing documents: {str(e)}")
         return {
@@ -88,34 +87,417 @@ def lambda_handler(event, context):
             'body': json.dumps(f'Error: {str(e)}')
         }
 
-def process_document(s3_client, bucket, key):
-    """Process a document based on its file type"""
+def sqs_handler(event, context):
+    """
+    Process S3 upload notifications delivered through SQS, reporting failures per message
+    """
+    with tracer.trace('invocation', records=len(event.get('Records', [])), trigger='sqs'):
+        return handle_sqs_event(event)
+
+def handle_sqs_event(event):
+    """Body of sqs_handler: process every message's files, then report the messages to retry
     
-    file_ext = key.lower().split('.')[-1]
+    Each SQS message carries one S3 event notification. The files of all messages in
+    the batch are processed together with the usual bounded worker pool. A message
+    whose files all succeeded is deleted by SQS; a message with a failed file is listed
+    in batchItemFailures, so only it comes back (and, thanks to the manifest, its
+    files that did succeed are skipped as unchanged). Once a message has been received
+    DEAD_LETTER_AFTER_ATTEMPTS times, or cannot be parsed at all, it is written to the
+    dead-letter prefix instead of being retried again.
+    
+    Returns:
+        dict: {'batchItemFailures': [{'itemIdentifier': message ID}, ...]}
+    """
+    settings = load_settings()
+    scheduler, ingestor = ingestion_clients(settings)
+    messages = event.get('Records', [])
+    
+    manifest.refresh()
+    
+    # Flatten the batch into S3 records, remembering which message each came from
+    records, owners, errors = [], [], {}
+    for message in messages:
+        try:
+            message_records = s3_records_from_message(message)
+        except ValueError as e:
+            print(f"❌ Unreadable message {message.get('messageId')}: {e}")
+            errors[message.get('messageId')] = [str(e)]
+            continue
+        records.extend(message_records)
+        owners.extend([message.get('messageId')] * len(message_records))
+    
+    results = process_records(records, settings['source_prefix'], settings['processed_prefix'],
+                              settings['max_workers'])
+    for owner, result in zip(owners, results):
+        if result['status'] == 'failed':
+            errors.setdefault(owner, []).append(f"{result['key']}: {result['error']}")
     
     try:
-        if file_ext == 'pdf':
-            return process_pdf(s3_client, bucket, key)
-        elif file_ext in ['docx', 'doc']:
-            return process_word_doc(s3_client, bucket, key)
-        elif file_ext == 'txt':
-            return process_text_file(s3_client, bucket, key)
-        else:
-            print(f"Unsupported file type: {file_ext}")
-            return None
-            
+        body = finish_records(results, settings, scheduler, ingestor)
+        print(f"SQS batch: {len(messages)} message(s), {len(body['processed_files'])} processed, "
+              f"{len(body['failed_files'])} failed ({body['message']})")
     except Exception as e:
-        print(f"Error processing {key}: {e}")
-        return None
+        # Files are already recorded as processed; the periodic full sync picks them up
+        print(f"⚠️ Knowledge base update failed for this batch: {e}")
+    
+    failures = []
+    for message in messages:
+        message_id = message.get('messageId')
+        if message_id not in errors:
+            continue
+        attempts = receive_count(message)
+        unreadable = message_id not in owners
+        if (unreadable or attempts >= settings['dead_letter_after_attempts']) and \
+                dead_letter(settings, message, errors[message_id], attempts):
+            continue
+        print(f"🔁 Message {message_id} will be retried (attempt {attempts}): {errors[message_id][0]}")
+        failures.append({'itemIdentifier': message_id})
+    
+    return {'batchItemFailures': failures}
 
-def process_pdf(s3_client, bucket, key):
-    """Convert PDF to clean text using Amazon Textract"""
+def load_settings():
+    """Document processor configuration from the Lambda's environment variables"""
+    return {
+        'source_bucket': os.environ.get('SOURCE_BUCKET', 'school-qa-docs-v2'),
+        'source_prefix': os.environ.get('SOURCE_PREFIX', 'school-docs/'),
+        'processed_prefix': os.environ.get('PROCESSED_PREFIX', 'processed-docs/'),
+        'knowledge_base_id': os.environ.get('KNOWLEDGE_BASE_ID', 'D5MRCKWCTD'),
+        'data_source_id': os.environ.get('DATA_SOURCE_ID', 'T4PVH55UXI'),
+        'quiet_seconds': int(os.environ.get('SYNC_DELAY_SECONDS', '60')),
+        'max_delay_seconds': int(os.environ.get('SYNC_MAX_DELAY_SECONDS', '600')),
+        'max_workers': int(os.environ.get('MAX_PARALLEL_FILES', '4')),
+        # 'incremental' pushes/deletes single documents; 'full' starts data-source ingestion jobs
+        'ingestion_mode': os.environ.get('INGESTION_MODE', 'incremental'),
+        'full_sync_interval_hours': float(os.environ.get('FULL_SYNC_INTERVAL_HOURS', '24')),
+        # SQS entry point: receives of a failing message before it is parked in the dead-letter prefix
+        'dead_letter_after_attempts': int(os.environ.get('DEAD_LETTER_AFTER_ATTEMPTS', '3')),
+        'dead_letter_prefix': os.environ.get('DEAD_LETTER_PREFIX', 'state/dead-letter/'),
+    }
+
+def ingestion_clients(settings):
+    """Debounced full-sync scheduler and per-document ingestor for one invocation"""
+    scheduler = IngestionScheduler(
+        s3_client, bedrock_agent, settings['source_bucket'], settings['knowledge_base_id'],
+        settings['data_source_id'],
+        quiet_seconds=settings['quiet_seconds'], max_delay_seconds=settings['max_delay_seconds']
+    )
+    ingestor = DocumentIngestor(
+        bedrock_agent, s3_client, settings['source_bucket'], settings['knowledge_base_id'],
+        settings['data_source_id'], sidecar_key=document_metadata.sidecar_key
+    )
+    return scheduler, ingestor
+
+def finish_records(results, settings, scheduler, ingestor):
+    """Save the manifest and event index, then update the knowledge base for changed files
+    
+    Returns:
+        dict: Response body (message, processed/deleted/failed files, ingestion job, results)
+    """
+    try:
+        manifest.save()
+    except Exception as e:
+        # Losing manifest entries only means those files are reprocessed next time
+        print(f"⚠️ Could not save processing manifest: {e}")
+    
+    try:
+        event_index.save()
+    except Exception as e:
+        # Date questions fall back to the knowledge base until the index is saved
+        print(f"⚠️ Could not save calendar event index: {e}")
+    
+    processed_files = [r['processed_key'] for r in results if r['status'] == 'processed']
+    deleted_files = [r['processed_key'] for r in results if r['status'] == 'deleted' and r['processed_key']]
+    failed_files = [r['key'] for r in results if r['status'] == 'failed']
+    
+    # Only files whose processed output changed (or was deleted) touch the knowledge base
+    job_id = None
+    if processed_files or deleted_files:
+        with tracer.span('ingestion_trigger'):
+            if settings['ingestion_mode'] == 'incremental' and ingest_documents(ingestor, results):
+                message = 'Documents processed and submitted to the knowledge base'
+            else:
+                # Bursts of uploads collapse into one ingestion job once they have settled
+                job_id = trigger_knowledge_base_sync(scheduler, processed_files + deleted_files)
+                message = 'Documents processed and sync triggered' if job_id else 'Documents processed and sync scheduled'
+    else:
+        message = 'No processed output changed'
+    
+    return {
+        'message': message,
+        'processed_files': processed_files,
+        'deleted_files': deleted_files,
+        'failed_files': failed_files,
+        'ingestion_job_id': job_id,
+        'results': results
+    }
+
+def s3_records_from_message(message):
+    """S3 event records carried in one SQS message body
+    
+    Returns:
+        list: S3 records (empty for the s3:TestEvent S3 sends when notifications are set up)
+        
+    Raises:
+        ValueError: The body is not an S3 event notification
+    """
+    try:
+        body = json.loads(message.get('body') or '')
+    except json.JSONDecodeError as e:
+        raise ValueError(f"body is not JSON ({e})")
+    if not isinstance(body, dict):
+        raise ValueError("body is not an S3 event notification")
+    if body.get('Event') == 's3:TestEvent':
+        return []
+    records = body.get('Records')
+    if not isinstance(records, list) or not all(isinstance(r, dict) and 's3' in r for r in records):
+        raise ValueError("body is not an S3 event notification")
+    return records
+
+def receive_count(message):
+    """How many times SQS has delivered this message, including this time"""
+    try:
+        return int(message.get('attributes', {}).get('ApproximateReceiveCount', '1'))
+    except ValueError:
+        return 1
+
+def dead_letter(settings, message, errors, attempts):
+    """Park a message that keeps failing as a JSON object under the dead-letter prefix
+    
+    Returns:
+        bool: True if it was saved (SQS may then delete it), False to keep retrying
+    """
+    message_id = message.get('messageId') or 'unknown'
+    key = f"{settings['dead_letter_prefix']}{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}-{message_id}.json"
     try:
-        textract = boto3.client('textract')
+        s3_client.put_object(
+            Bucket=settings['source_bucket'],
+            Key=key,
+            Body=json.dumps({
+                'message_id': message_id,
+                'attempts': attempts,
+                'errors': errors,
+                'body': message.get('body'),
+                'dead_lettered_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z'
+            }, indent=1).encode('utf-8'),
+            ContentType='application/json'
+        )
+    except Exception as e:
+        print(f"⚠️ Could not dead-letter message {message_id}, leaving it on the queue: {e}")
+        return False
+    print(f"☠️ Dead-lettered message {message_id} after {attempts} attempt(s): {key}")
+    return True
+
+def process_records(records, source_prefix, processed_prefix, max_workers):
+    """Process S3 event records with a bounded worker pool
+    
+    Args:
+        records (list): S3 event records
+        source_prefix (str): Only keys under this prefix are processed
+        processed_prefix (str): Where cleaned text is written
+        max_workers (int): Maximum files processed at once
+        
+    Returns:
+        list: One result dict per record, in the same order as the records
+    """
+    if not records:
+        return []
+    
+    workers = max(1, min(max_workers, len(records)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(
+            lambda record: process_record(record, source_prefix, processed_prefix),
+            records
+        ))
+
+def process_record(record, source_prefix, processed_prefix):
+    """Process one S3 event record, capturing its outcome instead of raising
+    
+    Returns:
+        dict: key, status ('processed', 'unchanged', 'deleted', 'skipped' or 'failed'),
+              processed_key, duration_ms and error
+    """
+    started = time.perf_counter()
+    bucket = record['s3']['bucket']['name']
+    # Keys in S3 event notifications are URL-encoded (spaces arrive as '+')
+    key = unquote_plus(record['s3']['object']['key'])
+    result = {'key': key, 'status': 'skipped', 'processed_key': None, 'error': None}
+    
+    with tracer.trace('document', key=key) as properties:
+        try:
+            print(f"Processing file: {key}")
+            
+            # Skip if already processed or not in source folder
+            if key.startswith(processed_prefix):
+                print(f"Skipping already processed file: {key}")
+            elif not key.startswith(source_prefix):
+                print(f"Skipping file outside source folder: {key}")
+            elif key.endswith('/'):
+                # Skip folder entries
+                print(f"Skipping folder: {key}")
+            elif record.get('eventName', '').startswith('ObjectRemoved'):
+                processed_key = remove_source_document(bucket, key)
+                result.update(status='deleted', processed_key=processed_key)
+            else:
+                source_etag = record['s3']['object'].get('eTag')
+                status, processed_key = process_source_document(bucket, key, source_etag, processed_prefix)
+                result.update(status=status, processed_key=processed_key)
+        except Exception as e:
+            print(f"❌ Error processing {key}: {e}")
+            result.update(status='failed', error=str(e))
+        properties['status'] = result['status']
+    
+    result['duration_ms'] = round((time.perf_counter() - started) * 1000)
+    return result
+
+def process_source_document(bucket, key, source_etag, processed_prefix):
+    """Process a source document unless the manifest shows nothing would change
+    
+    Args:
+        bucket (str): Source bucket
+        key (str): Source object key
+        source_etag (str): ETag from the S3 event, if present
+        processed_prefix (str): Where cleaned text is written
+        
+    Returns:
+        tuple: (status, processed_key) with status 'processed', 'unchanged' or 'skipped'
+    """
+    source_etag = source_etag.strip('"') if source_etag else None
+    
+    # Same bytes and same code as last time: skip extraction and the PUT entirely
+    if manifest.is_current(key, PROCESSOR_VERSION, source_etag=source_etag):
+        print(f"⏭️ Unchanged since last processing, skipping: {key}")
+        return 'unchanged', manifest.entry(key).get('processed_key')
+    
+    with tracer.span('s3_get'):
+        source_sha256 = s3_object_sha256(s3_client, bucket, key)
+    previous = manifest.entry(key)
+    if manifest.is_current(key, PROCESSOR_VERSION, source_sha256=source_sha256):
+        # Identical content re-uploaded with a different ETag; remember the new ETag
+        manifest.record(key, PROCESSOR_VERSION, source_etag, source_sha256,
+                        previous['processed_key'], previous['output_sha256'],
+                        previous.get('metadata_sha256'))
+        print(f"⏭️ Same content as last processing, skipping: {key}")
+        return 'unchanged', previous['processed_key']
+    
+    # Process the file based on type; calendar events are collected as a side product
+    events = []
+    processed_chunks = process_document(s3_client, bucket, key, events)
+    if processed_chunks is None:
+        return 'skipped', None
+    
+    # Cleaned text streams into the output upload, which is only published at the end
+    writer = open_processed_writer(s3_client, bucket, key, processed_prefix)
+    profile = document_metadata.DocumentProfile(key)
+    try:
+        # Self time of 'clean': the S3 GET, Textract and PUT spans inside it are counted separately
+        with tracer.span('clean'):
+            for chunk in processed_chunks:
+                writer.write(chunk)
+                profile.observe_text(chunk)
+    except Exception:
+        writer.abort()
+        raise
+    
+    if is_calendar_document(key):
+        event_index.set_events(key, events)
+    profile.observe_events(events)
+    
+    output_sha256 = writer.sha256
+    if not writer.size:
+        writer.abort()
+        print(f"⚠️ No text produced for file: {key}")
+        return 'skipped', None
+    
+    if manifest.output_unchanged(key, output_sha256):
+        # New bytes or code, but the cleaned text is the same: nothing written, no ingestion
+        writer.abort()
+        processed_key = previous['processed_key']
+        status = 'unchanged'
+        print(f"⏭️ Processed text unchanged, not rewriting: {processed_key}")
+    else:
+        writer.commit()
+        processed_key = writer.key
+        status = 'processed'
+        print(f"✅ Processed and saved: {processed_key} ({writer.size} bytes)")
+    
+    # Metadata sidecar for retrieval filters; rewritten whenever the output or the metadata changes
+    sidecar_body = profile.sidecar_body()
+    metadata_sha256 = text_sha256(sidecar_body.decode('utf-8'))
+    if status == 'processed' or not manifest.metadata_unchanged(key, metadata_sha256):
+        save_metadata_sidecar(s3_client, bucket, processed_key, sidecar_body)
+        status = 'processed'
+    
+    manifest.record(key, PROCESSOR_VERSION, source_etag, source_sha256, processed_key,
+                    output_sha256, metadata_sha256)
+    return status, processed_key
+
+def remove_source_document(bucket, key):
+    """Delete the processed text, sidecar, manifest entry and calendar events of a deleted source
+    
+    Returns:
+        str: Processed key that was removed, or None if the source was never processed
+    """
+    entry = manifest.entry(key)
+    processed_key = entry.get('processed_key') if entry else None
+    if processed_key:
+        with tracer.span('s3_put'):
+            s3_client.delete_object(Bucket=bucket, Key=processed_key)
+            s3_client.delete_object(Bucket=bucket, Key=document_metadata.sidecar_key(processed_key))
+        print(f"🗑️ Deleted processed output: {processed_key}")
+    if is_calendar_document(key):
+        event_index.set_events(key, [])
+    manifest.forget(key)
+    return processed_key
+
+def process_document(s3_client, bucket, key, events=None):
+    """Process a document based on its file type
+    
+    Args:
+        events (list): Optional list that receives structured calendar events
         
+    Returns:
+        iterable: Chunks of cleaned text, produced lazily, or None if the type isn't processed
+    """
+    
+    file_ext = key.lower().split('.')[-1]
+    
+    # Errors propagate so process_record can report the file as failed
+    if file_ext == 'pdf':
+        return process_pdf(s3_client, bucket, key, events)
+    elif file_ext in ['docx', 'doc']:
+        return process_word_doc(s3_client, bucket, key, events)
+    elif file_ext == 'txt':
+        return process_text_file(s3_client, bucket, key, events)
+    else:
+        print(f"Unsupported file type: {file_ext}")
+        return None
+
+def textract_client():
+    """Shared Textract client, built on first use so text and Word uploads never pay for it"""
+    return get_client('textract')
+
+def process_pdf(s3_client, bucket, key, events=None):
+    """Convert PDF to clean text using Amazon Textract, yielding chunks as pages arrive"""
+    try:
         print(f"Extracting text from PDF: {key}")
         
-        response = textract.detect_document_text(
+        if os.environ.get('TEXTRACT_MODE', 'async') == 'sync':
+            # Synchronous API: single-page documents only
+            pages = [extract_pdf_text_sync(bucket, key)]
+        else:
+            pages = iter_pdf_pages(bucket, key)
+        
+        # Clean up the text for better AI processing, one page at a time
+        yield from iter_clean_document_text(pages, key, events)
+        
+    except Exception as e:
+        print(f"Error processing PDF {key}: {e}")
+        raise
+
+def extract_pdf_text_sync(bucket, key):
+    """Extract text from a single-page PDF with the synchronous Textract API"""
+    with tracer.span('textract'):
+        response = textract_client().detect_document_text(
             Document={
                 'S3Object': {
                     'Bucket': bucket,
@@ -123,171 +505,213 @@ def process_pdf(s3_client, bucket, key):
                 }
             }
         )
+    
+    # Extract text blocks in reading order
+    return '\n'.join(
+        block['Text'] for block in response.get('Blocks', []) if block['BlockType'] == 'LINE'
+    )
+
+def wait_for_textract_job(job_id, timeout_seconds, initial_delay=1.0, max_delay=10.0):
+    """Poll an asynchronous Textract job with exponential backoff until it finishes
+    
+    Polls ask for a single block so waiting doesn't download results repeatedly.
+    
+    Returns:
+        str: Final job status ('SUCCEEDED' or 'PARTIAL_SUCCESS')
+    """
+    deadline = time.monotonic() + timeout_seconds
+    delay = initial_delay
+    while True:
+        response = textract_client().get_document_text_detection(JobId=job_id, MaxResults=1)
+        status = response['JobStatus']
+        if status in ('SUCCEEDED', 'PARTIAL_SUCCESS'):
+            if status == 'PARTIAL_SUCCESS':
+                print(f"⚠️ Textract job {job_id} only partly succeeded: {response.get('Warnings')}")
+            return status
+        if status == 'FAILED':
+            raise RuntimeError(f"Textract job {job_id} failed: {response.get('StatusMessage')}")
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"Textract job {job_id} still {status} after {timeout_seconds}s")
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+def iter_pdf_pages(bucket, key):
+    """Extract a multi-page PDF with asynchronous Textract, yielding one page of text at a time
+    
+    Results are fetched a page of API results at a time (NextToken), so only the
+    blocks of the current API page and the lines of the current document page are
+    held in memory. Textract returns blocks in page order and, within a page, in
+    reading order.
+    
+    Yields:
+        str: Text of each document page, lines separated by newlines
+    """
+    timeout_seconds = int(os.environ.get('TEXTRACT_TIMEOUT_SECONDS', '240'))
+    
+    with tracer.span('textract'):
+        job_id = textract_client().start_document_text_detection(
+            DocumentLocation={
+                'S3Object': {
+                    'Bucket': bucket,
+                    'Name': key
+                }
+            }
+        )['JobId']
+        print(f"Started Textract job {job_id} for {key}")
+        wait_for_textract_job(job_id, timeout_seconds)
+    
+    current_page = None
+    page_lines = []
+    next_token = None
+    while True:
+        request = {'JobId': job_id, 'MaxResults': 1000}
+        if next_token:
+            request['NextToken'] = next_token
+        with tracer.span('textract'):
+            response = textract_client().get_document_text_detection(**request)
         
-        # Extract text blocks in reading order
-        text_blocks = []
         for block in response.get('Blocks', []):
-            if block['BlockType'] == 'LINE':
-                text_blocks.append(block['Text'])
-        
-        raw_text = '\n'.join(text_blocks)
-        
-        # Clean up the text for better AI processing
-        cleaned_text = clean_document_text(raw_text, key)
-        
-        return cleaned_text
+            if block['BlockType'] != 'LINE':
+                continue
+            page = block.get('Page', 1)
+            if page != current_page:
+                if page_lines:
+                    yield '\n'.join(page_lines)
+                current_page = page
+                page_lines = []
+            page_lines.append(block['Text'])
         
-    except Exception as e:
-        print(f"Error processing PDF {key}: {e}")
+        next_token = response.get('NextToken')
+        if not next_token:
+            break
+    
+    if page_lines:
+        yield '\n'.join(page_lines)
+
+def process_word_doc(s3_client, bucket, key, events=None):
+    """Process Word documents: .docx text is extracted and cleaned, legacy .doc is not processed"""
+    if key.lower().endswith('.doc'):
+        # The binary Word 97-2003 format needs more than the standard library
+        print(f"⚠️ Legacy .doc files are not processed, save as .docx and upload again: {key}")
         return None
+    return iter_word_doc(s3_client, bucket, key, events)
 
-def process_word_doc(s3_client, bucket, key):
-    """Process Word documents - let them pass through for now"""
+def iter_word_doc(s3_client, bucket, key, events=None):
+    """Extract .docx text paragraph by paragraph (table rows as lines) and clean it as it streams
+    
+    The zip is read with ranged GETs (the central directory from the end, then the
+    document XML from the front), so neither the file nor its XML is held in memory.
+    """
     try:
-        # Word docs usually process better than PDFs in Bedrock
-        # For now, we'll let Bedrock handle them directly
-        print(f"Word document {key} will be processed by Bedrock directly")
-        return None  # Don't process, let Bedrock handle it
+        print(f"Extracting text from Word document: {key}")
+        
+        with open_s3_object(s3_client, bucket, key, timer=tracer.span) as source:
+            yield from iter_clean_document_text(docx_text.iter_docx_lines(source), key, events)
         
     except Exception as e:
         print(f"Error processing Word doc {key}: {e}")
-        return None
+        raise
 
-def process_text_file(s3_client, bucket, key):
-    """Process plain text files"""
+def process_text_file(s3_client, bucket, key, events=None):
+    """Process plain text files, reading and cleaning them line by line"""
     try:
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
+        with tracer.span('s3_get'):
+            response = s3_client.get_object(Bucket=bucket, Key=key)
         
-        # Clean up text formatting
-        cleaned_text = clean_document_text(content, key)
+        # The body is read incrementally (that time counts as cleaning); only the current line is held in memory
+        lines = (line.decode('utf-8') for line in response['Body'].iter_lines())
         
-        return cleaned_text
+        # Clean up text formatting
+        yield from iter_clean_document_text(lines, key, events)
         
     except Exception as e:
         print(f"Error processing text file {key}: {e}")
-        return None
+        raise
+
+def iter_text_lines(raw_text):
+    """Yield the lines of a text, or of each page (or line) when given an iterable of texts"""
+    if isinstance(raw_text, str):
+        raw_text = [raw_text]
+    for page in raw_text:
+        yield from page.split('\n')
 
 def clean_document_text(raw_text, filename):
-    """Clean up document text for better AI processing"""
+    """Clean up document text for better AI processing
     
-    filename_lower = filename.lower()
+    Args:
+        raw_text: Whole document text, or an iterable of page texts (consumed lazily)
+        filename (str): Source key, used to detect calendar documents
+    """
+    return ''.join(iter_clean_document_text(raw_text, filename))
+
+def is_calendar_document(filename):
+    """True if a document gets calendar-specific cleaning, judged by its name"""
+    return document_metadata.document_type(filename) == 'calendar'
+
+def iter_clean_document_text(raw_text, filename, events=None):
+    """Clean document text lazily, yielding chunks whose concatenation is the cleaned text
+    
+    Args:
+        raw_text: Whole document text, or an iterable of page or line texts
+        filename (str): Source key, used to detect calendar documents
+        events (list): Optional list that receives structured calendar events
+    """
     
     # Special handling for calendar documents
-    if 'calendar' in filename_lower or 'dates' in filename_lower:
-        return clean_calendar_text(raw_text)
+    if is_calendar_document(filename):
+        return iter_clean_calendar_text(raw_text, events)
     
     # General text cleaning
-    return clean_general_text(raw_text)
+    return iter_clean_general_text(raw_text)
 
 def clean_calendar_text(raw_text):
     """Clean up calendar-specific text"""
+    return ''.join(iter_clean_calendar_text(raw_text))
+
+def iter_clean_calendar_text(raw_text, events=None):
+    """Yield cleaned calendar lines, newline-separated, as they are normalized
     
-    lines = raw_text.split('\n')
-    cleaned_lines = []
-    current_month = None
-    current_year = None
-    
-    # Find year in document
-    for line in lines:
-        if '2025' in line or '2026' in line:
-            if '2025' in line:
-                current_year = '2025'
-            if '2026' in line:
-                current_year = '2026'
-            break
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Skip header/footer lines
-        if any(skip in line.lower() for skip in ['key:', 'sh =', 'smc =', 'is =', 'ms =', 'js =', 'tbc =']):
-            continue
-        
-        # Detect month headers
-        months = ['September', 'October', 'November', 'December', 'January', 'February', 'March', 'April', 'May', 'June', 'July']
-        for month in months:
-            if month in line and (current_year in line if current_year else True):
-                current_month = month
-                cleaned_lines.append(f"\n{month.upper()} {current_year or '2025'} EVENTS:\n")
-                break
-        else:
-            # Process event lines
-            if current_month and any(day in line for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']):
-                cleaned_line = format_calendar_event(line, current_month, current_year or '2025')
-                if cleaned_line:
-                    cleaned_lines.append(cleaned_line)
-            elif line and not line.startswith(('KEY:', 'Please note')):
-                cleaned_lines.append(line)
-    
-    return '\n'.join(cleaned_lines)
+    Args:
+        raw_text: Whole document text, or an iterable of page or line texts
+        events (list): Optional list that receives a dict for each dated event
+    """
+    normalizer = calendar_normalizer.CalendarNormalizer(
+        default_year=datetime.utcnow().year,
+        on_event=events.append if events is not None else None
+    )
+    separator = ''
+    for line in normalizer.iter_normalized(iter_text_lines(raw_text)):
+        yield separator + line
+        separator = '\n'
 
 def format_calendar_event(line, month, year):
     """Format calendar event lines for better AI understanding"""
-    try:
-        # Fix common OCR issues
-        line = re.sub(r'(\d+)\s+(st|nd|rd|th)', r'\1\2', line)  # Fix "8 th" -> "8th"
-        
-        # Convert 24-hour times to 12-hour
-        time_conversions = {
-            '15:00': '3:00pm', '15:15': '3:15pm', '15:30': '3:30pm', '15:45': '3:45pm',
-            '16:00': '4:00pm', '16:15': '4:15pm', '16:30': '4:30pm', '16:45': '4:45pm',
-            '10:00': '10:00am', '11:00': '11:00am', '14:00': '2:00pm'
-        }
-        
-        for time_24, time_12 in time_conversions.items():
-            line = line.replace(time_24, time_12)
-        
-        # Convert location codes
-        location_conversions = {
-            ' SH': ', School Hall',
-            ' SMC': ', St Mary\'s Church', 
-            ' IS': ', Infant Site',
-            ' MS': ', Middle Site',
-            ' JS': ', Junior Site'
-        }
-        
-        for code, location in location_conversions.items():
-            line = line.replace(code, location)
-        
-        # Add month and year if missing
-        if month not in line:
-            # Find day pattern and insert month/year
-            day_pattern = r'(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\s+(\d+(?:st|nd|rd|th))'
-            match = re.search(day_pattern, line)
-            if match:
-                day_part = match.group(0)
-                rest = line[match.end():].strip()
-                if rest.startswith(':'):
-                    rest = rest[1:].strip()
-                line = f"{day_part} {month} {year}: {rest}"
-        
-        return line
-        
-    except Exception as e:
-        print(f"Error formatting calendar event: {e}")
-        return line
+    return calendar_normalizer.CalendarNormalizer(default_year=year).format_event(line, month, year)
 
 def clean_general_text(raw_text):
     """General text cleaning for non-calendar documents"""
+    return ''.join(iter_clean_general_text(raw_text))
+
+def iter_clean_general_text(raw_text):
+    """Clean non-calendar text line by line, yielding chunks as lines are produced
     
-    # Remove excessive whitespace
-    lines = [line.strip() for line in raw_text.split('\n')]
-    lines = [line for line in lines if line]  # Remove empty lines
-    
-    # Join with single newlines
-    cleaned_text = '\n'.join(lines)
-    
-    # Fix common OCR issues
-    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)  # Multiple spaces to single
-    cleaned_text = re.sub(r'\n\s*\n', '\n\n', cleaned_text)  # Multiple newlines to double
-    
-    return cleaned_text
+    Whitespace within each line is collapsed, empty lines are dropped and the rest
+    are joined with single spaces (the same result as substituting every whitespace
+    run in the whole text).
+    """
+    separator = ''
+    for line in iter_text_lines(raw_text):
+        line = ' '.join(line.split())
+        if line:
+            yield separator + line
+            separator = ' '
 
-def save_processed_text(s3_client, bucket, original_key, processed_text, processed_prefix):
-    """Save the processed text to S3"""
+def open_processed_writer(s3_client, bucket, original_key, processed_prefix):
+    """Start writing the processed text for a source document
+    
+    Returns:
+        S3StreamWriter: Writer for the processed key; nothing is stored until commit()
+    """
     
     # Create new key in processed folder
     filename = original_key.split('/')[-1]
@@ -301,30 +725,95 @@ def save_processed_text(s3_client, bucket, original_key, processed_text, process
         'processor': 'document-processor-lambda'
     }
     
-    # Upload processed text
-    s3_client.put_object(
-        Bucket=bucket,
-        Key=processed_key,
-        Body=processed_text.encode('utf-8'),
+    # Processed text is uploaded in parts as it is written
+    return S3StreamWriter(
+        s3_client,
+        bucket,
+        processed_key,
+        timer=tracer.span,
         ContentType='text/plain',
         Metadata=metadata
     )
-    
-    return processed_key
 
-def trigger_knowledge_base_sync(bedrock_agent, knowledge_base_id, data_source_id):
-    """Trigger knowledge base sync after processing"""
-    try:
-        print(f"Triggering Knowledge Base sync for KB: {knowledge_base_id}, DS: {data_source_id}")
+def save_metadata_sidecar(s3_client, bucket, processed_key, sidecar_body):
+    """Write the Bedrock .metadata.json sidecar next to a processed document
+    
+    Args:
+        sidecar_body (bytes): Output of DocumentProfile.sidecar_body()
         
-        response = bedrock_agent.start_ingestion_job(
-            knowledgeBaseId=knowledge_base_id,
-            dataSourceId=data_source_id
+    Returns:
+        str: Key of the sidecar object
+    """
+    key = document_metadata.sidecar_key(processed_key)
+    with tracer.span('s3_put'):
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=sidecar_body,
+            ContentType='application/json'
         )
+    print(f"✅ Saved metadata: {key}")
+    return key
+
+def ingest_documents(ingestor, results):
+    """Push processed documents to (and delete removed ones from) the knowledge base directly
+    
+    Args:
+        ingestor (DocumentIngestor): Incremental ingestion client
+        results (list): Per-file results from process_records
         
-        job_id = response.get('ingestionJobId')
-        print(f"✅ Knowledge Base sync started with job ID: {job_id}")
+    Returns:
+        bool: False if the direct API failed and a full sync should be requested instead
+    """
+    processed = [(r['key'], r['processed_key']) for r in results if r['status'] == 'processed']
+    deleted = [(r['key'], r['processed_key']) for r in results if r['status'] == 'deleted' and r['processed_key']]
+    try:
+        ingestor.ingest(processed)
+        ingestor.delete(deleted)
+        return True
+    except Exception as e:
+        # e.g. missing bedrock:IngestKnowledgeBaseDocuments permission; the full sync still works
+        print(f"⚠️ Direct document ingestion failed, falling back to a full sync: {e}")
+        return False
+
+def refresh_document_status(ingestor):
+    """Record the indexing status of recently submitted documents (never fails the tick)"""
+    try:
+        ingestor.refresh()
+    except Exception as e:
+        print(f"⚠️ Could not refresh document status: {e}")
+
+def request_periodic_full_sync(scheduler, interval_hours):
+    """In incremental mode, queue a full data-source sync once every interval_hours as a fallback
+    
+    The sync catches anything the direct document API missed (e.g. objects changed
+    outside the Lambda). It is recorded as a pending change, so the usual debouncing
+    and the running-job check still apply.
+    """
+    if interval_hours <= 0:
+        return
+    state = scheduler.pending_state()
+    last_sync = state.get('last_sync')
+    if state.get('pending') or (last_sync and time.time() - last_sync < interval_hours * 3600):
+        return
+    print(f"🔁 Periodic full sync due (every {interval_hours:g} hours)")
+    scheduler.record_change(['periodic-full-sync'])
+
+def trigger_knowledge_base_sync(scheduler, changed_keys):
+    """Record changed documents and start a knowledge base sync if they have settled
+    
+    Args:
+        scheduler (IngestionScheduler): Debounced ingestion scheduler
+        changed_keys (list): Processed keys written by this invocation (may be empty)
+        
+    Returns:
+        str: Started ingestion job ID, or None if the sync was deferred
+    """
+    try:
+        if changed_keys:
+            scheduler.record_change(changed_keys)
+        return scheduler.flush()
         
     except Exception as e:
         print(f"❌ Error triggering sync: {e}")
-        raise
\ No newline at end of file
+        raise
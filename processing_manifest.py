@@ -0,0 +1,156 @@
+# Manifest of processed source documents, so unchanged uploads skip OCR, the PUT and ingestion
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+from s3_conditional import error_code, update_json
+
+
+def code_fingerprint(*paths):
+    """Hash source files into a processor version, so any code change reprocesses documents
+
+    Args:
+        *paths: Paths of the modules whose code affects processed output
+
+    Returns:
+        str: Short hex digest of the files' contents
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def text_sha256(text):
+    """SHA-256 of processed text, used to detect outputs that did not change"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def s3_object_sha256(s3_client, bucket, key, chunk_size=1024 * 1024):
+    """Stream an S3 object through SHA-256 without holding it in memory"""
+    digest = hashlib.sha256()
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    for chunk in body.iter_chunks(chunk_size):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProcessingManifest:
+    """JSON manifest in S3 mapping each source key to its content hash and processor version
+
+    The Lambda keeps one instance at module scope; refresh() re-reads it with an
+    ETag conditional GET, so warm invocations usually get a 304 and reuse the copy
+    in memory. save() merges this invocation's entries into the latest stored copy
+    with a conditional PUT, so concurrent invocations don't drop each other's entries.
+    """
+
+    def __init__(self, s3_client, bucket, key='state/processing-manifest.json'):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self._entries = {}
+        self._etag = None
+        self._updates = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Reload the manifest from S3 if it changed since the last read"""
+        entries, etag = self._fetch(self._etag)
+        with self._lock:
+            if etag is not None:
+                self._entries, self._etag = entries, etag
+
+    def entry(self, source_key):
+        """Return the manifest entry for a source key, or None"""
+        with self._lock:
+            if source_key in self._updates:
+                return self._updates[source_key]
+            return self._entries.get(source_key)
+
+    def is_current(self, source_key, processor_version, source_etag=None, source_sha256=None):
+        """True if the source was already processed with this exact content and code
+
+        The S3 ETag is checked first since it comes free with the event; the
+        content hash catches identical re-uploads whose ETag differs (multipart).
+        """
+        entry = self.entry(source_key)
+        if not entry or entry.get('processor_version') != processor_version:
+            return False
+        if source_etag and entry.get('source_etag') == source_etag:
+            return True
+        return bool(source_sha256) and entry.get('source_sha256') == source_sha256
+
+    def output_unchanged(self, source_key, output_sha256):
+        """True if the processed text is identical to what was last written for this source"""
+        entry = self.entry(source_key)
+        return bool(entry) and entry.get('output_sha256') == output_sha256
+
+    def metadata_unchanged(self, source_key, metadata_sha256):
+        """True if the metadata sidecar is identical to what was last written for this source"""
+        entry = self.entry(source_key)
+        return bool(entry) and entry.get('metadata_sha256') == metadata_sha256
+
+    def record(self, source_key, processor_version, source_etag, source_sha256,
+               processed_key, output_sha256, metadata_sha256=None):
+        """Remember how a source was processed; persisted by save()"""
+        with self._lock:
+            self._updates[source_key] = {
+                'processor_version': processor_version,
+                'source_etag': source_etag,
+                'source_sha256': source_sha256,
+                'processed_key': processed_key,
+                'output_sha256': output_sha256,
+                'metadata_sha256': metadata_sha256,
+                'processed_at': datetime.utcnow().isoformat(),
+            }
+
+    def forget(self, source_key):
+        """Drop a deleted source from the manifest; persisted by save()"""
+        with self._lock:
+            self._updates[source_key] = None
+
+    def save(self, attempts=5):
+        """Merge recorded entries into the stored manifest
+
+        Returns:
+            int: Number of entries written
+        """
+        with self._lock:
+            updates = dict(self._updates)
+        if not updates:
+            return 0
+
+        def merge(entries):
+            for source_key, entry in updates.items():
+                if entry is None:
+                    entries.pop(source_key, None)
+                else:
+                    entries[source_key] = entry
+            return entries
+
+        entries, etag = update_json(self.s3_client, self.bucket, self.key, merge, attempts,
+                                    indent=1, sort_keys=True)
+        with self._lock:
+            self._entries = entries
+            self._etag = etag
+            for source_key in updates:
+                self._updates.pop(source_key, None)
+        return len(updates)
+
+    def _fetch(self, etag):
+        """Return (entries, ETag); ETag is None when unchanged (304) or not yet created"""
+        request = {'Bucket': self.bucket, 'Key': self.key}
+        if etag:
+            request['IfNoneMatch'] = etag
+        try:
+            response = self.s3_client.get_object(**request)
+        except ClientError as e:
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+            if status == 304 or error_code(e) in ('304', 'NotModified', 'NoSuchKey', '404'):
+                return {}, None
+            raise
+        return json.loads(response['Body'].read().decode('utf-8')), response.get('ETag')
@@ -0,0 +1,751 @@
+# Streamlit-free question answering shared by the Streamlit app and the query API service
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from config import (
+    AWS_REGION, S3_BUCKET, S3_PREFIX, DATA_SOURCE_ID, KNOWLEDGE_BASE_ID,
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, STREAM_ANSWERS,
+    CONFIG_REFRESH_SECONDS, INGESTION_QUIET_SECONDS, EVENT_INDEX_ANSWERS,
+    SEARCH_RESULTS_LIMIT, QUERY_MODE, RETRIEVAL_CACHE_TTL_SECONDS, CONTEXT_TOKEN_BUDGET,
+    MIN_RELATIVE_SCORE, RETRIEVAL_FILTERS, BEDROCK_RATE_PER_SECOND, BEDROCK_BURST,
+    BEDROCK_MAX_CONCURRENT, BEDROCK_QUEUE_DEADLINE_SECONDS, BEDROCK_MAX_ATTEMPTS,
+    EMF_METRICS, METRICS_NAMESPACE, WARM_UP, MAX_SUGGESTED_QUESTIONS, UPLOAD_CONCURRENCY,
+    UPLOAD_MULTIPART_THRESHOLD_MB, UPLOAD_PART_SIZE_MB, UPLOAD_PART_CONCURRENCY, INGESTION_MODE
+)
+from boto3.s3.transfer import TransferConfig
+from aws_clients import get_client
+from config_store import ConfigStore
+from fallback_matcher import FallbackMatcher
+from answer_cache import AnswerCache, cache_key
+from ingestion_scheduler import IngestionScheduler
+from single_flight import SingleFlight
+from answer_stream import StreamError, StreamedAnswer
+from bedrock_admission import BUSY_MESSAGE, BUSY_RETRYING_MESSAGE, AdmissionController, BedrockBusy
+from event_index import EVENT_INDEX_KEY, EventLookup, LookupStats, timed_answer
+from retrieval import build_user_prompt, estimate_tokens, select_passages, split_prompt
+from document_metadata import question_filter, sidecar_key
+from document_ingestion import QUERYABLE_STATUSES, FINAL_STATUSES, DocumentIngestor
+from tracing import Tracer
+from warmup import Warmer, parse_suggested_questions
+from upload_batch import UploadBatch
+
+SUGGESTED_QUESTIONS_KEY = 'config/suggested_questions.json'
+
+@functools.lru_cache(maxsize=None)
+def aws_client(service_name):
+    """Pooled, long-lived AWS client shared by every session and rerun"""
+    return get_client(service_name, region_name=AWS_REGION)
+
+@functools.lru_cache(maxsize=None)
+def bedrock_config_store():
+    """Background-refreshed Bedrock configuration shared by every session"""
+    return ConfigStore(aws_client('s3'), S3_BUCKET, 'config/bedrock_config.json',
+                       'bedrock_config.json', refresh_seconds=CONFIG_REFRESH_SECONDS)
+
+@functools.lru_cache(maxsize=None)
+def fallback_config_store():
+    """Background-refreshed fallback links, compiled into a matcher whenever they load"""
+    return ConfigStore(aws_client('s3'), S3_BUCKET, 'config/fallback_links.json',
+                       'fallback_links.json', refresh_seconds=CONFIG_REFRESH_SECONDS,
+                       transform=FallbackMatcher.from_config)
+
+def load_bedrock_config():
+    """Load Bedrock configuration from S3 (last good copy, refreshed in the background)"""
+    return bedrock_config_store().get()
+
+def bedrock_config_version():
+    """Version of the loaded Bedrock configuration, for keying downstream caches"""
+    return bedrock_config_store().version
+
+def load_fallback_matcher():
+    """Load the compiled fallback links matcher (last good copy, refreshed in the background)"""
+    return fallback_config_store().get()
+
+@functools.lru_cache(maxsize=None)
+def suggested_questions_store():
+    """Background-refreshed suggested questions, edited by admins in the admin panel"""
+    return ConfigStore(aws_client('s3'), S3_BUCKET, SUGGESTED_QUESTIONS_KEY,
+                       'suggested_questions.json', refresh_seconds=CONFIG_REFRESH_SECONDS)
+
+def load_suggested_questions():
+    """Suggested questions shown under the question box (last good copy)"""
+    return parse_suggested_questions(suggested_questions_store().get(), MAX_SUGGESTED_QUESTIONS)
+
+def save_suggested_questions(questions, updated_by):
+    """Replace the suggested questions in S3 and warm answers for them
+    
+    Args:
+        questions (list): Questions in display order; blanks and repeats are dropped
+        updated_by (str): User name stored in the object metadata
+        
+    Returns:
+        tuple: (success_bool, error message or None)
+    """
+    questions = parse_suggested_questions({'questions': questions}, MAX_SUGGESTED_QUESTIONS)
+    try:
+        aws_client('s3').put_object(
+            Bucket=S3_BUCKET,
+            Key=SUGGESTED_QUESTIONS_KEY,
+            Body=json.dumps({'questions': questions}, indent=2).encode('utf-8'),
+            ContentType='application/json',
+            Metadata={'updated_by': updated_by}
+        )
+        suggested_questions_store().refresh()
+        get_warmer().wake()
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+@functools.lru_cache(maxsize=None)
+def event_index_store():
+    """Background-refreshed calendar event index written by the document processor Lambda"""
+    return ConfigStore(aws_client('s3'), S3_BUCKET, EVENT_INDEX_KEY, None,
+                       refresh_seconds=CONFIG_REFRESH_SECONDS, transform=EventLookup.from_index)
+
+@functools.lru_cache(maxsize=None)
+def get_event_lookup_stats():
+    """Hit rate and latency of date questions answered from the event index"""
+    return LookupStats()
+
+def answer_from_event_index(question):
+    """Answer a clear date question from the calendar event index, or None to ask the KB"""
+    if not EVENT_INDEX_ANSWERS:
+        return None
+    try:
+        with get_tracer().span('event_index'):
+            return timed_answer(event_index_store().get(), question, get_event_lookup_stats())
+    except Exception as e:
+        print(f"Event index lookup failed: {e}")
+        return None
+
+@functools.lru_cache(maxsize=None)
+def get_answer_cache():
+    """Process-wide answer cache shared by every Streamlit session"""
+    return AnswerCache(max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl_seconds=ANSWER_CACHE_TTL_SECONDS)
+
+@functools.lru_cache(maxsize=None)
+def get_retrieval_cache():
+    """Process-wide cache of Retrieve results for two-stage mode"""
+    return AnswerCache(max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl_seconds=RETRIEVAL_CACHE_TTL_SECONDS)
+
+@functools.lru_cache(maxsize=None)
+def get_single_flight():
+    """Process-wide coalescer for identical in-flight questions"""
+    return SingleFlight()
+
+@functools.lru_cache(maxsize=None)
+def get_tracer():
+    """Process-wide tracer: per-stage EMF metrics and rolling latency percentiles"""
+    return Tracer(METRICS_NAMESPACE, 'app', enabled=EMF_METRICS)
+
+@functools.lru_cache(maxsize=None)
+def get_stream_timings():
+    """Recent (time-to-first-token, total) timings for streamed answers, in seconds"""
+    return deque(maxlen=100)
+
+# Poll for new ingestions at most once a minute
+INGESTION_MARKER_TTL_SECONDS = 60
+_ingestion_marker_lock = threading.Lock()
+_ingestion_marker = (None, None)  # (marker, time.monotonic() when checked)
+_document_status = {}  # Per-document status object as of the last marker check or admin refresh
+
+def latest_ingestion_marker():
+    """Return a marker for the latest knowledge base change, or None if unknown
+
+    Covers jobs started by sync_knowledge_base and by the document processor Lambda,
+    and documents the Lambda ingested directly (incremental mode), so cached answers
+    are dropped whenever the knowledge base content changes. The
+    result is reused for INGESTION_MARKER_TTL_SECONDS; callers arriving while it is
+    being refreshed wait for that one call instead of making their own. If the check
+    fails, the last known marker is kept, so a transient AWS error never looks like
+    a new ingestion (which would clear the answer cache).
+    """
+    global _ingestion_marker
+    with _ingestion_marker_lock:
+        marker, checked = _ingestion_marker
+        if checked is None or time.monotonic() - checked >= INGESTION_MARKER_TTL_SECONDS:
+            try:
+                marker = _fetch_latest_ingestion_marker()
+            except Exception as e:
+                print(f"Could not check for new ingestions, keeping marker {marker}: {e}")
+            _ingestion_marker = (marker, time.monotonic())
+        return marker
+
+def _fetch_latest_ingestion_marker():
+    """Marker that changes when an ingestion job completes or directly ingested documents finish
+
+    Returns None if nothing has ever been ingested. Raises if either check fails, so
+    a marker is never built from half of its parts.
+    """
+    response = aws_client('bedrock-agent').list_ingestion_jobs(
+        knowledgeBaseId=KNOWLEDGE_BASE_ID,
+        dataSourceId=DATA_SOURCE_ID,
+        filters=[{'attribute': 'STATUS', 'operator': 'EQ', 'values': ['COMPLETE']}],
+        sortBy={'attribute': 'STARTED_AT', 'order': 'DESCENDING'},
+        maxResults=1
+    )
+    jobs = response.get('ingestionJobSummaries', [])
+    job_id = jobs[0]['ingestionJobId'] if jobs else None
+    
+    # Documents pushed by the document processor finish without an ingestion job; checking
+    # them here also records when each one became queryable for the admin panel
+    generation = 0
+    if INGESTION_MODE == 'incremental':
+        generation = refresh_document_status().get('generation', 0)
+    if job_id is None and not generation:
+        return None
+    return f"{job_id}/{generation}"
+
+@functools.lru_cache(maxsize=None)
+def document_ingestor():
+    """Per-document knowledge base ingestion status, shared with the document processor Lambda"""
+    return DocumentIngestor(aws_client('bedrock-agent'), aws_client('s3'), S3_BUCKET,
+                            KNOWLEDGE_BASE_ID, DATA_SOURCE_ID, sidecar_key=sidecar_key)
+
+def refresh_document_status():
+    """Ask Bedrock about documents still being indexed and keep the result for document_statuses"""
+    global _document_status
+    _document_status = document_ingestor().refresh()
+    return _document_status
+
+def document_statuses(refresh=False, limit=20):
+    """Most recently submitted documents and when each became queryable, for the admin panel
+    
+    Without refresh this is the status recorded by the last ingestion marker check,
+    so it costs no AWS calls until that check is due again.
+    
+    Args:
+        refresh (bool): Ask Bedrock about documents that are still being indexed now
+        limit (int): Most rows returned
+        
+    Returns:
+        list: Dicts with document, source_key, action, status, queryable, reason,
+              submitted_at and seconds_to_final, newest first
+    """
+    if refresh:
+        state = refresh_document_status()
+    else:
+        latest_ingestion_marker()
+        state = _document_status
+    rows = []
+    for processed_key, entry in state.get('documents', {}).items():
+        rows.append({
+            'document': os.path.basename(entry.get('source_key') or processed_key),
+            'source_key': entry.get('source_key'),
+            'action': entry.get('action'),
+            'status': entry.get('status'),
+            'final': entry.get('status') in FINAL_STATUSES,
+            'queryable': entry.get('status') in QUERYABLE_STATUSES,
+            'reason': entry.get('reason'),
+            'submitted_at': entry.get('submitted_at'),
+            'submitted_epoch': entry.get('submitted_epoch', 0),
+            'seconds_to_final': entry.get('seconds_to_final'),
+        })
+    rows.sort(key=lambda row: -row['submitted_epoch'])
+    return rows[:limit]
+
+def get_fallback_link(question, answer):
+    """Get appropriate fallback link based on question content and answer uncertainty"""
+    tracer = get_tracer()
+    try:
+        with tracer.span('fallback_config_load'):
+            matcher = load_fallback_matcher()
+        # Keywords and topics are compiled once per config version, not per answer
+        with tracer.span('fallback_match'):
+            return matcher.link_for(question, answer)
+    except Exception as e:
+        return None
+
+def document_key(filename):
+    """S3 key an uploaded document is stored under; any directory part of the name is dropped"""
+    return f"{S3_PREFIX}{os.path.basename(filename)}"
+
+@functools.lru_cache(maxsize=None)
+def upload_transfer_config():
+    """Multipart settings for document uploads
+    
+    Parts of a file go up in parallel, and several files upload at once, so
+    UPLOAD_CONCURRENCY * UPLOAD_PART_CONCURRENCY should stay within the S3
+    client's connection pool (AWS_MAX_POOL_CONNECTIONS).
+    """
+    return TransferConfig(
+        multipart_threshold=UPLOAD_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+        multipart_chunksize=UPLOAD_PART_SIZE_MB * 1024 * 1024,
+        max_concurrency=UPLOAD_PART_CONCURRENCY,
+        use_threads=True
+    )
+
+def upload_document(fileobj, filename, uploaded_by, on_progress=None):
+    """Upload a document to the knowledge base folder in S3
+    
+    Args:
+        fileobj: Readable binary file object
+        filename (str): Original file name
+        uploaded_by (str): User name stored in the object metadata
+        on_progress: Optional callable receiving each count of bytes sent (from transfer threads)
+        
+    Returns:
+        tuple: (success_bool, error message or None)
+    """
+    tracer = get_tracer()
+    file_key = document_key(filename)
+    with tracer.trace('upload', key=file_key, uploaded_by=uploaded_by) as properties:
+        try:
+            s3_client = aws_client('s3')
+            with tracer.span('s3_upload'):
+                s3_client.upload_fileobj(
+                    fileobj,
+                    S3_BUCKET,
+                    file_key,
+                    ExtraArgs={'Metadata': {'uploaded_by': uploaded_by}},
+                    Config=upload_transfer_config(),
+                    Callback=on_progress
+                )
+            properties['outcome'] = 'uploaded'
+            return True, None
+        except Exception as e:
+            properties['outcome'] = 'failed'
+            properties['error'] = str(e)
+            return False, str(e)
+
+def start_upload_batch(files, uploaded_by, upload=None, sync=True):
+    """Upload several documents at once in the background
+    
+    Poll the returned batch's progress() for per-file progress bars. In full
+    ingestion mode, once every file has finished one knowledge base sync is
+    requested for the uploaded files (the debounced scheduler holds it until the
+    document processor has caught up), instead of one per file. In incremental
+    mode the document processor submits each document itself as it is processed.
+    
+    Args:
+        files (list): (fileobj, filename, size in bytes) tuples
+        uploaded_by (str): User name stored in each object's metadata
+        upload: Optional callable (fileobj, filename, on_bytes) -> (success_bool, error);
+            defaults to upload_document in this process
+        sync (bool): Request the knowledge base sync when the batch finishes
+        
+    Returns:
+        UploadBatch: Started batch; its completion is the (success_bool, job ID) of the sync
+    """
+    if upload is None:
+        def upload(fileobj, filename, on_bytes):
+            return upload_document(fileobj, filename, uploaded_by, on_progress=on_bytes)
+    
+    def on_complete(results):
+        uploaded = [document_key(r['filename']) for r in results if r['state'] == 'done']
+        total_bytes = sum(r['size'] or 0 for r in results if r['state'] == 'done')
+        print(f"📤 Uploaded {len(uploaded)}/{len(results)} files "
+              f"({total_bytes / 1024 / 1024:.1f} MB) in {batch.seconds:.2f}s")
+        if sync and uploaded and INGESTION_MODE == 'full':
+            return sync_knowledge_base(uploaded)
+        return None
+    
+    batch = UploadBatch(upload, files, max_workers=UPLOAD_CONCURRENCY, on_complete=on_complete)
+    return batch.start()
+
+@functools.lru_cache(maxsize=None)
+def ingestion_scheduler():
+    """Debounced ingestion scheduler shared with the document processor Lambda"""
+    return IngestionScheduler(
+        aws_client('s3'), aws_client('bedrock-agent'), S3_BUCKET,
+        KNOWLEDGE_BASE_ID, DATA_SOURCE_ID, quiet_seconds=INGESTION_QUIET_SECONDS
+    )
+
+def sync_knowledge_base(changed_keys=None):
+    """Request a knowledge base sync after upload
+    
+    The request is recorded as a pending change; the sync starts now only if
+    changes have settled and no ingestion job is running, otherwise the next
+    scheduled flush picks it up.
+    
+    Args:
+        changed_keys (list): Keys of uploaded documents, if known
+        
+    Returns:
+        tuple: (success_bool, ingestion job ID or 'Scheduled')
+    """
+    try:
+        scheduler = ingestion_scheduler()
+        scheduler.record_change(changed_keys or ['admin-sync'])
+        job_id = scheduler.flush()
+        return True, job_id or 'Scheduled'
+    except Exception as e:
+        print(f"Error syncing knowledge base: {str(e)}")
+        return False, None
+
+def retrieval_filter_for(question):
+    """Metadata filter for the month, year, term and topic named in a question, or None"""
+    return question_filter(question) if RETRIEVAL_FILTERS else None
+
+def vector_search_configuration(retrieval_filter=None):
+    """vectorSearchConfiguration for Retrieve and RetrieveAndGenerate, with an optional filter"""
+    configuration = {'numberOfResults': SEARCH_RESULTS_LIMIT}
+    if retrieval_filter:
+        configuration['filter'] = retrieval_filter
+    return configuration
+
+def build_generation_configuration(config, retrieval_filter=None):
+    """Build the retrieveAndGenerateConfiguration shared by the blocking and streaming calls"""
+    generation_configuration = {
+        'type': 'KNOWLEDGE_BASE',
+        'knowledgeBaseConfiguration': {
+            'knowledgeBaseId': KNOWLEDGE_BASE_ID,
+            'modelArn': config['model_arn'],
+            'generationConfiguration': {
+                'inferenceConfig': {
+                    'textInferenceConfig': {
+                        'temperature': config.get('temperature', 0.1),
+                        'maxTokens': config.get('max_tokens', 1000)
+                    }
+                },
+                'promptTemplate': {
+                    'textPromptTemplate': config.get('prompt_template', config['system_instructions'] + '\n\nQuestion: $query$\n\nAnswer:')
+                }
+            }
+        }
+    }
+    if retrieval_filter:
+        generation_configuration['knowledgeBaseConfiguration']['retrievalConfiguration'] = {
+            'vectorSearchConfiguration': vector_search_configuration(retrieval_filter)
+        }
+    return generation_configuration
+
+def add_fallback_link(question, answer):
+    """Append a fallback link to the answer if it indicates uncertainty"""
+    fallback_link = get_fallback_link(question, answer)
+    if fallback_link:
+        answer += f"\n\nFor more information, please visit: {fallback_link}"
+    return answer
+
+@functools.lru_cache(maxsize=None)
+def get_admission():
+    """Process-wide admission controller for Bedrock runtime calls"""
+    return AdmissionController(
+        BEDROCK_RATE_PER_SECOND, BEDROCK_BURST, BEDROCK_MAX_CONCURRENT,
+        deadline_seconds=BEDROCK_QUEUE_DEADLINE_SECONDS, max_attempts=BEDROCK_MAX_ATTEMPTS
+    )
+
+def call_bedrock(request, on_status=None):
+    """Run a Bedrock request through the shared admission controller
+    
+    Args:
+        request: Zero-argument callable making the call
+        on_status: Optional callable receiving a short message while throttled calls are retried
+        
+    Returns:
+        The value returned by request()
+    """
+    def on_retry(attempt, delay):
+        print(f"Bedrock throttled (attempt {attempt}), retrying in {delay:.2f}s")
+        if on_status:
+            on_status(BUSY_RETRYING_MESSAGE)
+    
+    tracer = get_tracer()
+    
+    def timed_request():
+        with tracer.span('bedrock'):
+            return request()
+    
+    # Self time of this span is queueing for admission and backing off from throttles
+    with tracer.span('bedrock_admission'):
+        return get_admission().call(timed_request, on_retry=on_retry)
+
+def consume_stream(streamed, response, on_text):
+    """Read a Bedrock answer stream; an error after text has been shown is not retried"""
+    try:
+        return streamed.consume(response['stream'], on_text)
+    except Exception as e:
+        if streamed.text:
+            raise StreamError(f"Answer interrupted: {e}") from e
+        raise
+
+def generate_answer(question, config, on_status=None):
+    """Ask Bedrock for an answer and append a fallback link if the answer is uncertain
+    
+    Args:
+        question (str): Question as typed by the user
+        config (dict): Loaded bedrock_config
+        on_status: Optional callable for "busy, retrying" messages
+        
+    Returns:
+        str: Answer text, including any fallback link
+    """
+    bedrock_agent_runtime = aws_client('bedrock-agent-runtime')
+    retrieval_filter = retrieval_filter_for(question)
+    
+    response = call_bedrock(lambda: bedrock_agent_runtime.retrieve_and_generate(
+        input={'text': question},
+        retrieveAndGenerateConfiguration=build_generation_configuration(config, retrieval_filter)
+    ), on_status)
+    
+    # A filter that matched no documents (e.g. not yet re-processed with metadata): ask again unfiltered
+    cited = any(citation.get('retrievedReferences') for citation in response.get('citations', []))
+    if retrieval_filter and not cited:
+        response = call_bedrock(lambda: bedrock_agent_runtime.retrieve_and_generate(
+            input={'text': question},
+            retrieveAndGenerateConfiguration=build_generation_configuration(config)
+        ), on_status)
+    
+    return add_fallback_link(question, response['output']['text'])
+
+def streaming_filter(question, on_status=None):
+    """Retrieval filter for a streamed answer, or None if the question's filter matches nothing
+    
+    A streamed answer cannot be asked again once its text is on screen, so a
+    one-result Retrieve checks the filter first; generate_answer and
+    retrieve_results instead repeat their call unfiltered when it found nothing.
+    """
+    retrieval_filter = retrieval_filter_for(question)
+    if not retrieval_filter:
+        return None
+    bedrock_agent_runtime = aws_client('bedrock-agent-runtime')
+    response = call_bedrock(lambda: bedrock_agent_runtime.retrieve(
+        knowledgeBaseId=KNOWLEDGE_BASE_ID,
+        retrievalQuery={'text': question},
+        retrievalConfiguration={
+            'vectorSearchConfiguration': {'numberOfResults': 1, 'filter': retrieval_filter}
+        }
+    ), on_status)
+    if not response.get('retrievalResults'):
+        # e.g. documents not yet re-processed with metadata: search the whole knowledge base
+        return None
+    return retrieval_filter
+
+def stream_answer(question, config, on_text, on_status=None):
+    """Stream an answer from Bedrock, passing partial text to on_text as it arrives
+    
+    The fallback link check needs the whole answer, so it runs once the stream finishes.
+    
+    Args:
+        question (str): Question as typed by the user
+        config (dict): Loaded bedrock_config
+        on_text: Callable receiving the answer text received so far
+        on_status: Optional callable for "busy, retrying" messages
+        
+    Returns:
+        str: Complete answer text, including any fallback link
+    """
+    bedrock_agent_runtime = aws_client('bedrock-agent-runtime')
+    retrieval_filter = streaming_filter(question, on_status)
+    
+    def request():
+        streamed = StreamedAnswer()
+        streamed.start()
+        response = bedrock_agent_runtime.retrieve_and_generate_stream(
+            input={'text': question},
+            retrieveAndGenerateConfiguration=build_generation_configuration(config, retrieval_filter)
+        )
+        consume_stream(streamed, response, on_text)
+        return streamed
+    
+    streamed = call_bedrock(request, on_status)
+    
+    get_stream_timings().append((streamed.time_to_first_token, streamed.total_time))
+    print(f"Streamed answer: first token after {streamed.time_to_first_token or 0:.2f}s, "
+          f"complete after {streamed.total_time:.2f}s")
+    
+    return add_fallback_link(question, streamed.text)
+
+def retrieve_results(question, on_status=None):
+    """Retrieve passages for a question, serving repeats from the retrieval cache
+    
+    Returns:
+        tuple: (retrievalResults list, True if served from cache)
+    """
+    retrieval_cache = get_retrieval_cache()
+    key = cache_key(question, SEARCH_RESULTS_LIMIT)
+    results = retrieval_cache.get(key)
+    if results is not None:
+        return results, True
+    
+    bedrock_agent_runtime = aws_client('bedrock-agent-runtime')
+    retrieval_filter = retrieval_filter_for(question)
+    response = call_bedrock(lambda: bedrock_agent_runtime.retrieve(
+        knowledgeBaseId=KNOWLEDGE_BASE_ID,
+        retrievalQuery={'text': question},
+        retrievalConfiguration={
+            'vectorSearchConfiguration': vector_search_configuration(retrieval_filter)
+        }
+    ), on_status)
+    results = response.get('retrievalResults', [])
+    if retrieval_filter and not results:
+        # The filter matched nothing; search the whole knowledge base instead
+        response = call_bedrock(lambda: bedrock_agent_runtime.retrieve(
+            knowledgeBaseId=KNOWLEDGE_BASE_ID,
+            retrievalQuery={'text': question},
+            retrievalConfiguration={'vectorSearchConfiguration': vector_search_configuration()}
+        ), on_status)
+        results = response.get('retrievalResults', [])
+    retrieval_cache.put(key, results)
+    return results, False
+
+def two_stage_answer(question, config, on_text=None, on_status=None):
+    """Answer with a cached Retrieve call followed by a Converse call on trimmed passages
+    
+    Logs the latency of each stage and the prompt size, estimated before sending and
+    as counted by the model.
+    
+    Args:
+        question (str): Question as typed by the user
+        config (dict): Loaded bedrock_config
+        on_text: Optional callable for streamed partial answers
+        on_status: Optional callable for "busy, retrying" messages
+        
+    Returns:
+        str: Answer text, including any fallback link
+    """
+    started = time.perf_counter()
+    results, cached = retrieve_results(question, on_status)
+    retrieve_seconds = time.perf_counter() - started
+    
+    passages = select_passages(results, CONTEXT_TOKEN_BUDGET, MIN_RELATIVE_SCORE)
+    system_prompt, template = split_prompt(config)
+    user_prompt = build_user_prompt(template, passages, question)
+    request = {
+        'modelId': config['model_arn'],
+        'system': [{'text': system_prompt}],
+        'messages': [{'role': 'user', 'content': [{'text': user_prompt}]}],
+        'inferenceConfig': {
+            'temperature': config.get('temperature', 0.1),
+            'maxTokens': config.get('max_tokens', 1000)
+        }
+    }
+    
+    bedrock_runtime = aws_client('bedrock-runtime')
+    generate_started = time.perf_counter()
+    if on_text is not None:
+        def converse_stream():
+            streamed = StreamedAnswer()
+            streamed.start()
+            consume_stream(streamed, bedrock_runtime.converse_stream(**request), on_text)
+            return streamed
+        
+        streamed = call_bedrock(converse_stream, on_status)
+        answer = streamed.text
+        usage = streamed.metadata.get('usage', {})
+        get_stream_timings().append((streamed.time_to_first_token, streamed.total_time))
+    else:
+        response = call_bedrock(lambda: bedrock_runtime.converse(**request), on_status)
+        answer = ''.join(block.get('text', '') for block in response['output']['message']['content'])
+        usage = response.get('usage', {})
+    generate_seconds = time.perf_counter() - generate_started
+    
+    print(f"Two-stage answer: retrieve {retrieve_seconds * 1000:.0f} ms "
+          f"({len(results)} results{', cached' if cached else ''}, {len(passages)} kept), "
+          f"generate {generate_seconds * 1000:.0f} ms, "
+          f"prompt ~{estimate_tokens(system_prompt + user_prompt)} tokens estimated / "
+          f"{usage.get('inputTokens', '?')} counted, {usage.get('outputTokens', '?')} output tokens")
+    
+    return add_fallback_link(question, answer)
+
+def query_agentcore_runtime(question, on_text=None, on_status=None, refresh=False):
+    """Query the knowledge base, serving calendar date questions and repeat questions without it
+    
+    Args:
+        question (str): Question as typed by the user
+        on_text: Optional callable for streamed partial answers. When given and
+            STREAM_ANSWERS is enabled, the answer is streamed as it is generated.
+        on_status: Optional callable receiving a "busy, retrying" message while
+            throttled Bedrock calls are retried
+        refresh: Generate the answer again and re-cache it even if a cached
+            answer exists, without counting a cache hit or miss
+            
+    Returns:
+        str: Answer text, a busy message if Bedrock stayed throttled, or an error message
+    """
+    with get_tracer().trace('ask', question_chars=len(question)) as properties:
+        return _query_knowledge_base(question, on_text, on_status, refresh, properties)
+
+def _query_knowledge_base(question, on_text, on_status, refresh, properties):
+    """Body of query_agentcore_runtime; notes in properties how the question was answered"""
+    try:
+        # "When is X?" questions with one clear answer in the calendar skip the LLM
+        indexed_answer = answer_from_event_index(question)
+        if indexed_answer is not None:
+            properties['answered_by'] = 'event_index'
+            return indexed_answer
+        
+        with get_tracer().span('config_load'):
+            config, config_version = bedrock_config_store().snapshot()
+        
+        # Drop cached answers if the knowledge base has been re-ingested since they were made
+        answer_cache = get_answer_cache()
+        ingestion_marker = latest_ingestion_marker()
+        answer_cache.sync_generation(ingestion_marker)
+        get_retrieval_cache().sync_generation(ingestion_marker)
+        key = cache_key(question, config_version)
+        cached_answer = None if refresh else answer_cache.get(key)
+        if cached_answer is not None:
+            properties['answered_by'] = 'cache'
+            return cached_answer
+        
+        properties['answered_by'] = QUERY_MODE
+        
+        def generate_and_cache():
+            if QUERY_MODE == 'two_stage':
+                streaming = on_text is not None and STREAM_ANSWERS
+                answer = two_stage_answer(question, config, on_text if streaming else None, on_status)
+            elif on_text is not None and STREAM_ANSWERS:
+                answer = stream_answer(question, config, on_text, on_status)
+            else:
+                answer = generate_answer(question, config, on_status)
+            # Only successful answers are cached; errors fall through to the except below
+            answer_cache.put(key, answer)
+            return answer
+        
+        # Sessions asking the same question at the same time share one Bedrock call
+        return get_single_flight().do(key, generate_and_cache)
+        
+    except BedrockBusy as e:
+        print(f"Bedrock busy: {e}")
+        properties['answered_by'] = 'busy'
+        return BUSY_MESSAGE
+    except Exception as e:
+        properties['answered_by'] = 'error'
+        return f"Error querying knowledge base: {str(e)}"
+
+def prepare_process():
+    """Load every config and create every AWS client a question needs, so no user waits for them"""
+    with get_tracer().span('warmup_prepare'):
+        for service_name in ('s3', 'bedrock-agent', 'bedrock-agent-runtime', 'bedrock-runtime'):
+            aws_client(service_name)
+        bedrock_config_store().get()
+        fallback_config_store().get()
+        if EVENT_INDEX_ANSWERS:
+            event_index_store().get()
+        get_admission()
+
+def warm_answer(question):
+    """Answer a suggested question afresh so it is cached for a full TTL; raises if Bedrock gave no answer"""
+    # A cache hit would not extend the entry's expiry, so always regenerate
+    answer = query_agentcore_runtime(question, refresh=True)
+    if answer == BUSY_MESSAGE or answer.startswith('Error querying knowledge base'):
+        raise RuntimeError(answer)
+    return answer
+
+def warmup_generation():
+    """Inputs to the warmed answers; a warm-up runs again when any of them changes"""
+    return {
+        'ingestion': latest_ingestion_marker(),
+        'config': bedrock_config_version(),
+        'questions': suggested_questions_store().version,
+    }
+
+@functools.lru_cache(maxsize=None)
+def get_warmer():
+    """Process-wide warm-up of the suggested questions' answers"""
+    return Warmer(
+        load_suggested_questions, warm_answer, warmup_generation, prepare=prepare_process,
+        poll_seconds=INGESTION_MARKER_TTL_SECONDS,
+        # Refresh answers shortly before the answer cache would expire them
+        max_age_seconds=max(ANSWER_CACHE_TTL_SECONDS - 2 * INGESTION_MARKER_TTL_SECONDS,
+                            INGESTION_MARKER_TTL_SECONDS)
+    )
+
+def start_warmup():
+    """Start warming answers in the background, once per process (no-op when WARM_UP is off)"""
+    if WARM_UP:
+        get_warmer().start()
@@ -0,0 +1,203 @@
+# Client for the query API service (api_service.py), used by the Streamlit thin client
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from bedrock_admission import BUSY_MESSAGE
+
+# Seconds to wait for an answer; Bedrock calls behind the service have their own timeouts
+ASK_TIMEOUT_SECONDS = 120
+UPLOAD_TIMEOUT_SECONDS = 300
+HEALTH_TIMEOUT_SECONDS = 5
+# Document status with refresh asks Bedrock about every pending document
+ADMIN_TIMEOUT_SECONDS = 30
+# Uploads are sent in chunks of this size, so progress can be shown and the file is never held whole
+UPLOAD_CHUNK_BYTES = 256 * 1024
+# Suggested questions are shown on every rerun; ask the service for them at most this often
+SUGGESTED_QUESTIONS_TTL_SECONDS = 60
+
+_suggested_lock = threading.Lock()
+_suggested = {'questions': None, 'fetched': 0.0}
+
+
+def _error_detail(e):
+    """The detail message of an HTTP error response from the service"""
+    try:
+        return json.loads(e.read()).get('detail') or str(e)
+    except Exception:
+        return str(e)
+
+
+def ask(base_url, question, on_text=None, on_status=None):
+    """Ask the query service a question
+
+    Args:
+        base_url (str): Service URL, e.g. "http://school-qa-api:8000"
+        question (str): Question as typed by the user
+        on_text: Optional callable receiving the answer text so far; when given the
+            answer is streamed as newline-delimited JSON
+        on_status: Optional callable receiving "busy, retrying" messages while streaming
+
+    Returns:
+        str: Answer text, or an error message
+    """
+    request = urllib.request.Request(
+        base_url.rstrip('/') + '/ask',
+        data=json.dumps({'question': question, 'stream': on_text is not None}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=ASK_TIMEOUT_SECONDS) as response:
+            if on_text is None:
+                return json.load(response)['answer']
+            text = ''
+            for line in response:
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if 'delta' in message:
+                    text += message['delta']
+                    on_text(text)
+                elif 'status' in message:
+                    if on_status:
+                        on_status(message['status'])
+                elif 'answer' in message:
+                    return message['answer']
+            return text
+    except urllib.error.HTTPError as e:
+        if e.code == 503:
+            return BUSY_MESSAGE
+        return f"Error querying knowledge base: {_error_detail(e)}"
+    except Exception as e:
+        return f"Error querying knowledge base: {str(e)}"
+
+
+def _file_chunks(fileobj, on_bytes=None, chunk_size=UPLOAD_CHUNK_BYTES):
+    """Yield a file in chunks, reporting each chunk's size to on_bytes as it is sent"""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+        if on_bytes:
+            on_bytes(len(chunk))
+
+
+def upload(base_url, api_key, fileobj, filename, uploaded_by, on_bytes=None, size=None):
+    """Upload a document through the query service, streaming it in chunks
+
+    Args:
+        on_bytes: Optional callable receiving the number of bytes in each chunk sent
+        size (int): File size if known; sent as Content-Length, otherwise the body
+            is sent with chunked transfer encoding
+
+    Returns:
+        tuple: (success_bool, error message or None)
+    """
+    query = urllib.parse.urlencode({'filename': filename})
+    headers = {
+        'Content-Type': 'application/octet-stream',
+        'X-Api-Key': api_key,
+        'X-Uploaded-By': uploaded_by,
+    }
+    if size is not None:
+        headers['Content-Length'] = str(size)
+    request = urllib.request.Request(
+        f"{base_url.rstrip('/')}/upload?{query}",
+        data=_file_chunks(fileobj, on_bytes),
+        headers=headers,
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=UPLOAD_TIMEOUT_SECONDS) as response:
+            response.read()
+        return True, None
+    except urllib.error.HTTPError as e:
+        return False, _error_detail(e)
+    except Exception as e:
+        return False, str(e)
+
+
+def health(base_url):
+    """Return the service's /health document (status, queries in flight, cache stats)"""
+    with urllib.request.urlopen(base_url.rstrip('/') + '/health', timeout=HEALTH_TIMEOUT_SECONDS) as response:
+        return json.load(response)
+
+
+def documents(base_url, api_key, refresh=False):
+    """Return the service's document status rows for the admin panel
+
+    Args:
+        base_url (str): Service URL
+        api_key (str): Shared API_UPLOAD_KEY
+        refresh (bool): Ask Bedrock about documents still being indexed first
+
+    Returns:
+        list: Rows as returned by qa_core.document_statuses
+
+    Raises:
+        RuntimeError: If the service refuses the request or cannot be reached
+    """
+    query = urllib.parse.urlencode({'refresh': 'true' if refresh else 'false'})
+    request = urllib.request.Request(f"{base_url.rstrip('/')}/documents?{query}",
+                                     headers={'X-Api-Key': api_key})
+    try:
+        with urllib.request.urlopen(request, timeout=ADMIN_TIMEOUT_SECONDS) as response:
+            return json.load(response)['documents']
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(_error_detail(e)) from e
+
+
+def save_suggested_questions(base_url, api_key, questions, updated_by):
+    """Replace the suggested questions through the service, which warms their answers
+
+    Returns:
+        tuple: (success_bool, error message or None)
+    """
+    request = urllib.request.Request(
+        base_url.rstrip('/') + '/suggested-questions',
+        data=json.dumps({'questions': questions}).encode('utf-8'),
+        headers={
+            'Content-Type': 'application/json',
+            'X-Api-Key': api_key,
+            'X-Uploaded-By': updated_by,
+        },
+        method='PUT',
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=ADMIN_TIMEOUT_SECONDS) as response:
+            response.read()
+        return True, None
+    except urllib.error.HTTPError as e:
+        return False, _error_detail(e)
+    except Exception as e:
+        return False, str(e)
+
+
+def suggested_questions(base_url, refresh=False):
+    """Suggested questions from the service, cached for SUGGESTED_QUESTIONS_TTL_SECONDS
+
+    Args:
+        base_url (str): Service URL
+        refresh (bool): Ask the service now, e.g. straight after saving new questions
+
+    Returns:
+        list: Questions in display order; the last good list (or []) if the service
+            cannot be reached
+    """
+    with _suggested_lock:
+        cached, fetched = _suggested['questions'], _suggested['fetched']
+    if cached is not None and not refresh and time.monotonic() - fetched < SUGGESTED_QUESTIONS_TTL_SECONDS:
+        return cached
+    try:
+        with urllib.request.urlopen(base_url.rstrip('/') + '/suggested-questions',
+                                    timeout=HEALTH_TIMEOUT_SECONDS) as response:
+            questions = json.load(response)['questions']
+    except Exception as e:
+        print(f"Could not load suggested questions from the query service: {e}")
+        return cached or []
+    with _suggested_lock:
+        _suggested.update(questions=questions, fetched=time.monotonic())
+    return questions
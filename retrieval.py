@@ -0,0 +1,90 @@
+# Two-stage answering helpers: trim Retrieve results to a token budget and build the Converse prompt
+import math
+
+# Rough size of a Claude token in English text; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Estimate the number of model tokens in a text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _passage_key(text):
+    """Lowercase a passage and collapse its whitespace, for duplicate detection"""
+    return ' '.join(text.lower().split())
+
+
+def select_passages(results, token_budget, min_relative_score=0.5):
+    """Keep the best distinct passages from Retrieve results that fit in a token budget
+
+    Passages are taken best score first. A passage is dropped when it scores below
+    min_relative_score times the best score, when it repeats (or is contained in) a
+    passage already kept, or when it would overflow the budget. The best passage is
+    always kept, truncated if it is larger than the whole budget.
+
+    Args:
+        results (list): retrievalResults from the bedrock-agent-runtime Retrieve API
+        token_budget (int): Maximum estimated tokens of passage text
+        min_relative_score (float): Fraction of the best score a passage needs
+
+    Returns:
+        list: Dicts with text, source, score and tokens, best first
+    """
+    ranked = sorted(results, key=lambda result: result.get('score', 0.0), reverse=True)
+    best_score = ranked[0].get('score', 0.0) if ranked else 0.0
+
+    selected = []
+    kept_keys = []
+    used_tokens = 0
+    for result in ranked:
+        text = result.get('content', {}).get('text', '').strip()
+        score = result.get('score', 0.0)
+        if not text or score < best_score * min_relative_score:
+            continue
+
+        key = _passage_key(text)
+        if any(key in kept or kept in key for kept in kept_keys):
+            continue
+
+        tokens = estimate_tokens(text)
+        if used_tokens + tokens > token_budget:
+            if selected:
+                continue
+            text = text[:token_budget * CHARS_PER_TOKEN]
+            tokens = estimate_tokens(text)
+
+        location = result.get('location', {})
+        source = location.get('s3Location', {}).get('uri') or location.get('type', '')
+        selected.append({'text': text, 'source': source, 'score': score, 'tokens': tokens})
+        kept_keys.append(key)
+        used_tokens += tokens
+    return selected
+
+
+def format_search_results(passages):
+    """Render kept passages for the $search_results$ placeholder, numbered with their source"""
+    return '\n\n'.join(
+        f"[{number}] (source: {passage['source'].split('/')[-1] or 'unknown'})\n{passage['text']}"
+        for number, passage in enumerate(passages, start=1)
+    )
+
+
+def split_prompt(config):
+    """Return (system prompt, user prompt template) from bedrock_config
+
+    prompt_template starts with a verbatim copy of system_instructions. That copy is
+    removed here so the instructions are sent once, as the system prompt.
+    """
+    instructions = config['system_instructions']
+    template = config.get('prompt_template', 'Question: $query$\n\nAnswer:')
+    if template.startswith(instructions):
+        template = template[len(instructions):].lstrip()
+    if '$search_results$' not in template:
+        template = 'Search results:\n\n$search_results$\n\n' + template
+    return instructions, template
+
+
+def build_user_prompt(template, passages, question):
+    """Fill the user prompt template with the kept passages and the question"""
+    return template.replace('$search_results$', format_search_results(passages)).replace('$query$', question)
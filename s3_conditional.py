@@ -0,0 +1,82 @@
+# Small JSON state objects in S3, updated with conditional writes so concurrent writers never lose changes
+import json
+
+from botocore.exceptions import ClientError
+
+# Error codes for a conditional PUT that lost to a concurrent writer
+CONFLICT_CODES = ('PreconditionFailed', 'ConditionalRequestConflict', '412', '409')
+# Error codes for an object that has not been written yet
+MISSING_CODES = ('NoSuchKey', '404')
+
+
+def error_code(error):
+    """The error code of a botocore ClientError, e.g. 'NoSuchKey'"""
+    return error.response.get('Error', {}).get('Code', '')
+
+
+def read_json(s3_client, bucket, key):
+    """Read a JSON object
+
+    Returns:
+        tuple: (parsed value, ETag), or ({}, None) if the object does not exist
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if error_code(e) in MISSING_CODES:
+            return {}, None
+        raise
+    return json.loads(response['Body'].read().decode('utf-8')), response.get('ETag')
+
+
+def write_json(s3_client, bucket, key, value, etag, **dump_options):
+    """Write a JSON object only if it still has the ETag it was read with
+
+    Args:
+        etag (str): ETag from read_json, or None if the object did not exist
+        **dump_options: Passed to json.dumps, e.g. indent=1
+
+    Returns:
+        str: The new ETag, or None if another writer changed the object first
+    """
+    conditional = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+    try:
+        response = s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=json.dumps(value, **dump_options).encode('utf-8'),
+            ContentType='application/json',
+            **conditional
+        )
+    except ClientError as e:
+        if error_code(e) in CONFLICT_CODES:
+            return None
+        raise
+    # A missing ETag still means the write happened
+    return response.get('ETag') or ''
+
+
+def update_json(s3_client, bucket, key, mutate, attempts=5, **dump_options):
+    """Read-modify-write a JSON object, retrying when a concurrent writer wins
+
+    Args:
+        mutate: Callable taking the current value ({} if none) and returning the
+            new value, or None to leave the stored object as it is
+        attempts (int): Conditional writes tried before giving up
+        **dump_options: Passed to json.dumps
+
+    Returns:
+        tuple: (value now stored, its ETag)
+
+    Raises:
+        RuntimeError: Every attempt lost to a concurrent writer
+    """
+    for _ in range(attempts):
+        value, etag = read_json(s3_client, bucket, key)
+        mutated = mutate(value)
+        if mutated is None:
+            return value, etag
+        new_etag = write_json(s3_client, bucket, key, mutated, etag, **dump_options)
+        if new_etag is not None:
+            return mutated, new_etag
+    raise RuntimeError(f"Could not update {key} after {attempts} attempts")
@@ -0,0 +1,92 @@
+# Read an S3 object as a seekable file with ranged GETs, so random-access formats need not be downloaded whole
+import contextlib
+import io
+
+# Bytes fetched per ranged GET (the read-ahead of the buffered reader)
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+class S3RangeReader(io.RawIOBase):
+    """Seekable, read-only view of one S3 object version
+
+    Each read is a GET with a Range header, pinned to the object's ETag with
+    IfMatch, so an overwrite while reading fails instead of mixing two versions.
+    Wrap it in io.BufferedReader (see open_s3_object) so small reads share one
+    request; zipfile, for example, seeks to the central directory at the end and
+    then streams a member from the front.
+    """
+
+    def __init__(self, s3_client, bucket, key, timer=None):
+        """
+        Args:
+            s3_client: boto3 S3 client (or a local fake)
+            bucket (str): Bucket of the object
+            key (str): Object key
+            timer: Optional callable(name) returning a context manager that times each
+                request as 's3_get', e.g. Tracer.span
+        """
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self._timer = timer or (lambda name: contextlib.nullcontext())
+        with self._timer('s3_get'):
+            head = s3_client.head_object(Bucket=bucket, Key=key)
+        self.size = head['ContentLength']
+        self.etag = head.get('ETag')
+        self.requests = 0
+        self._position = 0
+
+    def readable(self):
+        """Always readable"""
+        return True
+
+    def seekable(self):
+        """Always seekable (positions map to byte ranges)"""
+        return True
+
+    def tell(self):
+        """Current byte position"""
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Move the position; no request is made until the next read"""
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if position < 0:
+            # OSError, as for real files: zipfile relies on it to spot files too small to be a zip
+            raise OSError(f"negative seek position {position}")
+        self._position = position
+        return position
+
+    def readinto(self, buffer):
+        """Fill buffer from the current position with one ranged GET; 0 at the end"""
+        if self._position >= self.size or not len(buffer):
+            return 0
+        end = min(self._position + len(buffer), self.size) - 1
+        conditions = {'IfMatch': self.etag} if self.etag else {}
+        with self._timer('s3_get'):
+            response = self.s3_client.get_object(
+                Bucket=self.bucket, Key=self.key, Range=f"bytes={self._position}-{end}", **conditions
+            )
+            data = response['Body'].read()
+        self.requests += 1
+        count = len(data)
+        buffer[:count] = data
+        self._position += count
+        return count
+
+
+def open_s3_object(s3_client, bucket, key, buffer_size=DEFAULT_BUFFER_SIZE, timer=None):
+    """Buffered, seekable reader over an S3 object (close it, or use it as a context manager)
+
+    Args:
+        buffer_size (int): Bytes requested per GET; memory use is about this much
+    """
+    return io.BufferedReader(S3RangeReader(s3_client, bucket, key, timer=timer), buffer_size=buffer_size)
@@ -0,0 +1,100 @@
+# Write text to S3 in bounded-size parts, hashing it on the way, so memory stays constant
+import contextlib
+import hashlib
+
+# S3 multipart parts must be at least 5 MiB (except the last)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3StreamWriter:
+    """Accumulate text chunks and upload them as a multipart upload, part by part
+
+    Small outputs (under one part) are sent with a single PUT on commit(). Larger
+    outputs start a multipart upload as soon as the first part is full, so at
+    most one part is buffered at a time. Nothing is visible in S3 until commit();
+    abort() discards everything, which lets callers compare the SHA-256 of the
+    finished output before deciding whether to publish it.
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=8 * 1024 * 1024, timer=None, **put_args):
+        """
+        Args:
+            s3_client: boto3 S3 client (or a local fake)
+            bucket (str): Destination bucket
+            key (str): Destination key
+            part_size (int): Bytes buffered before a part is uploaded (at least 5 MiB)
+            timer: Optional callable(name) returning a context manager that times each
+                upload request as 's3_put', e.g. Tracer.span
+            **put_args: Extra object arguments, e.g. ContentType and Metadata
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.put_args = put_args
+        self._timer = timer or (lambda name: contextlib.nullcontext())
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+
+    @property
+    def sha256(self):
+        """Hex SHA-256 of everything written so far"""
+        return self._digest.hexdigest()
+
+    def write(self, text):
+        """Append text (encoded as UTF-8), uploading a part whenever one is full"""
+        data = text.encode('utf-8')
+        self._digest.update(data)
+        self.size += len(data)
+        self._buffer += data
+        if len(self._buffer) >= self.part_size:
+            # Parts may be any size over the minimum, so the whole buffer goes as one
+            self._upload_part(self._buffer)
+            self._buffer = bytearray()
+
+    def commit(self):
+        """Publish the object: one PUT for small outputs, else complete the multipart upload"""
+        if self._upload_id is None:
+            with self._timer('s3_put'):
+                self.s3_client.put_object(
+                    Bucket=self.bucket, Key=self.key, Body=self._buffer, **self.put_args
+                )
+        else:
+            if self._buffer:
+                self._upload_part(self._buffer)
+            with self._timer('s3_put'):
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={'Parts': self._parts}
+                )
+        self._buffer = bytearray()
+
+    def abort(self):
+        """Discard the output; an unfinished multipart upload is cancelled"""
+        if self._upload_id is not None:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id
+            )
+            self._upload_id = None
+        self._buffer = bytearray()
+
+    def _upload_part(self, body):
+        with self._timer('s3_put'):
+            if self._upload_id is None:
+                self._upload_id = self.s3_client.create_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, **self.put_args
+                )['UploadId']
+            part_number = len(self._parts) + 1
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                PartNumber=part_number,
+                Body=body
+            )
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
@@ -0,0 +1,77 @@
+# Request coalescing so concurrent identical questions share one Bedrock call
+import threading
+
+
+class _Call:
+    """An in-flight call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # The leader was interrupted by a BaseException (e.g. a Streamlit rerun) and
+        # produced neither a result nor an error; a follower runs fn() again
+        self.abandoned = False
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into a single execution
+
+    The first caller for a key (the leader) runs the function; callers that arrive
+    while it is running wait and receive the leader's result or exception. If the
+    leader is interrupted instead (its session reran, for example), the waiting
+    callers start over and one of them becomes the new leader.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.collapsed = 0
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers with the same key
+
+        Args:
+            key: Hashable identifier for the work (e.g. the answer cache key)
+            fn: Zero-argument callable performing the work
+
+        Returns:
+            The value returned by fn() in the leader call
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = _Call()
+                    self._calls[key] = call
+                else:
+                    self.collapsed += 1
+
+            if is_leader:
+                break
+            call.done.wait()
+            if call.abandoned:
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            call.abandoned = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """Number of distinct keys currently being computed"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,70 @@
+# Tests for the process-wide answer cache
+from answer_cache import AnswerCache, cache_key
+
+
+class Clock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_ignores_case_spacing_and_trailing_punctuation():
+    assert cache_key('When are  PE days?', 'v1') == cache_key('when are pe days', 'v1')
+    assert cache_key('When are PE days?', 'v1') != cache_key('When are PE days?', 'v2')
+
+
+def test_least_recently_used_entry_is_evicted_when_full():
+    cache = AnswerCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'size': 2}
+
+
+def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    cache = AnswerCache(ttl_seconds=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 9.9
+    assert cache.get('a') == 1
+    clock.now = 10
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_put_restarts_the_ttl():
+    clock = Clock()
+    cache = AnswerCache(ttl_seconds=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 8
+    cache.put('a', 2)
+    clock.now = 15
+    assert cache.get('a') == 2
+
+
+def test_new_ingestion_generation_clears_the_cache():
+    cache = AnswerCache()
+    cache.put('a', 1)
+    # The first marker seen describes the index the cached answers came from
+    assert cache.sync_generation('job-1/0') is False
+    assert cache.get('a') == 1
+    assert cache.sync_generation('job-1/0') is False
+    assert cache.sync_generation('job-2/0') is True
+    assert cache.get('a') is None
+
+
+def test_unknown_generation_never_clears_the_cache():
+    cache = AnswerCache()
+    cache.sync_generation('job-1/0')
+    cache.put('a', 1)
+    assert cache.sync_generation(None) is False
+    assert cache.get('a') == 1
+    assert cache.sync_generation('job-1/0') is False
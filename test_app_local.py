@@ -0,0 +1,34 @@
+# Tests for the Streamlit app's admin panel helpers, run outside Streamlit
+import pytest
+
+import app_agentcore
+from bedrock_admission import BedrockBusy
+from test_bedrock_admission import make_controller
+
+
+@pytest.fixture
+def captions(monkeypatch):
+    shown = []
+    monkeypatch.setattr(app_agentcore.st, 'caption', shown.append)
+    return shown
+
+
+def test_admission_caption_before_any_call_is_admitted(captions):
+    # Every call so far timed out in the queue, so there are no wait times yet
+    controller = make_controller(rate_per_second=1, burst=0.5)
+    with pytest.raises(BedrockBusy):
+        controller.call(lambda: None, deadline_seconds=0.05)
+    stats = controller.stats()
+    assert stats['admitted'] == 0 and stats['median_wait_ms'] is None
+
+    app_agentcore.show_admission_stats(stats)
+    assert 'median wait n/a, p95 n/a' in captions[0]
+    assert '1 timed out' in captions[0]
+
+
+def test_admission_caption_shows_wait_times(captions):
+    controller = make_controller()
+    controller.call(lambda: None)
+
+    app_agentcore.show_admission_stats(controller.stats())
+    assert 'median wait 0 ms, p95 0 ms' in captions[0]
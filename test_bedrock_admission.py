@@ -0,0 +1,102 @@
+# Tests for Bedrock admission control: slots, token bucket and throttle backoff
+import time
+
+import pytest
+
+from bedrock_admission import AdmissionController, BedrockBusy
+from fakes import client_error
+
+
+class Interrupted(BaseException):
+    """Stands in for Streamlit's StopException/RerunException"""
+
+
+def make_controller(**kwargs):
+    """A controller that never really sleeps between retries"""
+    options = dict(rate_per_second=100, burst=10, max_concurrent=2, deadline_seconds=5,
+                   sleep=lambda seconds: None, jitter=lambda: 0.5)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def throttled():
+    raise client_error('ThrottlingException', 400, 'RetrieveAndGenerate')
+
+
+def test_slot_is_released_when_the_call_is_interrupted():
+    controller = make_controller(max_concurrent=1)
+
+    def interrupted():
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        controller.call(interrupted)
+    assert controller.in_flight == 0
+    # An interrupted call says nothing about Bedrock, so the rate is unchanged
+    assert controller.rate == 100
+    # The only slot is free again
+    assert controller.call(lambda: 'answer', deadline_seconds=0.5) == 'answer'
+
+
+def test_slot_is_released_when_the_call_fails():
+    controller = make_controller(max_concurrent=1)
+    with pytest.raises(ValueError):
+        controller.call(lambda: (_ for _ in ()).throw(ValueError('bad request')))
+    assert controller.in_flight == 0
+    assert controller.throttled == 0
+
+
+def test_throttled_calls_are_retried_and_halve_the_rate():
+    controller = make_controller()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            throttled()
+        return 'answer'
+
+    retries = []
+    assert controller.call(flaky, on_retry=lambda attempt, delay: retries.append(attempt)) == 'answer'
+    assert retries == [1, 2]
+    assert controller.throttled == 2
+    # Halved twice, then one success wins back a twentieth of the configured rate
+    assert controller.rate == pytest.approx(100 / 4 + 100 / 20)
+    assert controller.in_flight == 0
+
+
+def test_persistent_throttling_becomes_bedrock_busy():
+    controller = make_controller(max_attempts=3)
+    with pytest.raises(BedrockBusy):
+        controller.call(throttled)
+    assert controller.throttled == 3
+    assert controller.retries == 2
+    assert controller.rate == pytest.approx(100 / 8)
+    assert controller.in_flight == 0
+
+
+def test_rate_never_drops_below_a_sixteenth():
+    controller = make_controller(max_attempts=10, deadline_seconds=60)
+    with pytest.raises(BedrockBusy):
+        controller.call(throttled)
+    assert controller.rate == pytest.approx(100 / 16)
+
+
+def test_token_bucket_limits_the_call_rate():
+    controller = make_controller(rate_per_second=20, burst=2, max_concurrent=5)
+    started = time.monotonic()
+    for _ in range(6):
+        controller.call(lambda: None)
+    # Two calls from the burst, then one every 50 ms
+    assert time.monotonic() - started >= 4 / 20 * 0.9
+    assert controller.stats()['admitted'] == 6
+
+
+def test_call_not_admitted_by_the_deadline_is_rejected():
+    controller = make_controller(rate_per_second=1, burst=1)
+    controller.call(lambda: None)
+    with pytest.raises(BedrockBusy):
+        controller.call(lambda: None, deadline_seconds=0.1)
+    stats = controller.stats()
+    assert stats['rejected'] == 1
+    assert stats['queue_depth'] == 0
@@ -0,0 +1,33 @@
+# Tests for the calendar normalizer: golden outputs and location code rules
+import glob
+import os
+
+import pytest
+
+from calendar_normalizer import CalendarNormalizer
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'calendar_corpus')
+SAMPLES = sorted(p for p in glob.glob(os.path.join(CORPUS_DIR, '*.txt')) if not p.endswith('.expected.txt'))
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=os.path.basename)
+def test_sample_matches_its_golden_output(path):
+    with open(path, encoding='utf-8') as f:
+        actual = CalendarNormalizer(default_year='2025').normalize(f.read().split('\n')) + '\n'
+    with open(path[:-len('.txt')] + '.expected.txt', encoding='utf-8') as f:
+        assert actual == f.read()
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('Monday 8 th Curriculum meeting 15:30 – 16:00 SH', 'Curriculum meeting 3:30pm – 4:00pm, School Hall'),
+    ('Thursday 26th Easter service SMC 10:00', "Easter service, St Mary's Church 10:00am"),
+    ('Wednesday 28 th Class photos IS', 'Class photos, Infant Site'),
+    ('Wednesday 29 th SPORTS DAY IS CANCELLED', 'SPORTS DAY IS CANCELLED'),
+    ('Monday 24 th CLUB PHOTOS MS AND JS', 'CLUB PHOTOS MS AND JS'),
+    ('Thursday 20 th OPEN MORNING 09:30 IS', 'OPEN MORNING 9:30am, Infant Site'),
+    ('Friday 17 th SHOW AND TELL assembly 14:30 SH', 'SHOW AND TELL assembly 2:30pm, School Hall'),
+])
+def test_location_codes_are_expanded_only_where_they_name_a_place(line, expected):
+    events = []
+    CalendarNormalizer('2025', on_event=events.append).normalize(['September 2025', line])
+    assert events[0]['text'].endswith(': ' + expected)
@@ -0,0 +1,95 @@
+# Tests for the background-refreshed S3 config store
+import json
+import threading
+import time
+
+from config_store import ConfigStore
+from fakes import FakeS3, ServiceProfile
+
+BUCKET = 'bucket'
+KEY = 'config/test.json'
+
+
+class Clock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_store(s3, clock, **kwargs):
+    """A store over the fake S3 that refreshes after 60 fake seconds"""
+    return ConfigStore(s3, BUCKET, KEY, None, refresh_seconds=60, clock=clock, **kwargs)
+
+
+def test_first_get_loads_and_unchanged_refresh_is_a_304():
+    s3 = FakeS3()
+    s3.put(BUCKET, KEY, json.dumps({'v': 1}))
+    store = make_store(s3, Clock())
+    assert store.get() == {'v': 1}
+    assert store.refresh() is False
+    assert s3.profile.calls == 2
+
+
+def test_refresh_loads_a_new_version():
+    s3 = FakeS3()
+    s3.put(BUCKET, KEY, json.dumps({'v': 1}))
+    store = make_store(s3, Clock())
+    old_version = store.version
+    s3.put(BUCKET, KEY, json.dumps({'v': 2}))
+    assert store.refresh() is True
+    assert store.snapshot() == ({'v': 2}, store.version)
+    assert store.version != old_version
+
+
+def test_missing_object_falls_back_and_keeps_last_good_value():
+    s3 = FakeS3()
+    store = make_store(s3, Clock())
+    assert store.get() == {}
+    s3.put(BUCKET, KEY, json.dumps({'v': 1}))
+    store.refresh()
+    s3.objects.clear()
+    assert store.refresh() is False
+    assert store.get() == {'v': 1}
+
+
+def test_readers_are_not_blocked_while_a_refresh_runs():
+    s3 = FakeS3()
+    s3.put(BUCKET, KEY, json.dumps({'v': 1}))
+    clock = Clock()
+    store = make_store(s3, clock)
+    store.get()
+
+    # Make S3 slow, publish a new version and let the value go stale
+    s3.profile.latency_ms = 1000
+    s3.put(BUCKET, KEY, json.dumps({'v': 2}))
+    clock.now = 61
+
+    started = time.perf_counter()
+    assert store.get() == {'v': 1}
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(store.get())) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    assert time.perf_counter() - started < 0.5
+    assert results == [{'v': 1}] * 4
+
+    deadline = time.monotonic() + 5
+    while store.get() != {'v': 2} and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert store.get() == {'v': 2}
+
+
+def test_transform_runs_once_per_load():
+    s3 = FakeS3()
+    s3.put(BUCKET, KEY, json.dumps({'v': 1}))
+    calls = []
+    store = make_store(s3, Clock(), transform=lambda raw: calls.append(raw) or raw['v'])
+    assert store.get() == 1
+    store.refresh()
+    assert calls == [{'v': 1}]
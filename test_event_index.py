@@ -0,0 +1,67 @@
+# Tests for answering date questions from the calendar event index
+from datetime import date
+
+import pytest
+
+from event_index import EventLookup
+
+SOURCE = 'processed-docs/autumn_term_calendar_processed.txt'
+
+
+def event(iso_date, title, end_date=None, location=None):
+    text = f"{iso_date}: {title}" + (f", {location}" if location else '')
+    return {'date': iso_date, 'end_date': end_date, 'title': title, 'location': location,
+            'text': text, 'source': SOURCE}
+
+
+EVENTS = [
+    event('2025-09-03', 'INSET Day - school closed to pupils'),
+    event('2025-10-27', 'Half term', end_date='2025-10-31'),
+    event('2025-12-05', 'Christmas fair 3:30pm', location='School Hall'),
+    event('2025-12-18', 'Carol service 6:00pm', location="St Mary's Church"),
+    event('2026-02-16', 'Half term', end_date='2026-02-20'),
+    event('2026-05-04', 'Bank Holiday - school closed'),
+]
+
+
+@pytest.fixture
+def lookup():
+    return EventLookup(EVENTS, today=lambda: date(2025, 11, 1))
+
+
+def test_specific_event_is_answered(lookup):
+    answer = lookup.answer('When is the Christmas fair?')
+    assert answer.startswith('2025-12-05: Christmas fair 3:30pm, School Hall')
+    assert 'autumn_term_calendar_processed.txt' in answer
+
+
+@pytest.mark.parametrize('question', [
+    'When is the school closed?',
+    'When does term end?',
+    'When is the school closed to pupils?',
+])
+def test_generic_questions_go_to_the_knowledge_base(lookup, question):
+    assert lookup.answer(question) is None
+
+
+def test_questions_that_are_not_about_dates_are_not_answered(lookup):
+    assert lookup.answer('Is the Christmas fair indoors?') is None
+
+
+def test_past_occurrences_are_dropped_when_one_is_still_to_come(lookup):
+    answer = lookup.answer('When is half term?')
+    assert 'February 2026' in answer
+    assert 'October 2025' not in answer
+    assert 'already happened' not in answer
+
+
+def test_a_named_year_keeps_past_occurrences_and_labels_them(lookup):
+    answer = lookup.answer('When was half term in 2025?')
+    assert 'October 2025 (already happened)' in answer
+    assert 'February 2026' not in answer
+
+
+def test_events_that_are_over_are_labelled():
+    lookup = EventLookup(EVENTS, today=lambda: date(2026, 10, 17))
+    answer = lookup.answer('When is the carol service?')
+    assert "Church (already happened)" in answer
@@ -0,0 +1,69 @@
+# Tests for the knowledge base change marker that invalidates cached answers
+import pytest
+
+from answer_cache import AnswerCache
+from fakes import FakeAWS, client_error
+
+
+class FakeIngestor:
+    """Document status with a settable generation"""
+
+    def __init__(self):
+        self.generation = 2
+        self.failing = False
+
+    def refresh(self):
+        if self.failing:
+            raise client_error('SlowDown', 503, 'GetObject')
+        return {'generation': self.generation, 'documents': {}}
+
+
+@pytest.fixture
+def aws():
+    fakes = FakeAWS()
+    fakes.install('us-east-1')
+    # One completed ingestion job
+    fakes.bedrock_agent.job_seconds = 0
+    fakes.bedrock_agent.start_ingestion_job(knowledgeBaseId='kb', dataSourceId='ds')
+    return fakes
+
+
+@pytest.fixture
+def ingestor():
+    return FakeIngestor()
+
+
+@pytest.fixture
+def qa_core(aws, ingestor, monkeypatch):
+    import qa_core
+    # qa_core keeps its clients in an lru_cache; drop any from an earlier test's fakes
+    qa_core.aws_client.cache_clear()
+    monkeypatch.setattr(qa_core, 'INGESTION_MODE', 'incremental')
+    monkeypatch.setattr(qa_core, 'INGESTION_MARKER_TTL_SECONDS', 0)
+    monkeypatch.setattr(qa_core, '_ingestion_marker', (None, None))
+    monkeypatch.setattr(qa_core, 'document_ingestor', lambda: ingestor)
+    return qa_core
+
+
+def test_marker_combines_the_latest_job_and_document_generation(qa_core, ingestor):
+    assert qa_core.latest_ingestion_marker() == 'job-1/2'
+    ingestor.generation = 3
+    assert qa_core.latest_ingestion_marker() == 'job-1/3'
+
+
+@pytest.mark.parametrize('failing', ['list_ingestion_jobs', 'document_status'])
+def test_failed_check_keeps_the_last_marker_and_the_cached_answers(qa_core, aws, ingestor, monkeypatch, failing):
+    cache = AnswerCache()
+    cache.sync_generation(qa_core.latest_ingestion_marker())
+    cache.put('question', 'answer')
+
+    if failing == 'list_ingestion_jobs':
+        def throttled(**kwargs):
+            raise client_error('ThrottlingException', 400, 'ListIngestionJobs')
+        monkeypatch.setattr(aws.bedrock_agent, 'list_ingestion_jobs', throttled)
+    else:
+        ingestor.failing = True
+
+    assert qa_core.latest_ingestion_marker() == 'job-1/2'
+    assert cache.sync_generation(qa_core.latest_ingestion_marker()) is False
+    assert cache.get('question') == 'answer'
@@ -0,0 +1,143 @@
+# Tests for the debounced knowledge base sync
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from fakes import FakeBedrockAgent, FakeS3, client_error
+from ingestion_scheduler import IngestionScheduler
+
+BUCKET = 'bucket'
+
+
+class Clock:
+    """Manually advanced epoch clock"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def agent():
+    return FakeBedrockAgent(job_seconds=0)
+
+
+@pytest.fixture
+def scheduler(clock, agent):
+    return IngestionScheduler(FakeS3(), agent, BUCKET, 'kb', 'ds', quiet_seconds=60,
+                              max_delay_seconds=600, clock=clock)
+
+
+def test_flush_waits_for_changes_to_settle(scheduler, clock, agent):
+    scheduler.record_change(['a.pdf'])
+    clock.now += 30
+    scheduler.record_change(['b.pdf'])
+    clock.now += 59
+    assert scheduler.flush() is None
+    assert agent.jobs == []
+    clock.now += 1
+    assert scheduler.flush() == 'job-1'
+    assert scheduler.pending_state()['pending'] is False
+    # Nothing left to sync
+    assert scheduler.flush() is None
+    assert len(agent.jobs) == 1
+
+
+def test_flush_without_changes_does_nothing(scheduler, agent):
+    assert scheduler.flush(force=True) is None
+    assert agent.jobs == []
+
+
+def test_overdue_changes_sync_even_while_changes_keep_coming(scheduler, clock):
+    scheduler.record_change(['a.pdf'])
+    for _ in range(20):
+        clock.now += 30
+        scheduler.record_change(['a.pdf'])
+        if scheduler.flush() is not None:
+            break
+    assert clock.now - 1_000_000.0 >= 600
+    assert scheduler.pending_state()['pending'] is False
+
+
+def test_force_skips_the_quiet_period(scheduler):
+    scheduler.record_change(['a.pdf'])
+    assert scheduler.flush(force=True) == 'job-1'
+
+
+def test_running_job_defers_the_sync(scheduler, clock, agent):
+    agent.job_seconds = 3600
+    agent.start_ingestion_job(knowledgeBaseId='kb', dataSourceId='ds')
+    scheduler.record_change(['a.pdf'])
+    clock.now += 60
+    assert scheduler.flush() is None
+    assert scheduler.pending_state()['pending'] is True
+
+
+def test_changes_stay_pending_when_the_job_cannot_start(scheduler, clock, agent, monkeypatch):
+    def conflict(**kwargs):
+        raise client_error('ConflictException', 409, 'StartIngestionJob')
+
+    scheduler.record_change(['a.pdf', 'b.pdf'])
+    clock.now += 60
+    monkeypatch.setattr(agent, 'start_ingestion_job', conflict)
+    assert scheduler.flush() is None
+    state = scheduler.pending_state()
+    assert state['pending'] is True
+    assert state['changes'] == ['a.pdf', 'b.pdf']
+
+    monkeypatch.undo()
+    clock.now += 60
+    assert scheduler.flush() == 'job-1'
+
+
+def test_changes_stay_pending_when_the_start_call_fails_unexpectedly(scheduler, clock, agent, monkeypatch):
+    def unreachable(**kwargs):
+        raise EndpointConnectionError(endpoint_url='https://bedrock-agent.example')
+
+    scheduler.record_change(['a.pdf'])
+    first_change = clock.now
+    clock.now += 60
+    monkeypatch.setattr(agent, 'start_ingestion_job', unreachable)
+    with pytest.raises(EndpointConnectionError):
+        scheduler.flush()
+    state = scheduler.pending_state()
+    assert state['pending'] is True
+    assert state['changes'] == ['a.pdf']
+    # The oldest change keeps its age, so max_delay_seconds still applies
+    assert state['first_change'] == first_change
+
+
+def test_restored_changes_merge_with_changes_recorded_meanwhile(scheduler, clock, agent, monkeypatch):
+    def conflict_after_a_new_change(**kwargs):
+        scheduler.record_change(['b.pdf'])
+        raise client_error('ConflictException', 409, 'StartIngestionJob')
+
+    scheduler.record_change(['a.pdf'])
+    first_change = clock.now
+    clock.now += 60
+    monkeypatch.setattr(agent, 'start_ingestion_job', conflict_after_a_new_change)
+    assert scheduler.flush() is None
+    state = scheduler.pending_state()
+    assert state['changes'] == ['a.pdf', 'b.pdf']
+    assert state['first_change'] == first_change
+    assert state['last_change'] == clock.now
+
+def test_concurrent_change_during_flush_is_not_lost(scheduler, clock, agent, monkeypatch):
+    scheduler.record_change(['a.pdf'])
+    clock.now += 60
+    job_in_progress = scheduler.job_in_progress
+
+    def change_arrives():
+        # Another invocation records a change between the read and the claim
+        scheduler.record_change(['b.pdf'])
+        return job_in_progress()
+
+    monkeypatch.setattr(scheduler, 'job_in_progress', change_arrives)
+    assert scheduler.flush() is None
+    assert scheduler.pending_state()['changes'] == ['a.pdf', 'b.pdf']
@@ -0,0 +1,78 @@
+# Tests for per-message failure reporting in the document processor's SQS handler
+import importlib
+import json
+
+import pytest
+
+from fakes import CORRUPT_DOCUMENT, FakeAWS, s3_event_record, sqs_message
+
+BUCKET = 'school-qa-docs-v2'
+REGION = 'us-east-1'
+
+
+@pytest.fixture(scope='module')
+def aws(monkeypatch_module):
+    monkeypatch_module.setenv('EMF_METRICS', 'false')
+    monkeypatch_module.setenv('DEAD_LETTER_AFTER_ATTEMPTS', '3')
+    fakes = FakeAWS()
+    # The Lambda binds its clients at import, so the fakes go in first
+    fakes.install(REGION)
+    return fakes
+
+
+@pytest.fixture(scope='module')
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as patch:
+        yield patch
+
+
+@pytest.fixture(scope='module')
+def processor(aws):
+    import lambda_document_processor
+    return importlib.reload(lambda_document_processor)
+
+
+def message_for(aws, message_id, key, body, receive_count=1):
+    """Upload a document and build the SQS message announcing it"""
+    aws.s3.put(BUCKET, key, body)
+    return sqs_message([s3_event_record(BUCKET, key)], message_id, receive_count)
+
+
+def failed_ids(response):
+    return [item['itemIdentifier'] for item in response['batchItemFailures']]
+
+
+def test_only_failed_messages_are_reported(aws, processor):
+    messages = [
+        message_for(aws, 'good-1', 'school-docs/newsletter-1.txt', 'Sports day is on Friday.'),
+        message_for(aws, 'bad', 'school-docs/damaged.pdf', CORRUPT_DOCUMENT + b' not a PDF'),
+        message_for(aws, 'good-2', 'school-docs/newsletter-2.txt', 'Clubs restart next week.'),
+    ]
+    response = processor.sqs_handler({'Records': messages}, None)
+    assert failed_ids(response) == ['bad']
+    assert (BUCKET, 'processed-docs/newsletter-1_processed.txt') in aws.s3.objects
+    assert (BUCKET, 'processed-docs/newsletter-2_processed.txt') in aws.s3.objects
+
+
+def test_all_succeeding_batch_reports_no_failures(aws, processor):
+    messages = [message_for(aws, f'ok-{n}', f'school-docs/ok-{n}.txt', f'Note {n}') for n in range(3)]
+    assert processor.sqs_handler({'Records': messages}, None) == {'batchItemFailures': []}
+
+
+def test_unreadable_message_is_dead_lettered_not_retried(aws, processor):
+    good = message_for(aws, 'good-3', 'school-docs/newsletter-3.txt', 'Harvest festival.')
+    unreadable = {'messageId': 'junk', 'body': 'not json', 'attributes': {'ApproximateReceiveCount': '1'}}
+    response = processor.sqs_handler({'Records': [good, unreadable]}, None)
+    assert failed_ids(response) == []
+    parked = [key for bucket, key in aws.s3.objects if key.startswith('state/dead-letter/') and 'junk' in key]
+    assert len(parked) == 1
+
+
+def test_message_failing_too_often_is_dead_lettered(aws, processor):
+    message = message_for(aws, 'poison', 'school-docs/poison.pdf', CORRUPT_DOCUMENT, receive_count=3)
+    response = processor.sqs_handler({'Records': [message]}, None)
+    assert failed_ids(response) == []
+    parked = [key for bucket, key in aws.s3.objects if 'poison' in key and key.startswith('state/dead-letter/')]
+    record = json.loads(aws.s3.objects[(BUCKET, parked[0])][0])
+    assert record['attempts'] == 3
+    assert 'poison.pdf' in record['errors'][0]
@@ -0,0 +1,82 @@
+# Tests for the shared conditional read-modify-write of JSON state objects
+import json
+
+import pytest
+
+from fakes import FakeS3, client_error
+from s3_conditional import read_json, update_json, write_json
+
+BUCKET = 'school-docs'
+KEY = 'state/test.json'
+
+
+@pytest.fixture
+def s3():
+    return FakeS3()
+
+
+def test_missing_object_reads_as_empty(s3):
+    assert read_json(s3, BUCKET, KEY) == ({}, None)
+
+
+def test_update_creates_then_merges(s3):
+    update_json(s3, BUCKET, KEY, lambda value: {**value, 'a': 1})
+    value, etag = update_json(s3, BUCKET, KEY, lambda value: {**value, 'b': 2}, indent=1)
+
+    assert value == {'a': 1, 'b': 2}
+    assert read_json(s3, BUCKET, KEY) == (value, etag)
+
+
+def test_mutate_returning_none_skips_the_write(s3):
+    s3.put(BUCKET, KEY, json.dumps({'a': 1}).encode('utf-8'))
+    calls_before = s3.profile.calls
+
+    value, _ = update_json(s3, BUCKET, KEY, lambda value: None)
+
+    assert value == {'a': 1}
+    # Only the GET was made
+    assert s3.profile.calls == calls_before + 1
+
+
+def test_stale_etag_is_reported_as_a_conflict(s3):
+    _, etag = update_json(s3, BUCKET, KEY, lambda value: {'a': 1})
+    update_json(s3, BUCKET, KEY, lambda value: {'a': 2})
+
+    assert write_json(s3, BUCKET, KEY, {'a': 3}, etag) is None
+    assert write_json(s3, BUCKET, KEY, {'a': 3}, None) is None
+    assert read_json(s3, BUCKET, KEY)[0] == {'a': 2}
+
+
+def test_update_retries_when_a_concurrent_writer_wins(s3):
+    calls = []
+
+    def mutate(value):
+        calls.append(dict(value))
+        if len(calls) == 1:
+            # Another writer lands between our read and our write
+            update_json(s3, BUCKET, KEY, lambda other: {**other, 'theirs': True})
+        return {**value, 'ours': True}
+
+    value, _ = update_json(s3, BUCKET, KEY, mutate)
+
+    assert len(calls) == 2
+    assert value == {'theirs': True, 'ours': True}
+    assert read_json(s3, BUCKET, KEY)[0] == value
+
+
+def test_update_gives_up_after_the_given_attempts(s3):
+    def mutate(value):
+        update_json(s3, BUCKET, KEY, lambda other: {'n': other.get('n', 0) + 1})
+        return {'ours': True}
+
+    with pytest.raises(RuntimeError, match='after 3 attempts'):
+        update_json(s3, BUCKET, KEY, mutate, attempts=3)
+
+
+def test_other_errors_are_raised(s3):
+    def failing_put(**kwargs):
+        raise client_error('AccessDenied', 403, 'PutObject')
+
+    s3.put_object = failing_put
+    with pytest.raises(Exception, match='AccessDenied'):
+        update_json(s3, BUCKET, KEY, lambda value: {'a': 1})
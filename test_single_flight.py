@@ -0,0 +1,123 @@
+# Tests for request coalescing of concurrent identical questions
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+class Interrupted(BaseException):
+    """Stands in for Streamlit's StopException/RerunException"""
+
+
+def start_followers(flight, key, fn, count):
+    """Start callers that join an in-flight call; returns (threads, results, errors)"""
+    results, errors = [], []
+
+    def follow():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=follow) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_followers(flight, count):
+    """Wait until count callers are waiting on the leader"""
+    deadline = time.monotonic() + 5
+    while flight.collapsed < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert flight.collapsed >= count
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def leader_fn():
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+
+    leader = threading.Thread(target=lambda: flight.do('q', leader_fn))
+    leader.start()
+    threads, results, errors = start_followers(flight, 'q', leader_fn, 3)
+    wait_for_followers(flight, 3)
+    release.set()
+    for thread in threads + [leader]:
+        thread.join(5)
+    assert calls == [1]
+    assert results == ['answer'] * 3 and not errors
+    assert flight.in_flight() == 0
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError('bedrock failed')
+
+    leader_errors = []
+    leader = threading.Thread(target=lambda: pytest.raises(ValueError, flight.do, 'q', failing)
+                              and leader_errors.append(True))
+    leader.start()
+    threads, results, errors = start_followers(flight, 'q', failing, 2)
+    wait_for_followers(flight, 2)
+    release.set()
+    for thread in threads + [leader]:
+        thread.join(5)
+    assert leader_errors == [True]
+    assert not results
+    assert [str(e) for e in errors] == ['bedrock failed'] * 2
+    # The failure is not remembered: the next caller runs the function again
+    assert flight.do('q', lambda: 'retried') == 'retried'
+
+
+def test_followers_retry_when_the_leader_is_interrupted():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def interrupted():
+        calls.append('leader')
+        release.wait(5)
+        raise Interrupted()
+
+    def follower_fn():
+        calls.append('follower')
+        # Finish only once the other two followers have joined the new leader
+        wait_for_followers(flight, 5)
+        return 'answer'
+
+    def lead():
+        with pytest.raises(Interrupted):
+            flight.do('q', interrupted)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    while not calls:
+        time.sleep(0.01)
+    threads, results, errors = start_followers(flight, 'q', follower_fn, 3)
+    wait_for_followers(flight, 3)
+    release.set()
+    for thread in threads + [leader]:
+        thread.join(5)
+    # One follower became the new leader; the others shared its result
+    assert calls == ['leader', 'follower']
+    assert results == ['answer'] * 3 and not errors
+    assert flight.in_flight() == 0
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.collapsed == 0
@@ -0,0 +1,120 @@
+# Tests for the background warm-up of the suggested questions' answers
+import pytest
+
+from warmup import Warmer, parse_suggested_questions
+
+
+class Clock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Answerer:
+    """Records the questions asked; questions in failing raise"""
+
+    def __init__(self):
+        self.asked = []
+        self.failing = set()
+
+    def __call__(self, question):
+        self.asked.append(question)
+        if question in self.failing:
+            raise RuntimeError('Bedrock busy')
+
+
+QUESTIONS = ['When is the Christmas fair?', 'What is the uniform?', 'Who teaches Year 5?']
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def answerer():
+    return Answerer()
+
+
+@pytest.fixture
+def generation():
+    return {'ingestion': 'job-1', 'config': 'v1'}
+
+
+@pytest.fixture
+def warmer(clock, answerer, generation):
+    return Warmer(lambda: QUESTIONS, answerer, lambda: dict(generation), poll_seconds=60,
+                  max_age_seconds=3300, max_retry_seconds=240, clock=clock, log=lambda line: None)
+
+
+def test_suggested_questions_are_cleaned():
+    config = {'questions': ['  When is  sports day? ', '', 'when is sports day?', 'What is the uniform?']}
+    assert parse_suggested_questions(config, 5) == ['When is sports day?', 'What is the uniform?']
+    assert parse_suggested_questions(config, 1) == ['When is sports day?']
+    assert parse_suggested_questions(None, 5) == []
+
+
+def test_nothing_is_rewarmed_while_the_generation_is_unchanged(warmer, clock, answerer):
+    assert warmer.run()['answered'] == 3
+    clock.now += 600
+    assert warmer._stale_reason() is None
+    clock.now += 3300
+    assert warmer._stale_reason() == 'expiring'
+
+
+def test_new_generation_is_named_and_rewarms_everything(warmer, answerer, generation):
+    warmer.run()
+    generation['ingestion'] = 'job-2'
+    assert warmer._stale_reason() == 'new ingestion'
+    answerer.asked.clear()
+    warmer.run('new ingestion')
+    assert answerer.asked == QUESTIONS
+
+
+def test_retry_only_asks_the_questions_that_failed(warmer, clock, answerer):
+    answerer.failing = {QUESTIONS[1]}
+    summary = warmer.run()
+    assert summary['answered'] == 2
+    assert summary['errors'] == [f"{QUESTIONS[1]}: Bedrock busy"]
+
+    answerer.asked.clear()
+    answerer.failing = set()
+    clock.now += 60
+    assert warmer._stale_reason() == 'retry'
+    summary = warmer.run('retry')
+    assert answerer.asked == [QUESTIONS[1]]
+    assert summary['answered'] == 3
+    clock.now += 60
+    assert warmer._stale_reason() is None
+
+
+def test_retries_back_off(warmer, clock, answerer):
+    answerer.failing = {QUESTIONS[0]}
+    warmer.run()
+    delays = []
+    for _ in range(5):
+        waited = 0
+        while warmer._stale_reason() is None:
+            clock.now += 60
+            waited += 60
+        delays.append(waited)
+        warmer.run('retry')
+    assert delays == [60, 120, 240, 240, 240]
+    # Only the failing question was asked again
+    assert answerer.asked.count(QUESTIONS[1]) == 1
+
+
+def test_a_new_generation_is_not_held_back_by_the_retry_backoff(warmer, clock, answerer, generation):
+    answerer.failing = {QUESTIONS[0]}
+    warmer.run()
+    warmer.run('retry')
+    generation['config'] = 'v2'
+    assert warmer._stale_reason() == 'new config'
+    answerer.failing = set()
+    answerer.asked.clear()
+    warmer.run('new config')
+    assert answerer.asked == QUESTIONS
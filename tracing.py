@@ -0,0 +1,143 @@
+# Lightweight per-stage timing: spans, CloudWatch EMF log lines and rolling percentiles
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class _Trace:
+    """Span totals for one traced operation on one thread"""
+
+    def __init__(self, operation, properties):
+        self.operation = operation
+        self.properties = properties
+        self.spans = {}
+
+
+class Tracer:
+    """Time named stages of work and report them as CloudWatch embedded metric format
+
+    A trace wraps one operation (a question, an upload, a document). Spans inside it
+    add their duration to the trace under the span's name; a span name used more
+    than once in a trace (e.g. every Textract page request) is summed. Spans record
+    self time: the time of spans nested inside them is counted only once, in the
+    innermost span. When the trace ends, one EMF JSON line is printed with every
+    span in milliseconds and the operation's total. In Lambda and in log groups fed
+    by the CloudWatch agent these lines become metrics; anywhere else they are plain
+    JSON logs that are easy to read or grep.
+
+    Each span and trace duration also goes into an in-process ring buffer, from
+    which percentiles() builds the rolling p50/p95/p99 admin panel.
+
+    Args:
+        namespace (str): CloudWatch metric namespace, e.g. 'SchoolQA'
+        service (str): Value of the Service dimension, e.g. 'app' or 'document-processor'
+        window (int): Durations kept per name for percentiles
+        emit: Callable receiving each EMF line; print sends it to stdout (CloudWatch Logs)
+        enabled (bool): False keeps the percentiles but stops the EMF lines
+    """
+
+    def __init__(self, namespace, service, window=500, emit=print, enabled=True, clock=time.perf_counter):
+        self.namespace = namespace
+        self.service = service
+        self.window = window
+        self.enabled = enabled
+        self._emit = emit
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._durations = {}
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def trace(self, operation, **properties):
+        """Trace one operation on this thread, emitting its spans when it ends
+
+        Yields:
+            dict: Properties logged with the metrics (not dimensions); callers may add to it
+        """
+        current = _Trace(operation, properties)
+        outer = getattr(self._local, 'trace', None)
+        self._local.trace = current
+        started = self._clock()
+        try:
+            yield properties
+        finally:
+            total = self._clock() - started
+            self._local.trace = outer
+            self._observe(operation, total)
+            if self.enabled:
+                self._emit(self.emf_line(current, total))
+
+    @contextmanager
+    def span(self, name):
+        """Time a block as one stage of the current trace (or on its own, outside a trace)"""
+        stack = self._stack()
+        stack.append(0.0)
+        started = self._clock()
+        try:
+            yield
+        finally:
+            elapsed = self._clock() - started
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.record(name, elapsed - nested)
+
+    def record(self, name, seconds):
+        """Add a duration measured elsewhere to the current trace and the ring buffer"""
+        current = getattr(self._local, 'trace', None)
+        if current is not None:
+            current.spans[name] = current.spans.get(name, 0.0) + seconds
+        self._observe(name, seconds)
+
+    def _observe(self, name, seconds):
+        with self._lock:
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = deque(maxlen=self.window)
+            durations.append(seconds)
+
+    def emf_line(self, current, total):
+        """Render a finished trace as a CloudWatch embedded metric format JSON line"""
+        values = {name: round(seconds * 1000, 3) for name, seconds in current.spans.items()}
+        values['total'] = round(total * 1000, 3)
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [['Service', 'Operation']],
+                    'Metrics': [{'Name': name, 'Unit': 'Milliseconds'} for name in values],
+                }],
+            },
+            'Service': self.service,
+            'Operation': current.operation,
+        }
+        document.update(current.properties)
+        document.update(values)
+        return json.dumps(document, default=str)
+
+    def percentiles(self):
+        """Rolling p50/p95/p99 in milliseconds for every span and operation seen
+
+        Returns:
+            dict: name -> {'count', 'p50_ms', 'p95_ms', 'p99_ms'}
+        """
+        with self._lock:
+            snapshot = {name: sorted(durations) for name, durations in self._durations.items()}
+        summary = {}
+        for name, durations in sorted(snapshot.items()):
+            if not durations:
+                continue
+            last = len(durations) - 1
+            summary[name] = {'count': len(durations)}
+            for label, fraction in (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+                summary[name][label] = round(durations[min(last, int(len(durations) * fraction))] * 1000, 2)
+        return summary
@@ -0,0 +1,111 @@
+# Concurrent multi-file uploads with per-file byte progress, finished by one callback
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class UploadBatch:
+    """Upload several files at once and report each file's progress
+
+    Files are handed to `upload` on a small thread pool. The upload function
+    reports bytes as they are sent (boto3's transfer Callback does this from
+    its own worker threads), so progress() can be polled from another thread,
+    e.g. the Streamlit script thread that owns the progress bars. When the last
+    file has finished, on_complete runs once with every result; that is where a
+    batch asks for its single knowledge base sync.
+    """
+
+    def __init__(self, upload, files, max_workers=4, on_complete=None, clock=time.perf_counter):
+        """
+        Args:
+            upload: Callable (fileobj, filename, on_bytes) -> (success_bool, error or None);
+                on_bytes(n) is called with each chunk of bytes sent
+            files (list): (fileobj, filename, size in bytes) tuples
+            max_workers (int): Files uploaded at once
+            on_complete: Optional callable receiving the list of results when all are done
+            clock: Monotonic clock, injectable for tests
+        """
+        self.upload = upload
+        self.on_complete = on_complete
+        self.max_workers = max(1, min(max_workers, len(files) or 1))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._files = [
+            {'filename': filename, 'size': size, 'sent': 0, 'state': 'queued', 'error': None, 'seconds': None}
+            for _, filename, size in files
+        ]
+        self._fileobjs = [fileobj for fileobj, _, _ in files]
+        self._remaining = len(files)
+        self._started = None
+        self.seconds = None
+        self.completion = None
+
+    def start(self):
+        """Start uploading in the background; returns self"""
+        self._started = self._clock()
+        if not self._files:
+            self._finish()
+            return self
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='upload')
+        for index in range(len(self._files)):
+            pool.submit(self._upload_one, index)
+        # Workers exit once the queue drains; nothing waits on the pool itself
+        pool.shutdown(wait=False)
+        return self
+
+    def wait(self, timeout=None):
+        """Wait for every file (and on_complete) to finish; True if they have"""
+        return self._done.wait(timeout)
+
+    def done(self):
+        """True once every file has finished and on_complete has run"""
+        return self._done.is_set()
+
+    def progress(self):
+        """Snapshot of each file: filename, size, sent, state (queued/uploading/done/failed), error, seconds"""
+        with self._lock:
+            return [dict(entry) for entry in self._files]
+
+    def results(self):
+        """Per-file results once done (same fields as progress())"""
+        self.wait()
+        return self.progress()
+
+    def _upload_one(self, index):
+        entry = self._files[index]
+        started = self._clock()
+        with self._lock:
+            entry['state'] = 'uploading'
+
+        def on_bytes(count):
+            # Retried parts are reported as negative counts
+            with self._lock:
+                entry['sent'] = max(0, entry['sent'] + count)
+                if entry['size']:
+                    entry['sent'] = min(entry['sent'], entry['size'])
+
+        try:
+            success, error = self.upload(self._fileobjs[index], entry['filename'], on_bytes)
+        except Exception as e:
+            success, error = False, str(e)
+        with self._lock:
+            entry['state'] = 'done' if success else 'failed'
+            entry['error'] = error
+            entry['seconds'] = round(self._clock() - started, 3)
+            if success:
+                entry['sent'] = entry['size']
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last:
+            self._finish()
+
+    def _finish(self):
+        self.seconds = round(self._clock() - self._started, 3)
+        try:
+            if self.on_complete is not None:
+                self.completion = self.on_complete(self.progress())
+        except Exception as e:
+            print(f"Upload batch completion failed: {e}")
+        finally:
+            self._done.set()
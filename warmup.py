@@ -0,0 +1,211 @@
+# Background warm-up: load config, build clients and pre-answer the suggested questions
+import threading
+import time
+
+
+def parse_suggested_questions(config, limit):
+    """Clean the suggested questions config into a short list of distinct questions
+
+    Args:
+        config (dict): Parsed suggested_questions.json, {"questions": [...]}
+        limit (int): Most questions kept (each one costs a Bedrock call per warm-up)
+
+    Returns:
+        list: Question strings in their configured order
+    """
+    questions, seen = [], set()
+    for question in (config or {}).get('questions', []):
+        question = ' '.join(str(question).split())
+        if question and question.lower() not in seen:
+            seen.add(question.lower())
+            questions.append(question)
+    return questions[:limit]
+
+
+class Warmer:
+    """Keep answers to the suggested questions ready in the answer cache
+
+    run() prepares the process (config loads, client creation) and then answers
+    each suggested question once, so the answers land in the shared answer cache
+    and the first clicks on the suggested-question buttons are cache hits.
+
+    start() runs a warm-up in a background thread and then checks every
+    poll_seconds whether the inputs have changed: the generation (latest ingestion,
+    config versions, question list) differs from the one last warmed, or the
+    answers are about to expire after max_age_seconds. wake() asks for a check now,
+    e.g. after an admin edits the questions.
+
+    When some questions fail, the questions already answered for the same
+    generation are not asked again: the retry only asks the failed ones, and
+    retries back off from poll_seconds, doubling up to max_retry_seconds.
+    """
+
+    def __init__(self, load_questions, answer, generation, prepare=None, poll_seconds=60,
+                 max_age_seconds=3300, max_retry_seconds=900, clock=time.monotonic, log=print):
+        """
+        Args:
+            load_questions: Callable returning the list of questions to warm
+            answer: Callable answering one question; raises if no answer was cached
+            generation: Callable returning a value that changes when warmed answers go stale;
+                a dict of named parts (e.g. 'ingestion', 'config') names the change in the log
+            prepare: Optional callable run before the questions (loads config, builds clients)
+            poll_seconds (float): How often the background thread checks the generation
+            max_age_seconds (float): Re-warm this long after the last warm-up even if nothing changed
+            max_retry_seconds (float): Longest wait between retries of an incomplete warm-up
+            clock: Monotonic clock, injectable for tests
+            log: Callable receiving the warm-up summary line
+        """
+        self.load_questions = load_questions
+        self.answer = answer
+        self.generation = generation
+        self.prepare = prepare
+        self.poll_seconds = poll_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._clock = clock
+        self._log = log
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        # Generation of the last warm-up, the questions it has answered, and
+        # whether it is complete; an incomplete one is retried after _retry_delay
+        self._warmed_generation = None
+        self._answered = set()
+        self._complete = False
+        self._retry_delay = None
+        self._retry_at = 0.0
+        self._last = None
+
+    def run(self, reason='startup'):
+        """Warm up now on the calling thread
+
+        Args:
+            reason (str): Why the warm-up runs; a 'retry' only asks the questions
+                not yet answered for the current generation
+
+        Returns:
+            dict: Summary of the warm-up (see status())
+        """
+        with self._run_lock:
+            started = self._clock()
+            generation = self._safe_generation()
+            with self._lock:
+                carried_over = (reason == 'retry' and generation is not None
+                                and generation == self._warmed_generation)
+                answered_questions = set(self._answered) if carried_over else set()
+                # Backoff starts again for each generation
+                retry_delay = self._retry_delay if carried_over else None
+            prepare_seconds = 0.0
+            errors = []
+            if self.prepare is not None:
+                try:
+                    self.prepare()
+                except Exception as e:
+                    errors.append(f"prepare: {e}")
+                prepare_seconds = self._clock() - started
+
+            slowest = (None, 0.0)
+            questions = self._safe_questions(errors)
+            for question in questions:
+                if question in answered_questions:
+                    continue
+                asked = self._clock()
+                try:
+                    self.answer(question)
+                    answered_questions.add(question)
+                except Exception as e:
+                    errors.append(f"{question}: {e}")
+                seconds = self._clock() - asked
+                if seconds > slowest[1]:
+                    slowest = (question, seconds)
+
+            answered = sum(question in answered_questions for question in questions)
+            summary = {
+                'reason': reason,
+                'questions': len(questions),
+                'answered': answered,
+                'errors': errors[-5:],
+                'seconds': round(self._clock() - started, 3),
+                'prepare_seconds': round(prepare_seconds, 3),
+                'slowest_question': slowest[0],
+                'slowest_seconds': round(slowest[1], 3),
+                'finished_at': time.time(),
+            }
+            with self._lock:
+                self._warmed_generation = generation
+                self._answered = answered_questions
+                self._complete = not errors and generation is not None
+                if self._complete:
+                    self._retry_delay = None
+                else:
+                    self._retry_delay = (self.poll_seconds if retry_delay is None
+                                         else min(retry_delay * 2, self.max_retry_seconds))
+                    self._retry_at = self._clock() + self._retry_delay
+                self._last = (self._clock(), summary)
+            self._log(
+                f"🔥 Warm-up ({reason}): {answered}/{len(questions)} suggested answers ready in "
+                f"{summary['seconds']:.2f}s (config and clients {summary['prepare_seconds']:.2f}s"
+                + (f", slowest {slowest[1]:.2f}s" if questions else '')
+                + (f", {len(errors)} failed: {errors[0]}" if errors else '') + ")"
+            )
+            return summary
+
+    def start(self):
+        """Start the background warm-up thread (once); returns immediately"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._watch, name='warmup', daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Check for changes now instead of at the next poll"""
+        self._wake.set()
+
+    def status(self):
+        """Last warm-up summary for the admin panel, or None before the first one finishes"""
+        with self._lock:
+            if self._last is None:
+                return None
+            finished, summary = self._last
+            return dict(summary, age_seconds=round(self._clock() - finished, 1))
+
+    def _watch(self):
+        self.run('startup')
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            reason = self._stale_reason()
+            if reason:
+                self.run(reason)
+
+    def _stale_reason(self):
+        """Why the warmed answers need refreshing, or None if they are current"""
+        generation = self._safe_generation()
+        with self._lock:
+            if generation is not None and generation != self._warmed_generation:
+                if isinstance(generation, dict) and isinstance(self._warmed_generation, dict):
+                    changed = [name for name in generation
+                               if generation[name] != self._warmed_generation.get(name)]
+                    return 'new ' + ', '.join(changed)
+                return 'changed'
+            if not self._complete:
+                return 'retry' if self._clock() >= self._retry_at else None
+            if self._last and self._clock() - self._last[0] >= self.max_age_seconds:
+                return 'expiring'
+        return None
+
+    def _safe_generation(self):
+        try:
+            return self.generation()
+        except Exception as e:
+            print(f"Warm-up could not check for changes: {e}")
+            return None
+
+    def _safe_questions(self, errors):
+        try:
+            return list(self.load_questions())
+        except Exception as e:
+            errors.append(f"questions: {e}")
+            return []